@@ -1,4 +1,9 @@
-from search_engine_utils import SearchEngineUtils
+import argparse
 
 if __name__ == "__main__":
-    SearchEngineUtils.run_search_engine()
+    parser = argparse.ArgumentParser(description="Basic Google Search Engine (command line version).")
+    parser.add_argument("--index", help="a saved index file to open at launch, so searches can start right away")
+    args = parser.parse_args()
+    # The engine is only imported once the arguments are known to be valid.
+    from search_engine_utils import SearchEngineUtils
+    SearchEngineUtils.run_search_engine(args.index)
@@ -1,4 +1,5 @@
 from search_engine import BasicSearchEngine
+from search_core import instrumentation, query_parser
 
 class SearchEngineUtils:
     @staticmethod
@@ -7,15 +8,39 @@ class SearchEngineUtils:
         print("\n===== Basic Google Search Engine =====")
         print("1) Index web pages")
         print("2) Search")
-        print("3) View file content")
-        print("4) Exit")
+        print("3) Ranked search")
+        print("4) Boolean search")
+        print("5) Phrase search")
+        print("6) View file content")
+        print("7) Save index")
+        print("8) Load index")
+        print("9) Statistics")
+        print("10) Exit")
         print("======================================")
 
     @staticmethod
-    def run_search_engine():
-        """Runs the search engine application, handling user input and actions."""
-        search_engine = BasicSearchEngine()
+    def load_index(search_engine, index_path):
+        """Loads a saved index into the engine, reporting the outcome to the user."""
+        try:
+            search_engine.load_index(index_path)
+            print(f"Loaded index with {len(search_engine.index)} terms from '{index_path}'.")
+        except FileNotFoundError:
+            print(f"Error: The file '{index_path}' does not exist.")
+        except Exception as e:
+            print(f"An error occurred while loading the index: {e}")
+
+    @staticmethod
+    def run_search_engine(index_path=None):
+        """
+        Runs the search engine application, handling user input and actions. With
+        index_path, that saved index is opened before the menu is first shown.
+        """
+        search_engine = BasicSearchEngine(positional=True)
         folder_path = "web_pages"  
+        if index_path:
+            SearchEngineUtils.load_index(search_engine, index_path)
+        else:
+            index_path = "search_index.bin"
 
         while True:
             SearchEngineUtils.display_menu()
@@ -42,9 +67,81 @@ class SearchEngineUtils:
                 if not search_engine.index:
                     print("Please index web pages first (Option 1).")
                     continue
-                search_engine.view_file_content()
+                query = input("Enter search query: ").strip()
+                if not query:
+                    print("Empty query. Please enter valid search terms.")
+                    continue
+                results = search_engine.ranked_search(query)
+                search_engine.display_ranked_results(results, query)
 
             elif choice == "4":
+                if not search_engine.index:
+                    print("Please index web pages first (Option 1).")
+                    continue
+                query = input("Enter boolean query (e.g. python AND (html OR css) AND NOT java): ").strip()
+                if not query:
+                    print("Empty query. Please enter valid search terms.")
+                    continue
+                try:
+                    matches = search_engine.boolean_search(query)
+                except ValueError as e:
+                    print(f"Invalid query: {e}")
+                    continue
+                search_engine.display_boolean_results(matches, query)
+
+            elif choice == "5":
+                if not search_engine.index:
+                    print("Please index web pages first (Option 1).")
+                    continue
+                query = input("Enter phrase (add ~N to match the words within N words): ").strip()
+                if not query:
+                    print("Empty query. Please enter valid search terms.")
+                    continue
+                phrase, distance = query_parser.parse_phrase_query(query)
+                try:
+                    results = search_engine.phrase_search(phrase, distance)
+                except ValueError as e:
+                    print(f"Error: {e}")
+                    continue
+                search_engine.display_phrase_results(results, query)
+
+            elif choice == "6":
+                if not search_engine.index:
+                    print("Please index web pages first (Option 1).")
+                    continue
+                search_engine.view_file_content()
+
+            elif choice == "7":
+                if not search_engine.index:
+                    print("Please index web pages first (Option 1).")
+                    continue
+                path = input(f"Enter the file to save the index to (default: '{index_path}'): ").strip()
+                if path:
+                    index_path = path
+                try:
+                    search_engine.save_index(index_path)
+                    print(f"Index saved to '{index_path}'.")
+                except Exception as e:
+                    print(f"An error occurred while saving the index: {e}")
+
+            elif choice == "8":
+                path = input(f"Enter the index file to load (default: '{index_path}'): ").strip()
+                if path:
+                    index_path = path
+                SearchEngineUtils.load_index(search_engine, index_path)
+
+            elif choice == "9":
+                print()
+                print(instrumentation.format_stats(search_engine.statistics()) or "No statistics recorded yet.")
+                path = input("Enter a file to export the statistics to as JSON (leave empty to skip): ").strip()
+                if path:
+                    try:
+                        search_engine.export_statistics(path)
+                        print(f"Statistics exported to '{path}'.")
+                    except Exception as e:
+                        print(f"An error occurred while exporting the statistics: {e}")
+
+            elif choice == "10":
                 print("Exiting search engine. Goodbye!")
                 break
 
@@ -1,11 +1,15 @@
-import tkinter as tk
-from search_engine_GUI import SearchEngineGUI
+import argparse
 
 def main():
+    parser = argparse.ArgumentParser(description="Basic Search Engine (GUI version).")
+    parser.add_argument("--index", help="a saved index file to open at launch, so searches can start right away")
+    args = parser.parse_args()
+    # tkinter and the engine are only imported once the arguments are known to be valid.
+    import tkinter as tk
+    from search_engine_GUI import SearchEngineGUI
     root = tk.Tk()
-    app = SearchEngineGUI(root)
+    app = SearchEngineGUI(root, index_path=args.index)
     root.mainloop()
 
 if __name__ == "__main__":
     main()
-
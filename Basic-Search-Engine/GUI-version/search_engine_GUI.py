@@ -1,7 +1,53 @@
 import os
+import queue
+import threading
+import time
 import tkinter as tk
+from bisect import bisect_right
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 import search_engine as se
+from search_core import instrumentation, query_parser, tokenizer
+from search_core.term_dictionary import has_wildcards
+
+class ResultPages:
+    """
+    The lines of a result listing, formatted only when their page is shown. A
+    listing is made of sections: an optional title line followed by a sequence of
+    rows and the function that turns one row into a line. Rendering a page costs
+    the same however many results there are.
+    """
+    def __init__(self, sections: list):
+        self.sections = sections
+        self.offsets = []
+        total = 0
+        for title, rows, _ in sections:
+            self.offsets.append(total)
+            total += (title is not None) + len(rows)
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def lines(self, start: int, stop: int) -> list:
+        """Formats the lines in [start, stop)."""
+        lines = []
+        section = bisect_right(self.offsets, start) - 1
+        position = start
+        while position < min(stop, self.total):
+            title, rows, format_row = self.sections[section]
+            local = position - self.offsets[section]
+            if title is not None:
+                if local == 0:
+                    lines.append(title)
+                    position += 1
+                    continue
+                local -= 1
+            if local < len(rows):
+                lines.append(format_row(rows[local]))
+                position += 1
+            else:
+                section += 1
+        return lines
 
 class SearchEngineGUI:
     PADDING_X = 60
@@ -11,15 +57,35 @@ class SearchEngineGUI:
     FONT_SIZE_BUTTON = 18
     FONT_SIZE_ENTRY = 18
     FONT_SIZE_RESULTS = 18
-
-    def __init__(self, root):
+    RANKED_RESULTS = 20
+    FUZZY_DISTANCE = 2
+    POLL_INTERVAL_MS = 100
+    PAGE_SIZE = 100
+    LOAD_MORE_AT = 0.9
+    STATS_REFRESH_MS = 1000
+    SEARCH_MODES = ("Per word", "Fuzzy", "Ranked (BM25)", "Boolean", "Phrase")
+    # Wrap the matched words of a snippet until the page is rendered, where they are tagged instead.
+    HIGHLIGHT_START = "\x02"
+    HIGHLIGHT_END = "\x03"
+
+    def __init__(self, root, index_path=None):
         self.root = root
         self.root.title("Basic Search Engine")
         self.root.attributes('-fullscreen', True)  
         self.root.bind("<Escape>", self.toggle_fullscreen)  
-        self.search_engine = se.BasicSearchEngine()
+        self.search_engine = se.BasicSearchEngine(positional=True)
         self.folder_path = ""
+        self.indexing_thread = None
+        self.indexing_queue = queue.Queue()
+        self.cancel_indexing = threading.Event()
+        self.result_pages = None
+        self.page = 0
+        self.file_chunks = None
+        self.loading_chunk = False
         self.create_widgets()
+        if index_path:
+            # Opened from the event loop, so the window shows up before the index is read.
+            self.root.after_idle(self.open_index, index_path)
 
     def create_widgets(self):
         style = ttk.Style()
@@ -38,7 +104,35 @@ class SearchEngineGUI:
             style="Custom.TButton",
             width=self.BUTTON_WIDTH
         )
-        self.index_button.pack(padx=20, pady=self.PADDING_Y)
+        self.index_button.pack(side=tk.LEFT, padx=20, pady=self.PADDING_Y)
+
+        self.save_index_button = ttk.Button(
+            index_frame,
+            text="Save Index",
+            command=self.save_index,
+            style="Custom.TButton",
+            width=self.BUTTON_WIDTH,
+            state='disabled'
+        )
+        self.save_index_button.pack(side=tk.LEFT, padx=20, pady=self.PADDING_Y)
+
+        self.load_index_button = ttk.Button(
+            index_frame,
+            text="Load Index",
+            command=self.load_index,
+            style="Custom.TButton",
+            width=self.BUTTON_WIDTH
+        )
+        self.load_index_button.pack(side=tk.LEFT, padx=20, pady=self.PADDING_Y)
+
+        self.stats_button = ttk.Button(
+            index_frame,
+            text="Statistics",
+            command=self.show_statistics,
+            style="Custom.TButton",
+            width=self.BUTTON_WIDTH
+        )
+        self.stats_button.pack(side=tk.LEFT, padx=20, pady=self.PADDING_Y)
 
         search_frame = ttk.LabelFrame(self.root, text="Search", style="Custom.TLabelframe")
         search_frame.pack(fill="x", padx=self.PADDING_X, pady=self.PADDING_Y)
@@ -58,6 +152,17 @@ class SearchEngineGUI:
         )
         self.search_button.pack(side=tk.LEFT, padx=20, pady=self.PADDING_Y)
 
+        self.search_mode = tk.StringVar(value=self.SEARCH_MODES[0])
+        self.search_mode_box = ttk.Combobox(
+            search_frame,
+            textvariable=self.search_mode,
+            values=self.SEARCH_MODES,
+            state='readonly',
+            width=15,
+            font=("Arial", self.FONT_SIZE_ENTRY)
+        )
+        self.search_mode_box.pack(side=tk.LEFT, padx=20, pady=self.PADDING_Y)
+
         results_frame = ttk.LabelFrame(self.root, text="Search Results", style="Custom.TLabelframe")
         results_frame.pack(fill="x", expand=True, padx=self.PADDING_X, pady=self.PADDING_Y)
 
@@ -69,6 +174,22 @@ class SearchEngineGUI:
             height=15
         )
         self.results_text.pack(fill="both", padx=60, pady=self.PADDING_Y)  
+        self.results_text.config(yscrollcommand=self.on_results_scroll)
+        self.results_text.tag_configure("highlight", background="#fff2a8",
+                                        font=("Arial", self.FONT_SIZE_RESULTS, "bold"))
+
+        pager_frame = ttk.Frame(results_frame)
+        pager_frame.pack(pady=(0, self.PADDING_Y))
+        self.previous_page_button = ttk.Button(
+            pager_frame, text="< Previous", command=lambda: self.show_page(self.page - 1), state='disabled'
+        )
+        self.previous_page_button.pack(side=tk.LEFT, padx=10)
+        self.page_label = ttk.Label(pager_frame, text="", style="Custom.TLabel")
+        self.page_label.pack(side=tk.LEFT, padx=10)
+        self.next_page_button = ttk.Button(
+            pager_frame, text="Next >", command=lambda: self.show_page(self.page + 1), state='disabled'
+        )
+        self.next_page_button.pack(side=tk.LEFT, padx=10)
 
         view_frame = ttk.LabelFrame(self.root, text="View File Content", style="Custom.TLabelframe")
         view_frame.pack(fill="x", padx=self.PADDING_X, pady=self.PADDING_Y)
@@ -93,6 +214,13 @@ class SearchEngineGUI:
         self.root.attributes('-fullscreen', not current_state)
 
     def index_web_pages(self):
+        """
+        Indexes the selected folder on a background thread. Progress is passed back
+        through a queue that the Tk event loop polls, and searches keep using the
+        previous index until the new one is applied.
+        """
+        if self.indexing_thread is not None:
+            return
         folder_selected = filedialog.askdirectory(title="Select Folder to Index")
         if folder_selected:
             self.folder_path = folder_selected
@@ -102,26 +230,119 @@ class SearchEngineGUI:
             self.result_message_frame = tk.Frame(self.root)
             self.result_message_frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER) 
             
-            result_label = ttk.Label(
+            self.result_label = ttk.Label(
                 self.result_message_frame, 
                 text=f"Indexing files in '{self.folder_path}'...", 
                 font=("Arial", self.FONT_SIZE_LABEL)
             )
-            result_label.pack(padx=25, pady=25)
-            self.root.update_idletasks() 
+            self.result_label.pack(padx=25, pady=25)
+            self.result_button = ttk.Button(
+                self.result_message_frame,
+                text="Cancel",
+                command=self.cancel_index
+            )
+            self.result_button.pack(pady=10)
+            self.index_button.config(state='disabled')
+            self.load_index_button.config(state='disabled')
+
+            self.cancel_indexing.clear()
+            self.indexing_started = time.perf_counter()
+            self.indexing_thread = threading.Thread(
+                target=self.run_indexing, args=(self.folder_path,), daemon=True
+            )
+            self.indexing_thread.start()
+            self.root.after(self.POLL_INTERVAL_MS, self.poll_indexing)
+
+    def run_indexing(self, folder_path):
+        """Runs on the indexing thread; only talks to the GUI through the queue."""
+        try:
+            indexed = self.search_engine.index_files(
+                folder_path,
+                progress=lambda *progress: self.indexing_queue.put(("progress", progress)),
+                cancel=self.cancel_indexing
+            )
+            self.indexing_queue.put(("done", indexed))
+        except Exception as e:
+            self.indexing_queue.put(("error", str(e)))
+
+    def poll_indexing(self):
+        """Applies the messages queued by the indexing thread to the GUI."""
+        while True:
             try:
-                self.search_engine.index_files(self.folder_path)
-                indexed_file_count = len(self.search_engine.indexed_files)  
-                result_label.config(text=f"Successfully indexed {indexed_file_count} files.")
-                self.view_button.config(state='normal')  
-            except Exception as e:
-                result_label.config(text=f"An error occurred: {str(e)}")
-            close_button = ttk.Button(
-                self.result_message_frame, 
-                text="Close", 
-                command=self.close_result_message
+                kind, payload = self.indexing_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                done, total, read = payload
+                elapsed = max(time.perf_counter() - self.indexing_started, 1e-9)
+                megabytes = read / (1024 * 1024)
+                self.result_label.config(
+                    text=f"Indexed {done}/{total} files, {megabytes:.1f} MB ({megabytes / elapsed:.1f} MB/s)"
+                )
+            else:
+                self.finish_indexing(kind, payload)
+                return
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_indexing)
+
+    def finish_indexing(self, kind, payload):
+        self.indexing_thread = None
+        self.index_button.config(state='normal')
+        self.load_index_button.config(state='normal')
+        if kind == "error":
+            self.result_label.config(text=f"An error occurred: {payload}")
+        elif not payload and self.cancel_indexing.is_set():
+            self.result_label.config(text="Indexing cancelled. The previous index is still in use.")
+        elif not payload:
+            # index_files returns False when the folder is missing or could not be indexed.
+            self.result_label.config(
+                text=f"Could not index the files in '{self.folder_path}'. The previous index is still in use."
             )
-            close_button.pack(pady=10)
+        else:
+            indexed_file_count = len(self.search_engine.indexed_files)
+            self.result_label.config(text=f"Successfully indexed {indexed_file_count} files.")
+        if self.search_engine.indexed_files:
+            self.view_button.config(state='normal')
+            self.save_index_button.config(state='normal')
+        self.result_button.config(text="Close", command=self.close_result_message)
+
+    def cancel_index(self):
+        """Asks the indexing thread to stop after the current shard of files."""
+        self.cancel_indexing.set()
+        self.result_label.config(text="Cancelling...")
+
+    def save_index(self):
+        """Save the current index to a file chosen by the user."""
+        path = filedialog.asksaveasfilename(
+            title="Save Index",
+            defaultextension=".bin",
+            filetypes=[("Index files", "*.bin"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            self.search_engine.save_index(path)
+            self.status.config(text=f"Index saved to '{path}'.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while saving the index: {e}")
+
+    def load_index(self):
+        """Load a previously saved index instead of re-indexing the folder."""
+        path = filedialog.askopenfilename(
+            title="Load Index",
+            filetypes=[("Index files", "*.bin"), ("All files", "*.*")]
+        )
+        if path:
+            self.open_index(path)
+
+    def open_index(self, path):
+        """Load the saved index at path."""
+        try:
+            self.search_engine.load_index(path)
+            self.status.config(text=f"Loaded index of {len(self.search_engine.indexed_files)} files from '{path}'.")
+            self.view_button.config(state='normal')
+            self.save_index_button.config(state='normal')
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while loading the index: {e}")
 
     def close_result_message(self):
         """Close the result message frame."""
@@ -138,23 +359,119 @@ class SearchEngineGUI:
         self.status.config(text=f"Searching for '{query}'...")
         self.root.update_idletasks()
 
-        results = self.search_engine.search(query)
-        self.display_search_results(results, query)
+        mode = self.search_mode.get()
+        if mode == "Ranked (BM25)":
+            ranked_results = self.search_engine.ranked_search(query, k=self.RANKED_RESULTS)
+            self.display_ranked_results(ranked_results, query)
+        elif mode == "Boolean":
+            try:
+                matches = self.search_engine.boolean_search(query)
+            except ValueError as e:
+                messagebox.showwarning("Invalid Query", str(e))
+                self.status.config(text=f"Invalid query '{query}'.")
+                return
+            self.display_boolean_results(matches, query)
+        elif mode == "Phrase":
+            phrase, distance = query_parser.parse_phrase_query(query)
+            try:
+                phrase_results = self.search_engine.phrase_search(phrase, distance)
+            except ValueError as e:
+                messagebox.showwarning("Invalid Query", str(e))
+                self.status.config(text=f"Invalid query '{query}'.")
+                return
+            self.display_phrase_results(phrase_results, query)
+        else:
+            max_distance = self.FUZZY_DISTANCE if mode == "Fuzzy" else 0
+            results = self.search_engine.search(query, max_distance=max_distance)
+            self.display_search_results(results, query, max_distance)
 
         self.status.config(text=f"Search completed for '{query}'.")
 
-    def display_search_results(self, sorted_results: dict, query: str):
-        self.results_text.config(state='normal')
-        self.results_text.delete(1.0, tk.END)
-        missing_words = [word for word in query.split() if word not in sorted_results]
-        if missing_words:
-            for word in missing_words:
-                self.results_text.insert(tk.END, f"No results found for '{word}'.\n")
+    def display_search_results(self, sorted_results: dict, query: str, max_distance: int = 0):
+        analyzer = self.search_engine.analyzer
+        missing_words = []
+        for word in tokenizer.tokenize_query(query, analyzer.lowercase):
+            # Look words up the way the engine indexed them; stopwords are never missing.
+            term = word if has_wildcards(word) else analyzer.term(word)
+            if term is not None and not self.search_engine.expand_term(term, max_distance):
+                missing_words.append(word)
+        sections = [(f"No results found for '{word}'.", (), str) for word in missing_words]
         for word, word_info_list in sorted_results.items():
-            self.results_text.insert(tk.END, f"\nSearch results for '{word}':\n\n")
-            for wi in word_info_list:
-                self.results_text.insert(tk.END, f"{wi}\n")
-        self.results_text.config(state='disabled')
+            sections.append((f"\nSearch results for '{word}':\n", word_info_list,
+                             lambda info, word=word: self.with_snippet(str(info), info.file_name, query, [word])))
+        self.show_results(ResultPages(sections))
+
+    def display_ranked_results(self, ranked_results: list, query: str):
+        if not ranked_results:
+            sections = [(f"No results found for '{query}'.", (), str)]
+        else:
+            rows = list(enumerate(ranked_results, start=1))
+            sections = [(f"Ranked results for '{query}':\n", rows,
+                         lambda row: self.ranked_line(row[0], row[1][0], row[1][1], query))]
+        self.show_results(ResultPages(sections))
+
+    def ranked_line(self, rank: int, file_name: str, score: float, query: str) -> str:
+        """Formats a ranked result with the number of near-duplicates collapsed into it and its snippet."""
+        duplicates = len(self.search_engine.duplicates(file_name))
+        similar = f" (+{duplicates} near-duplicate{'s' if duplicates > 1 else ''})" if duplicates else ""
+        return self.with_snippet(f"{rank}. {file_name} - {score:.3f}{similar}", file_name, query)
+
+    def display_boolean_results(self, matches: list, query: str):
+        if not matches:
+            sections = [(f"No files match '{query}'.", (), str)]
+        else:
+            words = " ".join(query_parser.query_words(query_parser.parse_query(query)))
+            sections = [(f"{len(matches)} file(s) match '{query}':\n", matches,
+                         lambda file_name: self.with_snippet(file_name, file_name, words))]
+        self.show_results(ResultPages(sections))
+
+    def display_phrase_results(self, phrase_results: list, query: str):
+        if not phrase_results:
+            sections = [(f"No files match '{query}'.", (), str)]
+        else:
+            phrase, _ = query_parser.parse_phrase_query(query)
+            sections = [(f"Phrase results for '{query}':\n", phrase_results,
+                         lambda row: self.with_snippet(f"{row[0]} - {row[1]}", row[0], phrase))]
+        self.show_results(ResultPages(sections))
+
+    def with_snippet(self, line: str, file_name: str, query: str, terms: list = None) -> str:
+        """Adds the snippet of a result under its line; only rows of the shown page are formatted."""
+        snippet = self.search_engine.snippet(file_name, query, terms=terms)
+        if snippet is None or not snippet.text:
+            return line
+        return f"{line}\n    {snippet.marked(self.HIGHLIGHT_START, self.HIGHLIGHT_END)}"
+
+    def insert_highlighted(self, text: str):
+        """Inserts text into the results, tagging the parts between highlight markers."""
+        parts = text.split(self.HIGHLIGHT_START)
+        self.results_text.insert(tk.END, parts[0])
+        for part in parts[1:]:
+            highlighted, _, rest = part.partition(self.HIGHLIGHT_END)
+            self.results_text.insert(tk.END, highlighted, "highlight")
+            self.results_text.insert(tk.END, rest)
+
+    def show_results(self, result_pages: ResultPages):
+        """Shows the first page of a result listing."""
+        self.close_file_chunks()
+        self.result_pages = result_pages
+        self.show_page(0)
+
+    def show_page(self, page: int):
+        """Renders one page of the current result listing; the other lines are never formatted."""
+        if self.result_pages is None:
+            return
+        page_count = max(1, -(-len(self.result_pages) // self.PAGE_SIZE))
+        self.page = min(max(page, 0), page_count - 1)
+        start = self.page * self.PAGE_SIZE
+        stop = min(start + self.PAGE_SIZE, len(self.result_pages))
+        with self.search_engine.instrumentation.timer("render"):
+            self.results_text.config(state='normal')
+            self.results_text.delete(1.0, tk.END)
+            self.insert_highlighted("\n".join(self.result_pages.lines(start, stop)) + "\n")
+            self.results_text.config(state='disabled')
+        self.page_label.config(text=f"Lines {start + 1}-{stop} of {len(self.result_pages)}" if stop else "")
+        self.previous_page_button.config(state='normal' if self.page > 0 else 'disabled')
+        self.next_page_button.config(state='normal' if self.page < page_count - 1 else 'disabled')
 
     def view_file_content(self):
         """
@@ -181,7 +498,8 @@ class SearchEngineGUI:
         listbox = tk.Listbox(list_frame, selectmode=tk.SINGLE, yscrollcommand=scrollbar.set, font=("Arial", self.FONT_SIZE_RESULTS))
         indexed_files = sorted(self.search_engine.indexed_files) 
         for file_path in indexed_files:
-            display_name = os.path.basename(file_path)
+            # Relative to the indexed folder, since pages in subfolders and archives can share a name.
+            display_name = os.path.relpath(file_path, self.folder_path) if self.folder_path else file_path
             listbox.insert(tk.END, display_name)
         listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
@@ -193,15 +511,10 @@ class SearchEngineGUI:
                 messagebox.showwarning("No Selection", "Please select a file to view.")
                 return
             selected_file_display = listbox.get(selected_indices[0])
-            selected_file_full_path = next(
-                (f for f in indexed_files if os.path.basename(f) == selected_file_display), None
-            )
-            if not selected_file_full_path:
-                messagebox.showerror("Error", "Selected file not found.")
-                return
+            selected_file_full_path = indexed_files[selected_indices[0]]
             try:
-                content = self.search_engine.get_file_content(selected_file_full_path)
-                self.show_file_content(selected_file_display, content)
+                chunks = self.search_engine.read_file_chunks(selected_file_full_path)
+                self.show_file_content(selected_file_display, chunks)
                 view_window.destroy()  
             except Exception as e:
                 messagebox.showerror("Error", str(e))
@@ -215,14 +528,102 @@ class SearchEngineGUI:
         close_btn = ttk.Button(buttons_frame, text="Close", command=view_window.destroy, width=10)
         close_btn.pack(side=tk.LEFT, padx=5)
 
-    def show_file_content(self, file_name, content):
+    def show_file_content(self, file_name, chunks):
         """
-        Displays the content of the selected file in the scrolled text widget.
+        Displays the content of the selected file in the scrolled text widget. Only
+        the first chunk is inserted; the next ones are read as the user scrolls
+        towards the end of what is loaded.
         """
+        self.close_file_chunks()
+        self.result_pages = None
+        self.page_label.config(text="")
+        self.previous_page_button.config(state='disabled')
+        self.next_page_button.config(state='disabled')
         self.results_text.config(state='normal') 
         self.results_text.delete(1.0, tk.END)  
         self.results_text.insert(tk.END, f"--- Content of '{file_name}' ---\n\n")
-        self.results_text.insert(tk.END, content)
-        self.results_text.insert(tk.END, "\n--- End of File ---")
-        self.results_text.config(state='disabled')  
+        self.results_text.config(state='disabled')
+        self.file_chunks = chunks
+        self.load_next_chunk()
+
+    def load_next_chunk(self):
+        """Appends the next chunk of the file being viewed."""
+        self.loading_chunk = False
+        if self.file_chunks is None:
+            return
+        try:
+            text = next(self.file_chunks, None)
+        except Exception as e:
+            text = f"\nAn error occurred while reading the file: {e}"
+            self.close_file_chunks()
+        self.results_text.config(state='normal')
+        if text is None:
+            self.results_text.insert(tk.END, "\n--- End of File ---")
+            self.close_file_chunks()
+        else:
+            self.results_text.insert(tk.END, text)
+        self.results_text.config(state='disabled')
+
+    def on_results_scroll(self, first, last):
+        """Keeps the scrollbar in step and loads more of the viewed file near the end."""
+        self.results_text.vbar.set(first, last)
+        if self.file_chunks is not None and not self.loading_chunk and float(last) >= self.LOAD_MORE_AT:
+            self.loading_chunk = True
+            self.root.after_idle(self.load_next_chunk)
+
+    def close_file_chunks(self):
+        if self.file_chunks is not None:
+            self.file_chunks.close()
+            self.file_chunks = None
+
+    def show_statistics(self):
+        """
+        Opens a panel with the engine's stage timers, counters and query latency
+        percentiles, refreshed while it is open.
+        """
+        stats_window = tk.Toplevel(self.root)
+        stats_window.title("Statistics")
+        stats_window.geometry("800x600")
+
+        stats_text = scrolledtext.ScrolledText(stats_window, wrap=tk.NONE, font=("Courier", 12), state='disabled')
+        stats_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        def render():
+            report = instrumentation.format_stats(self.search_engine.statistics())
+            stats_text.config(state='normal')
+            stats_text.delete(1.0, tk.END)
+            stats_text.insert(tk.END, report or "No statistics recorded yet.")
+            stats_text.config(state='disabled')
+
+        def refresh():
+            # Reschedules itself. Reset only renders, so clicking it does not start another loop.
+            if not stats_window.winfo_exists():
+                return
+            render()
+            self.root.after(self.STATS_REFRESH_MS, refresh)
+
+        def export():
+            path = filedialog.asksaveasfilename(
+                parent=stats_window,
+                title="Export Statistics",
+                defaultextension=".json",
+                filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            )
+            if not path:
+                return
+            try:
+                self.search_engine.export_statistics(path)
+                self.status.config(text=f"Statistics exported to '{path}'.")
+            except Exception as e:
+                messagebox.showerror("Error", f"An error occurred while exporting the statistics: {e}")
+
+        def reset():
+            self.search_engine.instrumentation.reset()
+            render()
 
+        buttons_frame = ttk.Frame(stats_window)
+        buttons_frame.pack(pady=10)
+        ttk.Button(buttons_frame, text="Export JSON", command=export, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons_frame, text="Reset", command=reset, width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons_frame, text="Close", command=stats_window.destroy, width=10).pack(side=tk.LEFT, padx=5)
+        refresh()
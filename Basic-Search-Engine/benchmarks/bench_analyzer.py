@@ -0,0 +1,152 @@
+"""
+Analyzer benchmark.
+
+Indexes an English-like synthetic corpus with several analyzer settings and
+reports indexing time, index size (terms, postings, bytes on disk) and ranked
+query latency for each:
+  - plain:    lowercase only, as the engine always tokenized
+  - stop:     English stopwords removed
+  - stem:     stopwords removed and words reduced by the Porter stemmer
+  - bigrams:  as stem, plus every pair of adjacent words as a term
+
+The corpus draws stopwords at the top Zipf ranks, as in real text, and every
+content word in a few inflected forms ("-s", "-ing", "-ed"...), so stopword
+removal and stemming have something to remove.
+
+It also times the analysis step alone, once through the analyzer, which
+analyzes each distinct word once and then looks it up by term id, and once
+analyzing every token from scratch.
+
+Usage:
+    python3 bench_analyzer.py [--pages 3000] [--words 300] [--stems 8000] [--queries 300]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import make_vocabulary, zipf_weights
+from search_core import ENGLISH_STOPWORDS, Analyzer, BasicSearchEngine
+from search_core.analysis import PorterStemmer
+from search_core.tokenizer import tokenize
+
+SUFFIXES = ["", "s", "ing", "ed", "er", "ers", "ation", "ness", "ly"]
+CONFIGS = {
+    "plain": {},
+    "stop": {"stopwords": ENGLISH_STOPWORDS},
+    "stem": {"stopwords": ENGLISH_STOPWORDS, "stemmer": "porter"},
+    "bigrams": {"stopwords": ENGLISH_STOPWORDS, "stemmer": "porter", "ngrams": 2},
+}
+
+
+def generate_english_like(folder_path : str, pages : int, words_per_page : int, stems : int, seed : int = 0) -> list:
+    """
+    Writes pages whose most frequent words are stopwords, followed by inflected
+    forms of pseudo-word stems.
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    rng = random.Random(seed)
+    content = [stem + suffix for stem in make_vocabulary(stems, seed) for suffix in rng.sample(SUFFIXES, 4)]
+    rng.shuffle(content)
+    stopwords = sorted(ENGLISH_STOPWORDS)
+    rng.shuffle(stopwords)
+    vocabulary = stopwords + content
+    cum_weights = zipf_weights(len(vocabulary), 1.0)
+    paths = []
+    for page in range(pages):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=words_per_page)
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        path = os.path.join(folder_path, f"page{page}.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(".\n".join(lines))
+        paths.append(path)
+    return paths
+
+
+def run(name : str, folder : str, queries : list, tmp : str) -> dict:
+    engine = BasicSearchEngine(cache_size=0, analyzer=Analyzer(**CONFIGS[name]))
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        engine.index_files(folder)
+        index_seconds = time.perf_counter() - start
+    path = os.path.join(tmp, f"{name}.idx")
+    engine.save_index(path)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        engine.ranked_search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    stats = engine.statistics()["index"]
+    return {"index_s": index_seconds, "terms": stats["terms"], "postings": stats["postings"],
+            "bytes": os.path.getsize(path), "query_ms": statistics.median(latencies)}
+
+
+def per_token(words : list, stopwords : frozenset, stem) -> int:
+    """Analyzes every token from scratch, without remembering words seen before."""
+    terms = 0
+    for word in words:
+        word = word.lower()
+        if word not in stopwords:
+            stem(word)
+            terms += 1
+    return terms
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=3000, help="pages in the synthetic corpus")
+    parser.add_argument("--words", type=int, default=300, help="words per page")
+    parser.add_argument("--stems", type=int, default=8000, help="distinct stems, each in four inflected forms")
+    parser.add_argument("--queries", type=int, default=300, help="ranked queries timed per analyzer")
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS), help="analyzers to measure")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "corpus")
+        print(f"Generating {args.pages} pages of {args.words} words...")
+        paths = generate_english_like(folder, args.pages, args.words, args.stems)
+        rng = random.Random(0)
+        queries = []
+        for _ in range(args.queries):
+            with open(rng.choice(paths), "r", encoding="utf-8") as file:
+                words = tokenize(file.read())
+            start = rng.randrange(len(words) - 3)
+            queries.append(" ".join(words[start:start + 3]))
+
+        print(f"\n{'analyzer':>9} {'index (s)':>10} {'terms':>8} {'postings':>10} {'file (MB)':>10} {'ranked p50':>11}")
+        baseline = None
+        for name in args.configs:
+            result = run(name, folder, queries, tmp)
+            baseline = baseline or result
+            print(f"{name:>9} {result['index_s']:>10.2f} {result['terms']:>8} {result['postings']:>10} "
+                  f"{result['bytes'] / 1e6:>10.2f} {result['query_ms']:>8.3f} ms"
+                  f"   ({result['bytes'] / baseline['bytes']:.0%} of {args.configs[0]} size)")
+
+        words = []
+        for path in paths[:500]:
+            with open(path, "r", encoding="utf-8") as file:
+                words.extend(tokenize(file.read(), lowercase=False))
+        analyzer = Analyzer(**CONFIGS["stem"])
+        start = time.perf_counter()
+        for _ in analyzer.ids(words):
+            pass
+        memoized = time.perf_counter() - start
+        start = time.perf_counter()
+        per_token(words, ENGLISH_STOPWORDS, PorterStemmer().stem)
+        scratch = time.perf_counter() - start
+        print(f"\nAnalyzing {len(words)} tokens with stopwords and stemming: "
+              f"{len(words) / memoized / 1e6:.2f} M tokens/s with term ids, "
+              f"{len(words) / scratch / 1e6:.2f} M tokens/s per token ({scratch / memoized:.1f}x slower); "
+              f"{len(analyzer.table)} distinct terms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
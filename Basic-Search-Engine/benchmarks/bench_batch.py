@@ -0,0 +1,107 @@
+"""
+Batch scoring benchmark.
+
+Replays a log of ranked queries sampled from a synthetic corpus, once through
+ranked_search one query at a time and once through batch_ranked_search in
+batches of a few sizes, and reports queries per second for each. Building the
+NumPy BM25 matrix is timed on its own, since it is done once per index
+version and then shared by every batch. Every batch ranking is checked
+against ranked_search's: the same scores, with files only differing where
+scores tie at the cut-off.
+
+Usage:
+    python3 bench_batch.py [--pages 5000] [--queries 5000] [--batches 1 100 1000 5000]
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import generate_corpus
+from search_core import BasicSearchEngine, scoring
+from search_core.tokenizer import tokenize
+
+
+def same_ranking(expected : list, actual : list) -> bool:
+    """
+    Scores must match; files may only differ where scores tie at the cut-off.
+    """
+    if len(expected) != len(actual):
+        return False
+    if not all(math.isclose(a[1], b[1], rel_tol=1e-9) for a, b in zip(expected, actual)):
+        return False
+    cutoff = expected[-1][1] if expected else 0.0
+    above = lambda ranking: {name for name, score in ranking if not math.isclose(score, cutoff, rel_tol=1e-9)}
+    return above(expected) == above(actual)
+
+
+def sample_queries(paths : list, count : int, seed : int = 0) -> list:
+    rng = random.Random(seed)
+    words = {}
+    queries = []
+    for _ in range(count):
+        path = rng.choice(paths)
+        if path not in words:
+            with open(path, "r", encoding="utf-8") as file:
+                words[path] = tokenize(file.read())
+        queries.append(" ".join(rng.sample(words[path], rng.randint(1, 3))))
+    return queries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000, help="pages in the synthetic corpus")
+    parser.add_argument("--words", type=int, default=200, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words in the corpus")
+    parser.add_argument("--queries", type=int, default=5000, help="queries in the replayed log")
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 100, 1000, 5000], help="batch sizes to run")
+    parser.add_argument("--k", type=int, default=10, help="results per query")
+    args = parser.parse_args()
+    if scoring.numpy() is None:
+        print("NumPy is not installed; batch_ranked_search would only loop over ranked_search.")
+        return 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.pages} pages of {args.words} words...")
+        paths = generate_corpus(tmp, args.pages, args.words, args.vocabulary, zipf=1.0)
+        queries = sample_queries(paths, args.queries)
+        engine = BasicSearchEngine(cache_size=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.index_files(tmp)
+
+        start = time.perf_counter()
+        expected = [engine.ranked_search(query, args.k) for query in queries]
+        loop_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        matrix = engine.bm25_matrix
+        build_seconds = time.perf_counter() - start
+        print(f"BM25 matrix: {len(matrix.rows)} terms x {matrix.columns} documents, "
+              f"{len(matrix.indices)} weights in {matrix.nbytes / 1e6:.1f} MB, built in {build_seconds:.2f} s\n")
+
+        print(f"{'mode':>14} {'seconds':>8} {'queries/s':>10} {'speedup':>8} {'correct':>8}")
+        print(f"{'loop':>14} {loop_seconds:>8.2f} {len(queries) / loop_seconds:>10.0f} {1.0:>7.1f}x {'-':>8}")
+        failed = False
+        for size in args.batches:
+            results = []
+            start = time.perf_counter()
+            for first in range(0, len(queries), size):
+                results.extend(engine.batch_ranked_search(queries[first:first + size], args.k))
+            seconds = time.perf_counter() - start
+            mismatches = [query for query, want, got in zip(queries, expected, results) if not same_ranking(want, got)]
+            print(f"{'batch ' + str(size):>14} {seconds:>8.2f} {len(queries) / seconds:>10.0f} "
+                  f"{loop_seconds / seconds:>7.1f}x {'yes' if not mismatches else 'NO':>8}")
+            for query in mismatches[:5]:
+                print(f"    mismatch: '{query}'")
+            failed = failed or bool(mismatches)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Crawl and multi-format ingest benchmark.
+
+Writes the same synthetic pages in several layouts and indexes each one:
+  - txt:      flat folder of .txt pages
+  - html:     .html pages with markup, scripts and styles, in nested folders
+  - html.gz:  the HTML pages, gzip-compressed
+  - tar.gz:   the HTML pages packed in a few compressed tar archives
+
+For every layout it reports the indexing time, documents per second and
+megabytes per second, both of the bytes on disk and of the bytes read after
+decompression, markup included. All layouts must yield the same index.
+
+It also times the folder walk alone, with os.scandir as the crawler does and
+with os.walk plus a stat call per path, both keeping only indexable files.
+
+Usage:
+    python3 bench_crawl.py [--pages 3000] [--words 300] [--archives 8]
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import os
+import random
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import make_vocabulary, zipf_weights
+from search_core import BasicSearchEngine
+from search_core.crawler import SourceFile, crawl, document_kind, documents
+
+LAYOUTS = ["txt", "html", "html.gz", "tar.gz"]
+FOLDERS_PER_LEVEL = 8
+
+
+def make_pages(pages : int, words_per_page : int, vocabulary_size : int, seed : int = 0) -> list:
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    cum_weights = zipf_weights(len(vocabulary), 1.0)
+    return [" ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=words_per_page)) for _ in range(pages)]
+
+
+def as_html(page : int, text : str) -> str:
+    return (f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">\n"
+            f"<style>body {{ font-family: serif; }} .nav {{ color: #333; }}</style>\n"
+            f"<script>var page = {page}; function track() {{ return page * 2; }}</script></head>\n"
+            f"<body><div class=\"nav\"><a href=\"/\">&nbsp;</a></div>\n<p>{text}</p>\n</body></html>\n")
+
+
+def nested_path(folder : str, page : int, name : str) -> str:
+    """Spreads pages over two levels of sub-folders."""
+    sub = os.path.join(folder, f"d{page % FOLDERS_PER_LEVEL}", f"d{page // FOLDERS_PER_LEVEL % FOLDERS_PER_LEVEL}")
+    os.makedirs(sub, exist_ok=True)
+    return os.path.join(sub, name)
+
+
+def write_layout(layout : str, folder : str, texts : list, archives : int) -> None:
+    os.makedirs(folder, exist_ok=True)
+    if layout == "txt":
+        for page, text in enumerate(texts):
+            with open(os.path.join(folder, f"page{page}.txt"), "w", encoding="utf-8") as file:
+                file.write(text)
+    elif layout == "html":
+        for page, text in enumerate(texts):
+            with open(nested_path(folder, page, f"page{page}.html"), "w", encoding="utf-8") as file:
+                file.write(as_html(page, text))
+    elif layout == "html.gz":
+        for page, text in enumerate(texts):
+            with gzip.open(nested_path(folder, page, f"page{page}.html.gz"), "wt", encoding="utf-8") as file:
+                file.write(as_html(page, text))
+    else:
+        for number in range(archives):
+            with tarfile.open(os.path.join(folder, f"dump{number}.tar.gz"), "w:gz") as archive:
+                for page in range(number, len(texts), archives):
+                    data = as_html(page, texts[page]).encode("utf-8")
+                    member = tarfile.TarInfo(f"site/section{page % FOLDERS_PER_LEVEL}/page{page}.html")
+                    member.size = len(data)
+                    archive.addfile(member, io.BytesIO(data))
+
+
+def disk_bytes(folder : str) -> int:
+    return sum(source.size for source in crawl(folder))
+
+
+def decompressed_bytes(folder : str) -> int:
+    total = 0
+    for source in crawl(folder):
+        for document in documents(source.path):
+            with document.open() as stream:
+                total += len(stream.read())
+    return total
+
+
+def walk_with_stat(folder : str) -> int:
+    """Finds the same files as crawl with os.walk and a stat call per path."""
+    files = []
+    for root, folders, names in os.walk(folder):
+        folders.sort()
+        for name in sorted(names):
+            if document_kind(name) is not None:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files.append(SourceFile(path, stat.st_mtime, stat.st_size))
+    return len(files)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=3000, help="pages in the synthetic corpus")
+    parser.add_argument("--words", type=int, default=300, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words in the corpus")
+    parser.add_argument("--archives", type=int, default=8, help="tar archives the tar.gz layout is split into")
+    parser.add_argument("--workers", type=int, default=1, help="indexing processes")
+    args = parser.parse_args()
+
+    texts = make_pages(args.pages, args.words, args.vocabulary)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Writing {args.pages} pages of {args.words} words in {len(LAYOUTS)} layouts...")
+        print(f"\n{'layout':>8} {'files':>6} {'disk (MB)':>10} {'index (s)':>10} {'docs/s':>8} "
+              f"{'disk MB/s':>10} {'read MB/s':>10} {'same index':>11}")
+        reference = None
+        for layout in LAYOUTS:
+            folder = os.path.join(tmp, layout)
+            write_layout(layout, folder, texts, args.archives)
+            engine = BasicSearchEngine(cache_size=0, workers=args.workers)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                engine.index_files(folder)
+                seconds = time.perf_counter() - start
+            documents = len(engine.manifest)
+            files = len({key.split("::", 1)[0] for key in engine.manifest})
+            shape = sorted(sorted(posting.count for posting in postings) for postings in engine.index.values())
+            reference = reference or shape
+            on_disk = disk_bytes(folder) / 1e6
+            read = decompressed_bytes(folder) / 1e6
+            print(f"{layout:>8} {files:>6} {on_disk:>10.2f} {seconds:>10.2f} {documents / seconds:>8.0f} "
+                  f"{on_disk / seconds:>10.2f} {read / seconds:>10.2f} {'yes' if shape == reference else 'NO':>11}")
+
+        folder = os.path.join(tmp, "html.gz")
+        print()
+        for name, walk in (("os.scandir (crawl)", lambda: sum(1 for _ in crawl(folder))),
+                           ("os.walk + os.stat", lambda: walk_with_stat(folder))):
+            best = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                files = walk()
+                best = min(best, time.perf_counter() - start)
+            print(f"Walking {files} files in nested folders with {name}: {best * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
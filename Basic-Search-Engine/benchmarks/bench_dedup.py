@@ -0,0 +1,150 @@
+"""
+Near-duplicate detection benchmark.
+
+Writes a corpus in which some pages come in groups of near-copies, as mirrored
+or templated pages do: every copy of a page has a few of its words replaced
+and a different header line. It indexes the corpus without and with the
+MinHash near-duplicate stage and reports, for each:
+  - indexing time and the time spent computing signatures
+  - documents, terms and postings in the index
+  - the time to save the index and the size of the file
+  - ranked query latency
+
+It also checks the collapsed documents against the groups the corpus was
+written with (precision and recall) and counts the signature comparisons the
+LSH buckets led to, against comparing every pair of documents.
+
+Usage:
+    python3 bench_dedup.py [--pages 3000] [--words 300] [--duplicated 0.3] [--copies 3] [--edits 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import make_vocabulary, zipf_weights
+from search_core import BasicSearchEngine, Deduplicator
+
+
+def write_corpus(folder : str, pages : int, words : int, duplicated : float, copies : int, edits : int,
+                 vocabulary : list, seed : int = 0) -> dict:
+    """
+    Writes the pages and returns the page each near-copy was made from.
+    """
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    cum_weights = zipf_weights(len(vocabulary), 1.0)
+    originals = {}
+    written = 0
+    while written < pages:
+        text = rng.choices(vocabulary, cum_weights=cum_weights, k=words)
+        name = os.path.join(folder, f"page{written:06d}.txt")
+        with open(name, "w", encoding="utf-8") as file:
+            file.write(" ".join(text))
+        written += 1
+        if rng.random() >= duplicated:
+            continue
+        for copy in range(copies):
+            if written == pages:
+                break
+            changed = list(text)
+            for _ in range(edits):
+                changed[rng.randrange(words)] = rng.choice(vocabulary)
+            copy_name = os.path.join(folder, f"page{written:06d}.txt")
+            with open(copy_name, "w", encoding="utf-8") as file:
+                file.write(f"mirror {copy} updated {rng.randrange(10000)}\n" + " ".join(changed))
+            originals[copy_name] = name
+            written += 1
+    return originals
+
+
+def run(folder : str, dedup, queries : list) -> dict:
+    engine = BasicSearchEngine(cache_size=0, dedup=dedup)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        engine.index_files(folder)
+        seconds = time.perf_counter() - start
+    stats = engine.statistics()
+    path = os.path.join(folder, "..", "index.bin")
+    start = time.perf_counter()
+    engine.save_index(path)
+    save_seconds = time.perf_counter() - start
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        engine.ranked_search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "engine": engine,
+        "seconds": seconds,
+        "signature": stats["stages"].get("index.signature", {}).get("total_ms", 0.0) / 1000,
+        "index": stats["index"],
+        "save": save_seconds,
+        "bytes": os.path.getsize(path),
+        "p50": statistics.median(latencies),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=3000, help="pages in the corpus, near-copies included")
+    parser.add_argument("--words", type=int, default=300, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words in the corpus")
+    parser.add_argument("--duplicated", type=float, default=0.3, help="share of pages that get near-copies")
+    parser.add_argument("--copies", type=int, default=3, help="near-copies of each duplicated page")
+    parser.add_argument("--edits", type=int, default=5, help="words replaced in each near-copy")
+    parser.add_argument("--threshold", type=float, default=Deduplicator.THRESHOLD, help="similarity threshold")
+    parser.add_argument("--queries", type=int, default=300, help="ranked queries timed")
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(args.vocabulary)
+    rng = random.Random(1)
+    queries = [" ".join(rng.sample(vocabulary[:2000], 2)) for _ in range(args.queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "pages")
+        originals = write_corpus(folder, args.pages, args.words, args.duplicated, args.copies, args.edits,
+                                 vocabulary)
+        print(f"{args.pages} pages, {len(originals)} of them near-copies with {args.edits} words changed\n")
+        print(f"{'dedup':>6} {'index (s)':>10} {'signatures (s)':>15} {'documents':>10} {'collapsed':>10} "
+              f"{'terms':>8} {'postings':>10} {'save (s)':>9} {'file (MB)':>10} {'ranked p50':>11}")
+        results = {}
+        for name, dedup in (("off", None), ("on", Deduplicator(args.threshold))):
+            result = results[name] = run(folder, dedup, queries)
+            index = result["index"]
+            print(f"{name:>6} {result['seconds']:>10.2f} {result['signature']:>15.2f} {index['documents']:>10} "
+                  f"{index['duplicates']:>10} {index['terms']:>8} {index['postings']:>10} {result['save']:>9.2f} "
+                  f"{result['bytes'] / 1e6:>10.2f} {result['p50']:>8.3f} ms")
+
+        off, on = results["off"], results["on"]
+        saving = lambda key: 1 - on[key] / off[key]
+        print(f"\nSavings: {1 - on['index']['postings'] / off['index']['postings']:.1%} of the postings, "
+              f"{saving('bytes'):.1%} of the index file, {saving('save'):.1%} of the save time, "
+              f"{saving('p50'):.1%} of the ranked query time and {saving('seconds'):.1%} of the indexing "
+              f"time ({on['signature']:.2f} s of which went to signatures).")
+
+        # Copies of the same page are near-duplicates of one another too, so a copy
+        # collapsed into a sibling copy rather than the original still counts.
+        engine = on["engine"]
+        group = lambda file_name: originals.get(file_name, file_name)
+        collapsed = {file_name: record.canonical for file_name, record in engine.manifest.items()
+                     if record.canonical is not None}
+        correct = sum(1 for file_name, canonical in collapsed.items() if group(file_name) == group(canonical))
+        precision = correct / len(collapsed) if collapsed else 1.0
+        recall = correct / len(originals) if originals else 1.0
+        print(f"Precision {precision:.3f}, recall {recall:.3f} against the near-copies written.")
+        documents = len(engine.manifest)
+        comparisons = engine.statistics()["counters"].get("dedup_comparisons", 0)
+        print(f"LSH compared {comparisons} pairs of signatures; comparing every pair takes "
+              f"{documents * (documents - 1) // 2}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Indexing regression benchmark.
+
+Indexes pages of growing size with the current single-pass indexer and with the
+previous per-word ``content.count`` indexer, then reports how indexing time grows
+with corpus size. The run fails if the current indexer stops scaling near-linearly.
+
+Usage:
+    python3 bench_indexing.py [--sizes 2000 4000 8000 16000] [--max-exponent 1.3]
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import generate_corpus
+from search_core import BasicSearchEngine, WordInfo
+
+
+def legacy_index_files(index : dict, folder_path : str) -> None:
+    """The indexing loop before the single-pass rewrite, kept as the baseline."""
+    files = [os.path.join(folder_path, file) for file in os.listdir(folder_path) if file.endswith(".txt")]
+    for file_name in files:
+        with open(file_name, "r", encoding='utf-8') as file:
+            content = re.findall(r'\b\w+\b', file.read().lower())
+            for word in set(content):
+                index.setdefault(word, []).append(WordInfo(file_name, content.count(word)))
+
+
+def time_current(folder_path : str) -> float:
+    engine = BasicSearchEngine()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.index_files(folder_path)
+    return time.perf_counter() - start
+
+
+def time_legacy(folder_path : str) -> float:
+    start = time.perf_counter()
+    legacy_index_files({}, folder_path)
+    return time.perf_counter() - start
+
+
+def scaling_exponent(sizes : list, timings : list) -> float:
+    """Slope of log(time) against log(size) between the smallest and largest run."""
+    return math.log(timings[-1] / timings[0]) / math.log(sizes[-1] / sizes[0])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 4000, 8000, 16000],
+                        help="words per page for each run")
+    parser.add_argument("--pages", type=int, default=4, help="pages per corpus")
+    parser.add_argument("--vocabulary", type=int, default=5000, help="distinct words in the corpus")
+    parser.add_argument("--max-exponent", type=float, default=1.3,
+                        help="fail if the current indexer grows faster than size ** max_exponent")
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the current indexer")
+    args = parser.parse_args()
+
+    current, legacy = [], []
+    print(f"{'words/page':>10} {'current (s)':>12} {'legacy (s)':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            folder = os.path.join(tmp, str(size))
+            generate_corpus(folder, args.pages, size, args.vocabulary)
+            current.append(time_current(folder))
+            if args.skip_legacy:
+                print(f"{size:>10} {current[-1]:>12.4f}")
+                continue
+            legacy.append(time_legacy(folder))
+            print(f"{size:>10} {current[-1]:>12.4f} {legacy[-1]:>12.4f} {legacy[-1] / current[-1]:>7.1f}x")
+
+    exponent = scaling_exponent(args.sizes, current)
+    print(f"\ncurrent indexer scaling exponent: {exponent:.2f}")
+    if legacy:
+        print(f"legacy indexer scaling exponent:  {scaling_exponent(args.sizes, legacy):.2f}")
+    if exponent > args.max_exponent:
+        print(f"Regression: indexing time grows faster than size ** {args.max_exponent}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Incremental ingest benchmark.
+
+Adds a synthetic corpus to the index one batch of pages at a time and reports
+how long each batch takes as the index grows, for the storage backends:
+  - memory:  the index stays in a dict (nothing is written)
+  - segment: SegmentStorage, which rewrites its single segment file after every batch
+  - lsm:     LogStructuredStorage, which writes every batch to a new small segment
+             and merges segments in the background
+
+With a persistent backend that rewrites the whole index, the batch time grows
+with the index; with the log-structured one it should stay flat. Query latency
+is measured at the end, over however many segments are left.
+
+Usage:
+    python3 bench_ingest.py [--batches 50] [--batch-pages 200] [--backends memory segment lsm]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import generate_corpus, make_vocabulary
+from search_core import BasicSearchEngine, LogStructuredStorage, MemoryStorage, SegmentStorage
+
+
+def make_storage(backend : str, root : str):
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "segment":
+        return SegmentStorage(os.path.join(root, "index.bin"))
+    return LogStructuredStorage(os.path.join(root, "segments"))
+
+
+def run(backend : str, batches : list, root : str, queries : list) -> dict:
+    engine = BasicSearchEngine(storage=make_storage(backend, root), cache_size=0)
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for folder in batches:
+            start = time.perf_counter()
+            engine.index_files(folder)
+            timings.append(time.perf_counter() - start)
+        if backend == "lsm":
+            engine.storage.wait_for_merges()
+        start = time.perf_counter()
+        for query in queries:
+            engine.ranked_search(query)
+        query_ms = (time.perf_counter() - start) / len(queries) * 1000
+    segments = len(engine.storage.segments) if backend == "lsm" else 1
+    engine.storage.close()
+    return {"timings": timings, "query_ms": query_ms, "segments": segments}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=50, help="number of batches added one after another")
+    parser.add_argument("--batch-pages", type=int, default=200, help="pages per batch")
+    parser.add_argument("--words", type=int, default=200, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="distinct words in the corpus")
+    parser.add_argument("--queries", type=int, default=200, help="ranked queries timed after ingesting")
+    parser.add_argument("--backends", nargs="+", default=["memory", "segment", "lsm"],
+                        choices=["memory", "segment", "lsm"], help="storage backends to measure")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.batches} batches of {args.batch_pages} pages...")
+        batches = []
+        for batch in range(args.batches):
+            folder = os.path.join(tmp, "corpus", f"batch{batch:04d}")
+            generate_corpus(folder, args.batch_pages, args.words, args.vocabulary, seed=batch, zipf=1.0)
+            batches.append(folder)
+        # Every batch draws from its own vocabulary, so queries mix words of a few batches.
+        rng = random.Random(0)
+        vocabularies = [make_vocabulary(args.vocabulary, seed) for seed in rng.sample(range(args.batches), min(3, args.batches))]
+        queries = [" ".join(rng.choice(vocabulary) for vocabulary in vocabularies) for _ in range(args.queries)]
+
+        third = max(1, args.batches // 3)
+        print(f"\n{'backend':>8} {'first (ms)':>11} {'middle (ms)':>12} {'last (ms)':>10} "
+              f"{'total (s)':>10} {'segments':>9} {'query (ms)':>11}")
+        for backend in args.backends:
+            root = os.path.join(tmp, backend)
+            os.makedirs(root)
+            result = run(backend, batches, root, queries)
+            timings = result["timings"]
+            first = statistics.median(timings[:third]) * 1000
+            middle = statistics.median(timings[third:-third] or timings) * 1000
+            last = statistics.median(timings[-third:]) * 1000
+            print(f"{backend:>8} {first:>11.1f} {middle:>12.1f} {last:>10.1f} {sum(timings):>10.2f} "
+                  f"{result['segments']:>9} {result['query_ms']:>11.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
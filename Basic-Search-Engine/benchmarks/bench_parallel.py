@@ -0,0 +1,63 @@
+"""
+Parallel indexing benchmark.
+
+Generates a synthetic corpus and indexes it with 1, 2, 4 and 8 worker processes,
+reporting the speedup over the single-process run. Every run must produce the
+same index.
+
+Usage:
+    python3 bench_parallel.py [--pages 100000] [--words 200] [--workers 1 2 4 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import generate_corpus
+from search_core import BasicSearchEngine
+
+
+def index_with(folder_path : str, workers : int):
+    engine = BasicSearchEngine(workers=workers)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.index_files(folder_path)
+    elapsed = time.perf_counter() - start
+    postings = sum(len(postings) for postings in engine.index.values())
+    return elapsed, len(engine.index), postings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100000, help="pages in the synthetic corpus")
+    parser.add_argument("--words", type=int, default=200, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="distinct words in the corpus")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="worker counts to measure")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.pages} pages of {args.words} words...")
+        generate_corpus(tmp, args.pages, args.words, args.vocabulary)
+        print(f"CPUs available: {os.cpu_count()}\n")
+        print(f"{'workers':>7} {'time (s)':>10} {'pages/s':>10} {'speedup':>8}")
+        baseline = None
+        shape = None
+        for workers in args.workers:
+            elapsed, terms, postings = index_with(tmp, workers)
+            if shape is None:
+                shape = (terms, postings)
+            elif shape != (terms, postings):
+                print(f"Mismatch: {workers} workers built {terms} terms / {postings} postings, expected {shape}.")
+                return 1
+            baseline = baseline or elapsed
+            print(f"{workers:>7} {elapsed:>10.2f} {args.pages / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Positional index benchmark.
+
+Indexes a synthetic corpus with and without token positions, compares the
+in-memory and on-disk index sizes, and measures phrase and proximity query
+latency on phrases sampled from the corpus.
+
+Usage:
+    python3 bench_phrase.py [--pages 5000] [--words 500] [--queries 200]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import generate_corpus
+from search_core import BasicSearchEngine
+from search_core.tokenizer import tokenize
+
+
+def build(folder_path : str, positional : bool):
+    """Indexes the folder and returns the engine with the memory the index holds."""
+    tracemalloc.start()
+    engine = BasicSearchEngine(positional=positional)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.index_files(folder_path)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return engine, size
+
+
+def sample_phrases(paths : list, count : int, length : int, seed : int = 0) -> list:
+    rng = random.Random(seed)
+    phrases = []
+    for _ in range(count):
+        with open(rng.choice(paths), "r", encoding="utf-8") as file:
+            words = tokenize(file.read())
+        start = rng.randrange(max(1, len(words) - length))
+        phrases.append(" ".join(words[start:start + length]))
+    return phrases
+
+
+def latencies_ms(run_query, queries : list) -> list:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        run_query(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(values : list, fraction : float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000, help="pages in the synthetic corpus")
+    parser.add_argument("--words", type=int, default=500, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words in the corpus")
+    parser.add_argument("--queries", type=int, default=200, help="phrases to time")
+    parser.add_argument("--distance", type=int, default=5, help="window for proximity queries")
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "pages")
+        paths = generate_corpus(folder, args.pages, args.words, args.vocabulary)
+        plain, plain_memory = build(folder, positional=False)
+        positional, positional_memory = build(folder, positional=True)
+
+        plain_file = os.path.join(tmp, "plain.bin")
+        positional_file = os.path.join(tmp, "positional.bin")
+        plain.save_index(plain_file)
+        positional.save_index(positional_file)
+        plain_disk = os.path.getsize(plain_file)
+        positional_disk = os.path.getsize(positional_file)
+
+        print(f"corpus: {args.pages} pages x {args.words} words\n")
+        print(f"{'index':>12} {'memory (MB)':>12} {'disk (MB)':>10}")
+        print(f"{'plain':>12} {plain_memory / mb:>12.1f} {plain_disk / mb:>10.1f}")
+        print(f"{'positional':>12} {positional_memory / mb:>12.1f} {positional_disk / mb:>10.1f}")
+        print(f"{'overhead':>12} {positional_memory / plain_memory:>11.2f}x {positional_disk / plain_disk:>9.2f}x\n")
+
+        print(f"{'query':>16} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        for length in (2, 3):
+            phrases = sample_phrases(paths, args.queries, length)
+            timings = latencies_ms(positional.phrase_search, phrases)
+            print(f"{f'{length}-word phrase':>16} {statistics.median(timings):>9.3f} {percentile(timings, 0.95):>9.3f}")
+            timings = latencies_ms(lambda query: positional.phrase_search(query, args.distance), phrases)
+            print(f"{f'{length}-word ~{args.distance}':>16} {statistics.median(timings):>9.3f} {percentile(timings, 0.95):>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
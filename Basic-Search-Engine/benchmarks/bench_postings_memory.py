@@ -0,0 +1,76 @@
+"""
+Posting representation memory benchmark.
+
+Indexes a synthetic corpus, then rebuilds its postings twice under tracemalloc:
+once as one WordInfo object per posting (the previous representation) and once
+as array-backed PostingList columns (the current one).
+
+Usage:
+    python3 bench_postings_memory.py [--pages 5000] [--words 300]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import generate_corpus
+from search_core import BasicSearchEngine, PostingList, WordInfo
+
+
+def measure(build) -> tuple:
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000, help="pages in the synthetic corpus")
+    parser.add_argument("--words", type=int, default=300, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words in the corpus")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_corpus(tmp, args.pages, args.words, args.vocabulary)
+        engine = BasicSearchEngine()
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.index_files(tmp)
+
+    doc_names = {record.doc_id: file_name for file_name, record in engine.manifest.items()}
+    columns = [(word, postings.doc_ids, postings.counts) for word, postings in engine.index.items()]
+    posting_count = sum(len(doc_ids) for _, doc_ids, _ in columns)
+
+    def build_objects():
+        return {word: [WordInfo(doc_names[doc_id], count) for doc_id, count in zip(doc_ids, counts)]
+                for word, doc_ids, counts in columns}
+
+    def build_arrays():
+        index = {}
+        for word, doc_ids, counts in columns:
+            postings = index[word] = PostingList(doc_names)
+            for doc_id, count in zip(doc_ids, counts):
+                postings.append(doc_id, count)
+        return index
+
+    objects, objects_size = measure(build_objects)
+    del objects
+    arrays, arrays_size = measure(build_arrays)
+
+    mb = 1024 * 1024
+    print(f"{len(columns)} terms, {posting_count} postings\n")
+    print(f"{'representation':>16} {'memory (MB)':>12} {'bytes/posting':>14}")
+    print(f"{'WordInfo objects':>16} {objects_size / mb:>12.1f} {objects_size / posting_count:>14.1f}")
+    print(f"{'PostingList':>16} {arrays_size / mb:>12.1f} {arrays_size / posting_count:>14.1f}")
+    print(f"\nPostingList uses {objects_size / arrays_size:.1f}x less memory.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Sharded search harness.
+
+Starts 1, 2 and 4 shard servers on this machine, indexes a synthetic corpus
+across them and checks that every query returns what a single engine over
+the whole corpus returns: the same BM25 scores, the same boolean matches, in
+file path order, the same phrase matches and the same per-word counts. Then
+reports indexing time and query latency for each cluster size.
+
+Usage:
+    python3 bench_shards.py [--pages 5000] [--shards 1 2 4] [--queries 200]
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import generate_corpus
+from search_core import BasicSearchEngine
+from search_core.sharding import LocalCluster
+from search_core.tokenizer import tokenize
+
+
+def percentile(values : list, fraction : float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def same_ranking(expected : list, actual : list) -> bool:
+    """
+    Scores must match; files may only differ where scores tie at the cut-off.
+    """
+    if len(expected) != len(actual):
+        return False
+    if not all(math.isclose(a[1], b[1], rel_tol=1e-9) for a, b in zip(expected, actual)):
+        return False
+    cutoff = expected[-1][1] if expected else 0.0
+    above = lambda ranking: {name for name, score in ranking if not math.isclose(score, cutoff, rel_tol=1e-9)}
+    return above(expected) == above(actual)
+
+
+def check(single : BasicSearchEngine, cluster, queries : dict) -> list:
+    """Returns a description of every query whose sharded result differs."""
+    failures = []
+    for query in queries["multi"]:
+        if not same_ranking(single.ranked_search(query, 10), cluster.ranked_search(query, 10)):
+            failures.append(f"ranked '{query}'")
+    for query in queries["boolean"]:
+        # The cluster puts its matches in file path order, whatever order each shard found them in.
+        if sorted(single.boolean_search(query)) != cluster.boolean_search(query):
+            failures.append(f"boolean '{query}'")
+    for query in queries["phrase"]:
+        if sorted(single.phrase_search(query)) != sorted(cluster.phrase_search(query)):
+            failures.append(f"phrase '{query}'")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for query in queries["single"]:
+            expected = {word: sorted((info.file_name, info.count) for info in postings)
+                        for word, postings in single.search(query).items()}
+            actual = {word: sorted(postings) for word, postings in cluster.search(query).items()}
+            if expected != actual:
+                failures.append(f"search '{query}'")
+    return failures
+
+
+def sample_queries(paths : list, count : int, seed : int = 0) -> dict:
+    rng = random.Random(seed)
+    queries = {"single": [], "multi": [], "boolean": [], "phrase": []}
+    for _ in range(count):
+        with open(rng.choice(paths), "r", encoding="utf-8") as file:
+            words = tokenize(file.read())
+        first, second, third = rng.sample(words, 3)
+        queries["single"].append(first)
+        queries["multi"].append(f"{first} {second} {third}")
+        queries["boolean"].append(f"{first} OR {second} AND NOT {third}")
+        start = rng.randrange(len(words) - 1)
+        queries["phrase"].append(" ".join(words[start:start + 2]))
+    return queries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000, help="pages in the synthetic corpus")
+    parser.add_argument("--words", type=int, default=200, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words in the corpus")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="cluster sizes to run")
+    parser.add_argument("--queries", type=int, default=200, help="queries checked and timed per cluster")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.pages} pages of {args.words} words...")
+        paths = generate_corpus(tmp, args.pages, args.words, args.vocabulary, zipf=1.0)
+        queries = sample_queries(paths, args.queries)
+        single = BasicSearchEngine(positional=True, cache_size=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            single.index_files(tmp)
+
+        print(f"\n{'shards':>6} {'index (s)':>10} {'ranked p50':>11} {'ranked p95':>11} "
+              f"{'boolean p50':>12} {'correct':>8}")
+        failed = False
+        for shards in args.shards:
+            with LocalCluster(shards, positional=True) as cluster:
+                start = time.perf_counter()
+                cluster.index_files(tmp)
+                index_seconds = time.perf_counter() - start
+                failures = check(single, cluster, queries)
+                timings = {"multi": [], "boolean": []}
+                for kind, run in (("multi", cluster.ranked_search), ("boolean", cluster.boolean_search)):
+                    for query in queries[kind]:
+                        start = time.perf_counter()
+                        run(query)
+                        timings[kind].append((time.perf_counter() - start) * 1000)
+            print(f"{shards:>6} {index_seconds:>10.2f} {statistics.median(timings['multi']):>8.2f} ms "
+                  f"{percentile(timings['multi'], 0.95):>8.2f} ms {statistics.median(timings['boolean']):>9.2f} ms "
+                  f"{'yes' if not failures else 'NO':>8}")
+            for failure in failures[:5]:
+                print(f"    mismatch: {failure}")
+            failed = failed or bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
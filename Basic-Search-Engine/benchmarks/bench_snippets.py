@@ -0,0 +1,114 @@
+"""
+Snippet benchmark.
+
+Indexes pages of growing size with positions and builds the snippet of every
+result of a set of ranked queries three ways:
+  - full read:  reads the whole document and re-tokenizes it to find the
+                matches, as opening a file through get_file_content would
+  - offsets:    reads only the bytes between the checkpoints around the matches,
+                with the document cache disabled
+  - cached:     the same through the LRU document cache, after a first pass
+                has warmed it
+
+It reports the median and 95th percentile time per snippet and the bytes read
+per snippet for each, and checks that all three give the same text.
+
+Usage:
+    python3 bench_snippets.py [--sizes-kb 4 64 512] [--pages 200] [--queries 100]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import make_vocabulary, zipf_weights
+from search_core import BasicSearchEngine, snippets, tokenizer
+
+
+def write_pages(folder : str, pages : int, size_bytes : int, vocabulary : list, seed : int = 0) -> list:
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    cum_weights = zipf_weights(len(vocabulary), 1.0)
+    paths = []
+    for page in range(pages):
+        path = os.path.join(folder, f"page{page}.txt")
+        written = 0
+        with open(path, "w", encoding="utf-8") as file:
+            while written < size_bytes:
+                line = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=12)) + ".\n"
+                file.write(line)
+                written += len(line)
+        paths.append(path)
+    return paths
+
+
+def full_read_snippet(engine : BasicSearchEngine, file_name : str, query : str) -> snippets.Snippet:
+    """Builds the snippet from the whole document, finding the matches by re-tokenizing it."""
+    text = engine.get_file_content(file_name)
+    terms = set(engine.analyzer.terms(query))
+    matches = [(position, 1, word) for position, word in enumerate(tokenizer.tokenize(text)) if word in terms]
+    window = snippets.best_window(matches, engine.SNIPPET_WORDS)
+    highlighted = {position for position, _, _ in matches}
+    return snippets.build_snippet(text, 0, window, highlighted, True)
+
+
+def measure(build, results : list) -> tuple:
+    latencies, texts = [], []
+    for file_name, query in results:
+        start = time.perf_counter()
+        snippet = build(file_name, query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        texts.append(snippet.text)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95)], texts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[4, 64, 512], help="page sizes to run")
+    parser.add_argument("--pages", type=int, default=200, help="pages per size")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words in the corpus")
+    parser.add_argument("--queries", type=int, default=100, help="ranked queries whose results get snippets")
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(args.vocabulary)
+    rng = random.Random(1)
+    print(f"{'page':>8} {'method':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'read/snippet':>13} {'same text':>10}")
+    for size_kb in args.sizes_kb:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = write_pages(tmp, args.pages, size_kb * 1024, vocabulary)
+            engines = {name: BasicSearchEngine(positional=True, cache_size=0, document_cache_size=capacity)
+                       for name, capacity in (("offsets", 0), ("cached", 64 * 1024 * 1024))}
+            for engine in engines.values():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    engine.index_files(tmp)
+            engine = engines["offsets"]
+            results = []
+            for _ in range(args.queries):
+                words = rng.sample(vocabulary[50:2000], 2)
+                results.extend((file_name, " ".join(words)) for file_name, _ in engine.ranked_search(" ".join(words), k=5))
+            total = sum(os.path.getsize(path) for path in paths)
+
+            p50, p95, reference = measure(lambda file_name, query: full_read_snippet(engine, file_name, query), results)
+            per_snippet = total / len(paths)
+            print(f"{size_kb:>6}KB {'full read':>10} {p50:>9.3f} {p95:>9.3f} {per_snippet / 1024:>10.1f} KB {'-':>10}")
+            for name, engine in engines.items():
+                if name == "cached":
+                    measure(engine.snippet, results)
+                before = engine.statistics()["document_cache"]["bytes_read"]
+                p50, p95, texts = measure(engine.snippet, results)
+                read = (engine.statistics()["document_cache"]["bytes_read"] - before) / len(results)
+                print(f"{'':>8} {name:>10} {p50:>9.3f} {p95:>9.3f} {read / 1024:>10.1f} KB "
+                      f"{'yes' if texts == reference else 'NO':>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Start-up benchmark.
+
+Measures how long a fresh interpreter takes before it can answer its first
+query, the way the CLI does when launched with --index:
+  - importing the CLI's search_engine module, from python -X importtime,
+    with the modules that took longest to import themselves
+  - creating the engine and opening a saved index
+  - running the first ranked search against it
+  - the whole process, interpreter start-up and exit included
+
+Every run is a new process. The first one writes the bytecode caches, as the
+first launch after an install would, and is not counted.
+
+Usage:
+    python3 bench_startup.py [--pages 5000] [--runs 10] [--index saved_index.bin]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from corpus import generate_corpus
+from search_core import BasicSearchEngine
+
+CLI_FOLDER = os.path.join(ROOT, "CLI-version")
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+# Modules a launch should not have to import before its first query.
+HEAVY_MODULES = ("numpy", "tkinter", "multiprocessing", "concurrent.futures.process")
+
+FIRST_QUERY = """
+import json, sys, time
+start = time.perf_counter()
+from search_engine import BasicSearchEngine
+imported = time.perf_counter()
+engine = BasicSearchEngine(positional=True)
+engine.load_index(sys.argv[1])
+loaded = time.perf_counter()
+engine.ranked_search(sys.argv[2])
+answered = time.perf_counter()
+print(json.dumps({"import": imported - start, "load": loaded - imported, "query": answered - loaded}))
+"""
+
+
+def child_environment() -> dict:
+    environment = dict(os.environ)
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+    return environment
+
+
+def import_times() -> dict:
+    """
+    Imports the CLI's search_engine module in a new interpreter with -X importtime.
+    Returns the cumulative microseconds of the import and every module's own.
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import search_engine"],
+                               cwd=CLI_FOLDER, env=child_environment(), capture_output=True, text=True, check=True)
+    total, modules = 0, {}
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        own, cumulative, indent, name = match.groups()
+        modules[name] = int(own)
+        if name == "search_engine" and not indent:
+            total = int(cumulative)
+    return {"total": total, "modules": modules}
+
+
+def first_query(index_path : str, query : str) -> dict:
+    """
+    Runs a new interpreter up to its first answered query. Returns the seconds of
+    every step and of the whole process.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", FIRST_QUERY, index_path, query], cwd=CLI_FOLDER,
+                               env=child_environment(), capture_output=True, text=True, check=True)
+    steps = json.loads(completed.stdout)
+    steps["process"] = time.perf_counter() - start
+    return steps
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000, help="pages in the synthetic corpus")
+    parser.add_argument("--words", type=int, default=200, help="words per page")
+    parser.add_argument("--runs", type=int, default=10, help="launches measured")
+    parser.add_argument("--index", help="a saved index to open instead of indexing a synthetic corpus")
+    parser.add_argument("--query", default="search engine index", help="the first query")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules listed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = args.index
+        if index_path is None:
+            print(f"Indexing {args.pages} pages of {args.words} words...")
+            generate_corpus(tmp, args.pages, args.words, zipf=1.0)
+            engine = BasicSearchEngine(positional=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                engine.index_files(tmp)
+            index_path = os.path.join(tmp, "index.bin")
+            engine.save_index(index_path)
+        print(f"Index file: {os.path.getsize(index_path) / 1e6:.1f} MB\n")
+
+        import_times()
+        first_query(index_path, args.query)
+        imports = [import_times() for _ in range(args.runs)]
+        launches = [first_query(index_path, args.query) for _ in range(args.runs)]
+
+    median = lambda values: statistics.median(values) * 1000
+    print(f"{'step':>14} {'median (ms)':>12} {'max (ms)':>9}")
+    for step in ("import", "load", "query", "process"):
+        values = [launch[step] for launch in launches]
+        print(f"{step:>14} {median(values):>12.1f} {max(values) * 1000:>9.1f}")
+    first = [launch["import"] + launch["load"] + launch["query"] for launch in launches]
+    print(f"{'first query':>14} {median(first):>12.1f} {max(first) * 1000:>9.1f}")
+
+    totals = [run["total"] / 1e6 for run in imports]
+    print(f"\nimporttime of search_engine: {median(totals):.1f} ms (median of {args.runs})")
+    own = {name: statistics.median(run["modules"].get(name, 0) for run in imports) for name in imports[0]["modules"]}
+    print("Slowest modules by their own import time:")
+    for name in sorted(own, key=own.get, reverse=True)[:args.top]:
+        print(f"    {own[name] / 1000:>6.1f} ms  {name}")
+    heavy = sorted({module for name in imports[0]["modules"] for module in HEAVY_MODULES
+                    if name == module or name.startswith(module + ".")})
+    print(f"Heavy modules imported at start-up: {', '.join(heavy) if heavy else 'none'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
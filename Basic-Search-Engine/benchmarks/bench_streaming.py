@@ -0,0 +1,95 @@
+"""
+Streaming tokenizer memory profile.
+
+Writes pages of growing size and measures, with tracemalloc, the peak memory of
+counting their words with the streaming tokenizer and with the previous
+read-everything approach. The run fails if the streaming peak exceeds the budget
+or grows with the file size.
+
+Usage:
+    python3 bench_streaming.py [--sizes-mb 4 16 64] [--budget-mb 4]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import make_vocabulary
+from search_core.tokenizer import CHUNK_SIZE, tokenize_file
+
+
+def write_page(path : str, size_bytes : int, vocabulary : list, seed : int = 0) -> None:
+    """Writes a page of roughly size_bytes without building it in memory."""
+    rng = random.Random(seed)
+    written = 0
+    with open(path, "w", encoding="utf-8") as file:
+        while written < size_bytes:
+            line = " ".join(rng.choices(vocabulary, k=12)) + ".\n"
+            file.write(line)
+            written += len(line)
+
+
+def peak_memory(count_words, path : str):
+    tracemalloc.start()
+    counts = count_words(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, sum(counts.values())
+
+
+def count_streaming(path : str) -> Counter:
+    return Counter(tokenize_file(path))
+
+
+def count_whole_file(path : str) -> Counter:
+    with open(path, "r", encoding="utf-8") as file:
+        return Counter(re.findall(r'\b\w+\b', file.read().lower()))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[4, 16, 64], help="page sizes in MB")
+    parser.add_argument("--vocabulary", type=int, default=5000, help="distinct words in the pages")
+    parser.add_argument("--budget-mb", type=float, default=4.0, help="maximum streaming peak memory in MB")
+    parser.add_argument("--skip-whole-file", action="store_true", help="only profile the streaming tokenizer")
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    vocabulary = make_vocabulary(args.vocabulary)
+    streaming_peaks = []
+    print(f"chunk size: {CHUNK_SIZE // 1024} KB\n")
+    print(f"{'file (MB)':>9} {'streaming peak (MB)':>20} {'whole-file peak (MB)':>21}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes_mb:
+            path = os.path.join(tmp, f"page_{size}mb.txt")
+            write_page(path, size * mb, vocabulary)
+            peak, streamed_words = peak_memory(count_streaming, path)
+            streaming_peaks.append(peak)
+            line = f"{size:>9} {peak / mb:>20.2f}"
+            if not args.skip_whole_file:
+                whole_peak, whole_words = peak_memory(count_whole_file, path)
+                if whole_words != streamed_words:
+                    print(f"Mismatch: streaming counted {streamed_words} words, whole-file {whole_words}.")
+                    return 1
+                line += f" {whole_peak / mb:>21.2f}"
+            print(line)
+            os.remove(path)
+
+    if max(streaming_peaks) > args.budget_mb * mb:
+        print(f"\nStreaming peak exceeded the {args.budget_mb} MB budget.")
+        return 1
+    if streaming_peaks[-1] > 1.5 * streaming_peaks[0] + CHUNK_SIZE * 4:
+        print("\nStreaming peak grows with the file size.")
+        return 1
+    print(f"\nStreaming peak stayed within the {args.budget_mb} MB budget for every file size.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
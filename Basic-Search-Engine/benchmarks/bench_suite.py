@@ -0,0 +1,260 @@
+"""
+End-to-end benchmark suite.
+
+For each corpus size, generates a Zipf-distributed synthetic corpus and measures
+against BasicSearchEngine:
+  - indexing throughput (pages/s and MB/s) and peak index memory
+  - single-term, multi-term (BM25) and phrase query latency (p50/p95/p99)
+  - saved index size, load time and cold start (a new process loading the
+    index and answering its first query)
+
+Results are written as JSON together with the machine, Python version and git
+commit, so runs can be compared across versions. With --compare, every metric
+is checked against a previous result file and the run fails if any of them
+regressed by more than --threshold.
+
+Usage:
+    python3 bench_suite.py [--pages 1000 10000] [--output results.json]
+    python3 bench_suite.py --pages 1000 --compare baseline.json
+    python3 bench_suite.py --pages 1000000 --corpus-dir ~/corpora --skip-memory
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT_DIR)
+
+from corpus import generate_corpus
+from search_core import BasicSearchEngine
+from search_core.tokenizer import tokenize
+
+SCHEMA = 1
+# Metrics where a larger value is better; every other metric is a cost.
+HIGHER_IS_BETTER = ("pages_per_second", "mb_per_second")
+
+COLD_START = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from search_core import BasicSearchEngine
+engine = BasicSearchEngine()
+engine.load_index(sys.argv[2])
+loaded = time.perf_counter()
+engine.search(sys.argv[3])
+print(loaded - start, time.perf_counter() - start)
+"""
+
+
+def percentiles(timings : list) -> dict:
+    ordered = sorted(timings)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def time_queries(run_query, queries : list) -> dict:
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for query in queries:
+            start = time.perf_counter()
+            run_query(query)
+            timings.append(time.perf_counter() - start)
+    return percentiles(timings)
+
+
+def sample_queries(paths : list, count : int, seed : int = 0) -> dict:
+    """
+    Draws queries from the corpus text, so term frequencies follow the corpus.
+    """
+    rng = random.Random(seed)
+    single, multi, phrase = [], [], []
+    for _ in range(count):
+        with open(rng.choice(paths), "r", encoding="utf-8") as file:
+            words = tokenize(file.read())
+        single.append(rng.choice(words))
+        multi.append(" ".join(rng.sample(words, min(3, len(words)))))
+        start = rng.randrange(max(1, len(words) - 2))
+        phrase.append(" ".join(words[start:start + 2]))
+    return {"single": single, "multi": multi, "phrase": phrase}
+
+
+def corpus_folder(args, pages : int, root : str) -> str:
+    name = f"zipf{args.zipf}-{pages}x{args.words}-v{args.vocabulary}-seed{args.seed}"
+    return os.path.join(args.corpus_dir or root, name)
+
+
+def prepare_corpus(args, pages : int, root : str) -> list:
+    """Generates the corpus, reusing a complete one left in --corpus-dir."""
+    folder = corpus_folder(args, pages, root)
+    marker = os.path.join(folder, ".complete")
+    if os.path.exists(marker):
+        return [os.path.join(folder, f"page{page}.txt") for page in range(pages)]
+    paths = generate_corpus(folder, pages, args.words, args.vocabulary, args.seed, zipf=args.zipf)
+    with open(marker, "w") as file:
+        file.write("")
+    return paths
+
+
+def index(folder : str, workers : int) -> BasicSearchEngine:
+    engine = BasicSearchEngine(workers=workers, positional=True, cache_size=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.index_files(folder)
+    return engine
+
+
+def run_size(args, pages : int, root : str) -> dict:
+    paths = prepare_corpus(args, pages, root)
+    folder = os.path.dirname(paths[0])
+    corpus_bytes = sum(os.path.getsize(path) for path in paths)
+    mb = 1024 * 1024
+
+    start = time.perf_counter()
+    engine = index(folder, args.workers)
+    index_seconds = time.perf_counter() - start
+    result = {
+        "pages": pages,
+        "corpus_mb": corpus_bytes / mb,
+        "index_seconds": index_seconds,
+        "pages_per_second": pages / index_seconds,
+        "mb_per_second": corpus_bytes / mb / index_seconds,
+    }
+
+    if not args.skip_memory:
+        del engine
+        tracemalloc.start()
+        engine = index(folder, 1)
+        result["index_memory_mb"] = tracemalloc.get_traced_memory()[0] / mb
+        tracemalloc.stop()
+
+    queries = sample_queries(paths, args.queries, args.seed)
+    result["single_term"] = time_queries(engine.search, queries["single"])
+    result["multi_term"] = time_queries(engine.ranked_search, queries["multi"])
+    result["phrase"] = time_queries(engine.phrase_search, queries["phrase"])
+
+    index_path = os.path.join(root, f"index-{pages}.bin")
+    engine.save_index(index_path)
+    result["index_file_mb"] = os.path.getsize(index_path) / mb
+    # Startup timings are short and noisy, so the best of a few runs is kept.
+    loads = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        BasicSearchEngine().load_index(index_path)
+        loads.append(time.perf_counter() - start)
+    result["load_seconds"] = min(loads)
+    cold_starts = []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, "-c", COLD_START, ROOT_DIR, index_path, queries["single"][0]],
+                                capture_output=True, text=True, check=True).stdout.split()
+        cold_starts.append(float(output[-1]))
+    result["cold_start_seconds"] = min(cold_starts)
+    os.remove(index_path)
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(result : dict, prefix : str = "") -> dict:
+    metrics = {}
+    for name, value in result.items():
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{prefix}{name}."))
+        elif name != "pages":
+            metrics[prefix + name] = value
+    return metrics
+
+
+def compare(current : dict, baseline : dict, threshold : float) -> int:
+    """
+    Prints the relative change of every metric shared with the baseline and
+    returns the number of regressions larger than threshold.
+    """
+    if current["machine"] != baseline["machine"]:
+        print("warning: the baseline was recorded on a different machine")
+    baseline_runs = {run["pages"]: flatten(run) for run in baseline["results"]}
+    regressions = 0
+    print(f"\n{'pages':>8} {'metric':<24} {'baseline':>12} {'current':>12} {'change':>8}")
+    for run in current["results"]:
+        previous = baseline_runs.get(run["pages"])
+        if previous is None:
+            continue
+        for metric, value in flatten(run).items():
+            old = previous.get(metric)
+            if not old or metric == "corpus_mb":
+                continue
+            change = (value - old) / old
+            worse = -change if metric.split(".")[-1] in HIGHER_IS_BETTER else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{run['pages']:>8} {metric:<24} {old:>12.4g} {value:>12.4g} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000, 10000], help="corpus sizes to run")
+    parser.add_argument("--words", type=int, default=300, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="distinct words in the corpus")
+    parser.add_argument("--zipf", type=float, default=1.0, help="Zipf exponent of word frequencies")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the corpus and the queries")
+    parser.add_argument("--queries", type=int, default=200, help="queries timed per query type")
+    parser.add_argument("--workers", type=int, default=1, help="indexing processes")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of the load and cold start timings")
+    parser.add_argument("--corpus-dir", help="keep generated corpora here and reuse them between runs")
+    parser.add_argument("--skip-memory", action="store_true", help="skip the traced (slower) memory measurement")
+    parser.add_argument("--output", default="bench_results.json", help="file the results are written to")
+    parser.add_argument("--compare", help="previous result file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    report = {
+        "schema": SCHEMA,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": {"platform": platform.platform(), "processor": platform.machine(), "cpus": os.cpu_count()},
+        "parameters": {name: value for name, value in vars(args).items()
+                       if name not in ("output", "compare", "threshold", "corpus_dir")},
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as root:
+        for pages in args.pages:
+            result = run_size(args, pages, root)
+            report["results"].append(result)
+            print(f"{pages:>8} pages: {result['pages_per_second']:.0f} pages/s, {result['mb_per_second']:.2f} MB/s, "
+                  f"single p50 {result['single_term']['p50_ms']:.3f} ms, multi p50 {result['multi_term']['p50_ms']:.3f} ms, "
+                  f"phrase p50 {result['phrase']['p50_ms']:.3f} ms, cold start {result['cold_start_seconds']:.3f} s")
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to '{args.output}'.")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{regressions} metric(s) regressed by more than {args.threshold:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Term dictionary lookup benchmark.
+
+Builds a TermDictionary of random distinct terms and measures prefix, wildcard
+and fuzzy lookup latency for words sampled from it, against a linear scan of
+every term for reference.
+
+Usage:
+    python3 bench_term_lookup.py [--terms 1000000] [--queries 200]
+"""
+import argparse
+import fnmatch
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from search_core.term_dictionary import TermDictionary
+
+
+def make_terms(count : int, seed : int = 0) -> list:
+    rng = random.Random(seed)
+    terms = set()
+    while len(terms) < count:
+        terms.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12))))
+    return list(terms)
+
+
+def misspell(word : str, rng : random.Random) -> str:
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def latencies_ms(lookup, queries : list) -> list:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        lookup(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(values : list, fraction : float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=1_000_000, help="distinct terms in the dictionary")
+    parser.add_argument("--queries", type=int, default=200, help="lookups to time per query kind")
+    parser.add_argument("--scan-queries", type=int, default=5, help="lookups to time with a linear scan")
+    args = parser.parse_args()
+
+    terms = make_terms(args.terms)
+    start = time.perf_counter()
+    dictionary = TermDictionary(terms)
+    print(f"{args.terms} terms, dictionary built in {time.perf_counter() - start:.2f}s\n")
+
+    rng = random.Random(1)
+    sample = rng.sample(terms, args.queries)
+    kinds = [
+        ("prefix", dictionary.prefix, [word[:4] for word in sample]),
+        ("wildcard x*y", dictionary.wildcard, [word[:3] + "*" + word[-1] for word in sample]),
+        ("wildcard *xyz", dictionary.wildcard, ["*" + word[-3:] for word in sample]),
+        ("fuzzy d=1", lambda word: dictionary.fuzzy(word, 1), [misspell(word, rng) for word in sample]),
+        ("fuzzy d=2", lambda word: dictionary.fuzzy(word, 2), [misspell(word, rng) for word in sample]),
+    ]
+    dictionary.wildcard("*a")  # builds the reversed array outside the timings
+
+    print(f"{'lookup':>14} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    for name, lookup, queries in kinds:
+        timings = latencies_ms(lookup, queries)
+        print(f"{name:>14} {statistics.median(timings):>9.3f} {percentile(timings, 0.95):>9.3f}")
+
+    scan = latencies_ms(lambda pattern: [term for term in terms if fnmatch.fnmatchcase(term, pattern)],
+                        [word[:4] + "*" for word in sample[:args.scan_queries]])
+    print(f"{'linear scan':>14} {statistics.median(scan):>9.3f} {percentile(scan, 0.95):>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
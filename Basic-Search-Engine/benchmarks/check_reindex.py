@@ -0,0 +1,218 @@
+"""
+Incremental re-indexing check.
+
+Keeps a small folder of pages changing between indexing runs (pages are
+edited, deleted, added, or only touched so their mtime changes and their
+content does not), re-indexes it incrementally after every round and checks
+the engine against a fresh one that indexes the folder from scratch: the
+same boolean matches (NOT queries included), the same per-word counts and
+the same BM25 scores. It runs for several engine configurations and seeds,
+plus a few small fixed cases, and exits with 1 if any of them failed.
+
+Usage:
+    python3 check_reindex.py [--seeds 15] [--rounds 6] [--pages 40]
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from search_core import ENGLISH_STOPWORDS, Analyzer, BasicSearchEngine, Deduplicator, LogStructuredStorage
+
+VOCABULARY = ["python", "java", "html", "css", "index", "search", "engine", "query", "rank", "page",
+              "running", "runs", "the", "and", "of", "alpha", "beta", "gamma", "delta", "omega"]
+
+CONFIGS = {
+    "memory": lambda root: BasicSearchEngine(positional=True),
+    "lsm": lambda root: BasicSearchEngine(positional=True, storage=LogStructuredStorage(os.path.join(root, "lsm"))),
+    "stemming": lambda root: BasicSearchEngine(
+        analyzer=Analyzer(stopwords=ENGLISH_STOPWORDS, stemmer="porter", ngrams=2)),
+    "workers": lambda root: BasicSearchEngine(workers=2),
+}
+
+
+class Folder:
+    """
+    The pages being changed, with an mtime that moves forward on every write, so
+    every change is seen whatever the file system's timestamp resolution.
+    """
+    def __init__(self, path : str, rng : random.Random) -> None:
+        self.path = path
+        self.rng = rng
+        self.clock = 1_000_000_000
+        self.count = 0
+        os.makedirs(path)
+
+    def touch(self, name : str) -> None:
+        self.clock += 10
+        os.utime(name, (self.clock, self.clock))
+
+    def write(self, name : str) -> None:
+        with open(name, "w", encoding="utf-8") as file:
+            file.write(" ".join(self.rng.choices(VOCABULARY, k=self.rng.randint(1, 30))))
+        self.touch(name)
+
+    def add(self) -> None:
+        self.write(os.path.join(self.path, f"page{self.count:04d}.txt"))
+        self.count += 1
+
+    def pages(self) -> list:
+        return sorted(os.path.join(self.path, name) for name in os.listdir(self.path))
+
+    def change(self) -> None:
+        for name in self.pages():
+            action = self.rng.random()
+            if action < 0.15:
+                self.write(name)
+            elif action < 0.3:
+                self.touch(name)
+            elif action < 0.38:
+                os.remove(name)
+        for _ in range(self.rng.randint(0, 3)):
+            self.add()
+
+
+def same_ranking(expected : list, actual : list) -> bool:
+    """
+    Scores must match; files may only differ where scores tie at the cut-off.
+    """
+    if len(expected) != len(actual):
+        return False
+    if not all(math.isclose(a[1], b[1], rel_tol=1e-9) for a, b in zip(expected, actual)):
+        return False
+    cutoff = expected[-1][1] if expected else 0.0
+    above = lambda ranking: {name for name, score in ranking if not math.isclose(score, cutoff, rel_tol=1e-9)}
+    return above(expected) == above(actual)
+
+
+def queries(rng : random.Random, count : int = 20) -> list:
+    chosen = []
+    for _ in range(count):
+        first, second, third = rng.sample(VOCABULARY, 3)
+        chosen.append(rng.choice([f"NOT {first}", f"{first} AND NOT {second}", f"NOT ({first} OR {second})",
+                                  f"{first} OR {second} AND NOT {third}", f"{first} {second}"]))
+    return chosen
+
+
+def compare(engine : BasicSearchEngine, fresh : BasicSearchEngine, rng : random.Random) -> list:
+    """Returns a description of every query whose results differ."""
+    failures = []
+    for query in queries(rng):
+        if sorted(engine.boolean_search(query)) != sorted(fresh.boolean_search(query)):
+            failures.append(f"boolean '{query}'")
+    for word in VOCABULARY:
+        if not same_ranking(fresh.ranked_search(word, 50), engine.ranked_search(word, 50)):
+            failures.append(f"ranked '{word}'")
+        with contextlib.redirect_stdout(io.StringIO()):
+            counts = [{term: sorted((info.file_name, info.count) for info in postings)
+                       for term, postings in found.search(word).items()} for found in (engine, fresh)]
+        if counts[0] != counts[1]:
+            failures.append(f"search '{word}'")
+    return failures
+
+
+def check_touch(root : str) -> list:
+    """
+    The smallest case: a page that is only touched must still be left out by NOT.
+    """
+    folder = os.path.join(root, "touch")
+    os.makedirs(folder)
+    pages = {"a.txt": "alpha python", "b.txt": "beta java", "c.txt": "gamma python"}
+    for name, text in pages.items():
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as file:
+            file.write(text)
+    engine = BasicSearchEngine()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.index_files(folder)
+        stat = os.stat(os.path.join(folder, "a.txt"))
+        os.utime(os.path.join(folder, "a.txt"), (stat.st_atime + 10, stat.st_mtime + 10))
+        engine.index_files(folder)
+    expected = [os.path.join(folder, "b.txt")]
+    actual = engine.boolean_search("NOT python")
+    return [] if actual == expected else [f"touch-only re-index: NOT python gave {actual}"]
+
+
+def check_collapsed(root : str) -> list:
+    """
+    A page collapsed into a near-duplicate has no postings, so NOT and stopwords
+    must leave it out as the other query modes do.
+    """
+    folder = os.path.join(root, "collapsed")
+    os.makedirs(folder)
+    text = " ".join(f"java word{i}" for i in range(100))
+    pages = {"a.txt": text, "b.txt": text + " extra", "c.txt": "the python"}
+    for name, page in pages.items():
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as file:
+            file.write(page)
+    engine = BasicSearchEngine(dedup=Deduplicator(), analyzer=Analyzer(stopwords=ENGLISH_STOPWORDS))
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.index_files(folder)
+    failures = []
+    for query, names in (("NOT java", ["c.txt"]), ("the", ["a.txt", "c.txt"])):
+        expected = [os.path.join(folder, name) for name in names]
+        actual = engine.boolean_search(query)
+        if actual != expected:
+            failures.append(f"collapsed near-duplicate: {query} gave {actual}")
+    return failures
+
+
+def run(config : str, seed : int, rounds : int, pages : int, root : str) -> list:
+    rng = random.Random(seed)
+    folder = Folder(os.path.join(root, "pages"), rng)
+    for _ in range(pages):
+        folder.add()
+    engine = CONFIGS[config](root)
+    failures = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.index_files(folder.path)
+        for round_number in range(rounds):
+            folder.change()
+            engine.index_files(folder.path)
+            fresh = CONFIGS[config](os.path.join(root, f"fresh{round_number}"))
+            fresh.index_files(folder.path)
+            failures += [f"round {round_number}: {failure}" for failure in compare(engine, fresh, rng)]
+            fresh.storage.close()
+    engine.storage.close()
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", type=int, default=15, help="random change histories per configuration")
+    parser.add_argument("--rounds", type=int, default=6, help="re-indexing runs per history")
+    parser.add_argument("--pages", type=int, default=40, help="pages in the folder at the start")
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS),
+                        help="engine configurations to check")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        failed = False
+        for name, check in (("touch-only", check_touch), ("collapsed", check_collapsed)):
+            failures = check(tmp)
+            print(f"{name:>12} {'yes' if not failures else 'NO':>8}")
+            for failure in failures:
+                print(f"    {failure}")
+            failed = failed or bool(failures)
+        print(f"\n{'config':>12} {'diverged':>8}")
+        for config in args.configs:
+            diverged = []
+            for seed in range(args.seeds):
+                with tempfile.TemporaryDirectory(dir=tmp) as root:
+                    failures = run(config, seed, args.rounds, args.pages, root)
+                if failures:
+                    diverged.append((seed, failures))
+            print(f"{config:>12} {len(diverged):>5}/{args.seeds}")
+            for seed, failures in diverged[:3]:
+                print(f"    seed {seed}: {failures[0]}")
+            failed = failed or bool(diverged)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
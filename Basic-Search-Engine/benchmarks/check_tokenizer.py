@@ -0,0 +1,98 @@
+"""
+Streaming tokenizer check.
+
+Cuts random texts into random pieces, as a file read in chunks would be, and
+checks that tokenize_chunks yields what tokenize yields for the whole text,
+with and without checkpoints and lowercasing. Every checkpoint must also be a
+place tokenizing can start again from: the rest of the text's UTF-8 bytes from
+its offset must give the words from its word number on. The texts mix ASCII
+with characters that lowercasing turns into more characters or lowercases by
+what follows them ('İ', 'Σ'). It exits with 1 if any text failed.
+
+Usage:
+    python3 check_tokenizer.py [--texts 3000] [--length 3000]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from search_core import tokenizer
+from search_core.tokenizer import tokenize, tokenize_chunks
+
+ALPHABETS = {
+    "ascii": "abcXYZ019_ .,'-\n\t",
+    # A combining dot, CJK and an emoji, a no-break space and an em space.
+    "unicode": "abcXYZ01 .,'-\nİıΣσςßẞéÉ\u0307中文。\U0001F600\u00a0\u2003",
+}
+
+
+def pieces(rng : random.Random, text : str) -> list:
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 12)))) if len(text) > 1 else []
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def check_text(text : str, chunks : list) -> list:
+    """Returns a description of every way the streamed words differ."""
+    failures = []
+    for lowercase in (True, False):
+        expected = tokenize(text, lowercase)
+        if list(tokenize_chunks(chunks, lowercase)) != expected:
+            failures.append(f"words (lowercase={lowercase})")
+        checkpoints = []
+        if list(tokenize_chunks(chunks, lowercase, checkpoints)) != expected:
+            failures.append(f"words with checkpoints (lowercase={lowercase})")
+        data = text.encode("utf-8")
+        for word, offset in checkpoints:
+            try:
+                rest = tokenize(data[offset:].decode("utf-8"), lowercase)
+            except UnicodeDecodeError:
+                rest = None
+            if rest != expected[word:]:
+                failures.append(f"checkpoint ({word}, {offset}) (lowercase={lowercase})")
+                break
+    return failures
+
+
+def run(alphabet : str, texts : int, length : int, seed : int) -> list:
+    rng = random.Random(seed)
+    failed = []
+    for _ in range(texts):
+        text = "".join(rng.choices(alphabet, k=rng.randint(0, length)))
+        chunks = pieces(rng, text)
+        failures = check_text(text, chunks)
+        if failures:
+            failed.append((text, chunks, failures))
+    return failed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=3000, help="random texts per alphabet")
+    parser.add_argument("--length", type=int, default=3000, help="characters per text, at most")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random texts")
+    args = parser.parse_args()
+
+    print(f"{'alphabet':>18} {'diverged':>10}")
+    failed = False
+    cases = [(name, alphabet, None) for name, alphabet in ALPHABETS.items()]
+    # Text without whitespace past the hold-back limit is cut before its last word
+    # instead, which is exact unless a 'Σ' lowercases by what comes after the cut.
+    cases.append(("no whitespace", "".join(character for character in ALPHABETS["unicode"]
+                                               if not character.isspace() and character != "Σ"), 16))
+    limit = tokenizer.HOLD_BACK_LIMIT
+    for name, alphabet, hold_back in cases:
+        tokenizer.HOLD_BACK_LIMIT = hold_back or limit
+        diverged = run(alphabet, args.texts, args.length, args.seed)
+        tokenizer.HOLD_BACK_LIMIT = limit
+        print(f"{name:>18} {len(diverged):>5}/{args.texts}")
+        for text, chunks, failures in diverged[:3]:
+            print(f"    {failures[0]}: {len(text)} characters in pieces of {[len(chunk) for chunk in chunks]}")
+        failed = failed or bool(diverged)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import itertools
+import os
+import random
+from typing import List, Optional
+
+
+def make_vocabulary(size : int, seed : int = 0) -> List[str]:
+    """
+    Builds a list of distinct pseudo-words.
+
+    Parameters:
+        size (int): Number of words in the vocabulary.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        List[str]: The generated words.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def zipf_weights(size : int, exponent : float) -> List[float]:
+    """
+    Cumulative weights of a Zipf distribution over ranks 1..size, where rank r is
+    drawn with probability proportional to 1 / r ** exponent.
+    """
+    return list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, size + 1)))
+
+
+def generate_corpus(folder_path : str, pages : int, words_per_page : int,
+                    vocabulary_size : int = 5000, seed : int = 0, zipf : Optional[float] = None) -> List[str]:
+    """
+    Writes a synthetic corpus of .txt pages into a folder.
+
+    Parameters:
+        folder_path (str): The folder the pages are written to. It is created if missing.
+        pages (int): Number of pages to generate.
+        words_per_page (int): Number of words in every page.
+        vocabulary_size (int): Number of distinct words the pages are drawn from.
+        seed (int): Seed for the random generator.
+        zipf (Optional[float]): If given, words follow a Zipf distribution with this
+            exponent, as in natural text, instead of being drawn uniformly.
+
+    Returns:
+        List[str]: Paths of the generated pages.
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    cum_weights = None
+    if zipf is not None:
+        # Shuffle so word frequency does not follow alphabetical order.
+        rng.shuffle(vocabulary)
+        cum_weights = zipf_weights(vocabulary_size, zipf)
+    paths = []
+    for page in range(pages):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=words_per_page)
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        path = os.path.join(folder_path, f"page{page}.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(".\n".join(lines))
+        paths.append(path)
+    return paths
@@ -0,0 +1,191 @@
+"""
+Load test for the HTTP search service.
+
+Opens a number of keep-alive connections to the service and sends search
+requests on all of them at once, then reports throughput (queries per second)
+and the latency distribution, including the tail (p99, p99.9 and max).
+
+Queries are built from words of the indexed documents, fetched through the
+/documents and /document endpoints. Without --port a service is started on a
+synthetic corpus first.
+
+Usage:
+    python3 load_test.py [--pages 2000] [--concurrency 16] [--requests 5000] [--mode ranked]
+    python3 load_test.py --port 8080 --concurrency 64 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote, urlencode
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT_DIR)
+
+from corpus import generate_corpus
+from search_core.instrumentation import LatencyHistogram
+from search_core.tokenizer import tokenize
+
+
+class Connection:
+    """A keep-alive HTTP/1.1 connection sending one request at a time."""
+    def __init__(self, host : str, port : int) -> None:
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method : str, target : str, body : bytes = b"") -> tuple:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f"{method} {target} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        payload = json.loads(await self.reader.readexactly(int(headers["content-length"])))
+        if headers.get("connection") == "close":
+            self.close()
+        return status, payload
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def sample_queries(host : str, port : int, count : int, mode : str, seed : int = 0) -> list:
+    """Draws query words from a sample of the indexed documents."""
+    connection = Connection(host, port)
+    _, listing = await connection.request("GET", "/documents")
+    rng = random.Random(seed)
+    documents = rng.sample(listing["documents"], min(50, listing["count"]))
+    words = []
+    for path in documents:
+        _, document = await connection.request("GET", f"/document?path={quote(path)}")
+        words.append(tokenize(document["content"]))
+    connection.close()
+    queries = []
+    for _ in range(count):
+        text = rng.choice(words)
+        if mode == "phrase":
+            start = rng.randrange(max(1, len(text) - 1))
+            queries.append(" ".join(text[start:start + 2]))
+        elif mode == "boolean":
+            queries.append(" AND ".join(rng.sample(text, 2)))
+        else:
+            queries.append(" ".join(rng.sample(text, min(rng.randint(1, 3), len(text)))))
+    return queries
+
+
+async def run_load(host : str, port : int, queries : list, mode : str, concurrency : int,
+                   requests : int, duration : float) -> dict:
+    histogram = LatencyHistogram()
+    statuses = {}
+    sent = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def client() -> None:
+        nonlocal sent
+        connection = Connection(host, port)
+        try:
+            while (deadline is None and sent < requests) or (deadline is not None and time.perf_counter() < deadline):
+                query = queries[sent % len(queries)]
+                sent += 1
+                target = "/search?" + urlencode({"q": query, "mode": mode})
+                start = time.perf_counter()
+                try:
+                    status, _ = await connection.request("GET", target)
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                    connection.close()
+                    status = "error"
+                histogram.record(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    summary = histogram.summary()
+    summary["p999_ms"] = histogram.percentile(0.999) * 1000
+    return {"requests": histogram.count, "seconds": elapsed, "qps": histogram.count / elapsed,
+            "statuses": statuses, "latency": summary}
+
+
+def start_service(folder : str, positional : bool) -> tuple:
+    """Starts the service on a free port and returns (process, port)."""
+    command = [sys.executable, "-m", "search_core.service", "--folder", folder, "--port", "0", "--quiet"]
+    if positional:
+        command.append("--positional")
+    process = subprocess.Popen(command, cwd=ROOT_DIR, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Serving on"):
+        process.kill()
+        raise RuntimeError("The service did not start.")
+    return process, int(line.rsplit(":", 1)[1])
+
+
+async def main_async(args) -> dict:
+    queries = await sample_queries(args.host, args.port, args.queries, args.mode, args.seed)
+    # A short warm-up so connection setup and first-query costs stay out of the numbers.
+    await run_load(args.host, args.port, queries, args.mode, args.concurrency, args.concurrency * 5, 0)
+    result = await run_load(args.host, args.port, queries, args.mode, args.concurrency, args.requests, args.duration)
+    connection = Connection(args.host, args.port)
+    _, result["server"] = await connection.request("GET", "/stats")
+    connection.close()
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="service address")
+    parser.add_argument("--port", type=int, help="port of a running service; without it one is started")
+    parser.add_argument("--pages", type=int, default=2000, help="pages of the synthetic corpus for a started service")
+    parser.add_argument("--words", type=int, default=200, help="words per page")
+    parser.add_argument("--mode", default="ranked", choices=["ranked", "words", "boolean", "phrase"], help="search mode")
+    parser.add_argument("--concurrency", type=int, default=16, help="connections sending requests at once")
+    parser.add_argument("--requests", type=int, default=5000, help="requests to send")
+    parser.add_argument("--duration", type=float, default=0, help="run for this many seconds instead")
+    parser.add_argument("--queries", type=int, default=1000, help="distinct queries, sent round-robin")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the corpus and the queries")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    process = None
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            if args.port is None:
+                print(f"Starting the service on {args.pages} synthetic pages...")
+                generate_corpus(tmp, args.pages, args.words, 20000, args.seed, zipf=1.0)
+                process, args.port = start_service(tmp, args.mode == "phrase")
+            result = asyncio.run(main_async(args))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    latency = result["latency"]
+    print(f"\n{result['requests']} '{args.mode}' requests over {args.concurrency} connections "
+          f"in {result['seconds']:.2f}s: {result['qps']:.0f} queries/s")
+    print(f"latency (ms): mean {latency['mean_ms']:.2f}  p50 {latency['p50_ms']:.2f}  p95 {latency['p95_ms']:.2f}  "
+          f"p99 {latency['p99_ms']:.2f}  p99.9 {latency['p999_ms']:.2f}  max {latency['max_ms']:.2f}")
+    print(f"responses: {', '.join(f'{status}: {count}' for status, count in sorted(result['statuses'].items(), key=str))}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+    return 0 if set(result["statuses"]) <= {200} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+The search engine core shared by the CLI and GUI versions: tokenizing and text
+analysis, the inverted index and its storage backends, and every query mode.
+
+The names below are imported from their modules on first use, so a program that
+only needs a few modules (the tokenizer, the query parser) does not pay for
+importing the engine.
+"""
+import importlib
+
+_EXPORTS = {
+    "Analyzer": "analysis",
+    "BasicSearchEngine": "engine",
+    "Deduplicator": "dedup",
+    "ENGLISH_STOPWORDS": "analysis",
+    "FileRecord": "engine",
+    "LogStructuredStorage": "storage",
+    "MemoryStorage": "storage",
+    "PostingList": "engine",
+    "SegmentStorage": "storage",
+    "WordInfo": "engine",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name : str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,417 @@
+"""
+Text analysis: turns the words of a document or query into index terms.
+
+An Analyzer is a fixed chain of steps, chosen once when it is created and
+applied identically when indexing and when querying:
+
+    words -> lowercase -> stopword removal -> stemming -> word n-grams (shingles)
+
+Every distinct raw word is analyzed only once. The result is remembered as an
+integer term id in the analyzer's TermTable, which holds one shared string per
+term, so repeated words cost a dict lookup and every posting of a term
+refers to the same string object. Only indexed text is given term ids: query
+words are looked up without being added, so a long-running service's table
+does not grow with every new query.
+"""
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import tokenizer
+
+# Common English function words. They occur in almost every document, so their
+# posting lists are long and they add little to a ranking.
+ENGLISH_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves
+""".split())
+
+STOPWORD = -1
+
+
+class TermTable:
+    """
+    Assigns consecutive integer ids to terms and keeps one string per term.
+    """
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+
+    def intern(self, term : str) -> int:
+        """
+        Returns the id of a term, assigning the next id to a new one.
+        """
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def term(self, term_id : int) -> str:
+        return self.terms[term_id]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+
+class PorterStemmer:
+    """
+    The Porter (1980) suffix-stripping stemmer for English, which maps inflected
+    forms such as "connected", "connecting" and "connections" to one stem, "connect".
+    """
+    STEP2 = sorted([
+        ("ational", "ate"), ("tional", "tion"), ("enci", "ence"), ("anci", "ance"), ("izer", "ize"),
+        ("bli", "ble"), ("alli", "al"), ("entli", "ent"), ("eli", "e"), ("ousli", "ous"),
+        ("ization", "ize"), ("ation", "ate"), ("ator", "ate"), ("alism", "al"), ("iveness", "ive"),
+        ("fulness", "ful"), ("ousness", "ous"), ("aliti", "al"), ("iviti", "ive"), ("biliti", "ble"),
+        ("logi", "log"),
+    ], key=lambda rule: len(rule[0]), reverse=True)
+    STEP3 = sorted([
+        ("icate", "ic"), ("ative", ""), ("alize", "al"), ("iciti", "ic"), ("ical", "ic"),
+        ("ful", ""), ("ness", ""),
+    ], key=lambda rule: len(rule[0]), reverse=True)
+    STEP4 = sorted([
+        "al", "ance", "ence", "er", "ic", "able", "ible", "ant", "ement", "ment", "ent",
+        "ion", "ou", "ism", "ate", "iti", "ous", "ive", "ize",
+    ], key=len, reverse=True)
+
+    @staticmethod
+    def _consonant(word : str, i : int) -> bool:
+        letter = word[i]
+        if letter in "aeiou":
+            return False
+        if letter == "y":
+            return i == 0 or not PorterStemmer._consonant(word, i - 1)
+        return True
+
+    @classmethod
+    def _measure(cls, stem : str) -> int:
+        """
+        Counts the vowel-consonant sequences of a stem, m in [C](VC){m}[V].
+        """
+        measure = 0
+        previous_vowel = False
+        for i in range(len(stem)):
+            consonant = cls._consonant(stem, i)
+            if consonant and previous_vowel:
+                measure += 1
+            previous_vowel = not consonant
+        return measure
+
+    @classmethod
+    def _has_vowel(cls, stem : str) -> bool:
+        return any(not cls._consonant(stem, i) for i in range(len(stem)))
+
+    @classmethod
+    def _double_consonant(cls, word : str) -> bool:
+        return len(word) >= 2 and word[-1] == word[-2] and cls._consonant(word, len(word) - 1)
+
+    @classmethod
+    def _cvc(cls, word : str) -> bool:
+        """
+        Whether the word ends consonant-vowel-consonant, the last not w, x or y.
+        """
+        n = len(word)
+        return n >= 3 and cls._consonant(word, n - 3) and not cls._consonant(word, n - 2) \
+            and cls._consonant(word, n - 1) and word[-1] not in "wxy"
+
+    def stem(self, word : str) -> str:
+        if len(word) <= 2:
+            return word
+        word = self._step1(word)
+        word = self._replace(word, self.STEP2, 0)
+        word = self._replace(word, self.STEP3, 0)
+        word = self._step4(word)
+        return self._step5(word)
+
+    def _step1(self, word : str) -> str:
+        if word.endswith("sses") or word.endswith("ies"):
+            word = word[:-2]
+        elif word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+
+        stripped = None
+        if word.endswith("eed"):
+            if self._measure(word[:-3]) > 0:
+                word = word[:-1]
+        elif word.endswith("ed") and self._has_vowel(word[:-2]):
+            stripped = word[:-2]
+        elif word.endswith("ing") and self._has_vowel(word[:-3]):
+            stripped = word[:-3]
+        if stripped is not None:
+            word = stripped
+            if word.endswith(("at", "bl", "iz")):
+                word += "e"
+            elif self._double_consonant(word) and word[-1] not in "lsz":
+                word = word[:-1]
+            elif self._measure(word) == 1 and self._cvc(word):
+                word += "e"
+
+        if word.endswith("y") and self._has_vowel(word[:-1]):
+            word = word[:-1] + "i"
+        return word
+
+    def _replace(self, word : str, rules : list, min_measure : int) -> str:
+        """
+        Applies the rule with the longest matching suffix, if its stem is long enough.
+        """
+        for suffix, replacement in rules:
+            if word.endswith(suffix):
+                stem = word[:-len(suffix)]
+                return stem + replacement if self._measure(stem) > min_measure else word
+        return word
+
+    def _step4(self, word : str) -> str:
+        for suffix in self.STEP4:
+            if word.endswith(suffix):
+                stem = word[:-len(suffix)]
+                if self._measure(stem) > 1 and (suffix != "ion" or stem.endswith(("s", "t"))):
+                    return stem
+                return word
+        return word
+
+    def _step5(self, word : str) -> str:
+        if word.endswith("e"):
+            stem = word[:-1]
+            measure = self._measure(stem)
+            if measure > 1 or (measure == 1 and not self._cvc(stem)):
+                word = stem
+        if word.endswith("ll") and self._measure(word) > 1:
+            word = word[:-1]
+        return word
+
+
+STEMMERS = {"porter": PorterStemmer}
+
+
+class Analyzer:
+    """
+    A configurable chain of analysis steps. The default analyzer only lowercases,
+    which is how the engine has always tokenized.
+    """
+    # Distinct raw words remembered before the memo is cleared, bounding its memory.
+    MEMO_SIZE = 1 << 20
+
+    def __init__(self, lowercase : bool = True, stopwords : Optional[Iterable[str]] = None,
+                 stemmer : Optional[str] = None, ngrams : int = 1) -> None:
+        """
+        Parameters:
+            lowercase (bool): Whether to fold words to lowercase.
+            stopwords (Optional[Iterable[str]]): Words left out of the index, e.g.
+                ENGLISH_STOPWORDS. They are matched after lowercasing.
+            stemmer (Optional[str]): Name of the stemmer applied to every word ("porter").
+            ngrams (int): Also index runs of up to this many consecutive words as single
+                terms ("machine learning"), which rank documents containing the exact
+                words of a query higher. 1 indexes single words only.
+        """
+        if stemmer is not None and stemmer not in STEMMERS:
+            raise ValueError(f"Unknown stemmer '{stemmer}'.")
+        if ngrams < 1:
+            raise ValueError("ngrams must be at least 1.")
+        self.lowercase = lowercase
+        self.stopwords = frozenset(stopwords or ())
+        self.stemmer = stemmer
+        self.ngrams = ngrams
+        self.__stem = STEMMERS[stemmer]().stem if stemmer is not None else None
+        self.table = TermTable()
+        self.__memo: Dict[str, int] = {}
+
+    @property
+    def spec(self) -> dict:
+        """
+        The analyzer's settings as plain data, stored with saved indexes.
+        """
+        return {"lowercase": self.lowercase, "stopwords": sorted(self.stopwords),
+                "stemmer": self.stemmer, "ngrams": self.ngrams}
+
+    @classmethod
+    def from_spec(cls, spec : dict) -> "Analyzer":
+        return cls(spec["lowercase"], spec["stopwords"], spec["stemmer"], spec["ngrams"])
+
+    @property
+    def is_plain(self) -> bool:
+        """
+        Whether the analyzer only lowercases, like the plain tokenizer.
+        """
+        return self.lowercase and not self.stopwords and self.stemmer is None and self.ngrams == 1
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Analyzer) and self.spec == other.spec
+
+    def __repr__(self) -> str:
+        stopwords = f"{len(self.stopwords)} stopwords" if self.stopwords else "no stopwords"
+        return f"Analyzer(lowercase={self.lowercase}, {stopwords}, stemmer={self.stemmer}, ngrams={self.ngrams})"
+
+    def __getstate__(self) -> dict:
+        # Worker processes start with an empty memo and term table.
+        return self.spec
+
+    def __setstate__(self, spec : dict) -> None:
+        self.__init__(spec["lowercase"], spec["stopwords"], spec["stemmer"], spec["ngrams"])
+
+    def term_id(self, word : str) -> int:
+        """
+        Returns the term id of a raw word, or STOPWORD if it is not indexed.
+        """
+        term_id = self.__memo.get(word)
+        if term_id is None:
+            term = self.__normalize(word)
+            term_id = STOPWORD if term is None else self.table.intern(term)
+            if len(self.__memo) >= self.MEMO_SIZE:
+                self.__memo.clear()
+            self.__memo[word] = term_id
+        return term_id
+
+    def __normalize(self, word : str) -> Optional[str]:
+        term = word.lower() if self.lowercase else word
+        if term in self.stopwords:
+            return None
+        return self.__stem(term) if self.__stem is not None else term
+
+    def term(self, word : str) -> Optional[str]:
+        """
+        Returns the index term of a single word, or None for a stopword. A word not
+        met while indexing is analyzed without being given a term id, so query words
+        do not grow the term table; a term without an id has no postings.
+        """
+        term_id = self.__memo.get(word)
+        if term_id is None:
+            return self.__normalize(word)
+        return None if term_id == STOPWORD else self.table.terms[term_id]
+
+    def positions(self, words : Iterable[str]) -> Iterator[Tuple[int, int]]:
+        """
+        Yields (position, term id) for every term of a sequence of words. A position
+        is the index of the word the term starts at, so removed stopwords leave
+        gaps and an n-gram shares the position of its first word.
+        """
+        memo = self.__memo
+        if self.ngrams == 1:
+            for position, word in enumerate(words):
+                term_id = memo.get(word)
+                if term_id is None:
+                    term_id = self.term_id(word)
+                if term_id != STOPWORD:
+                    yield position, term_id
+            return
+        terms = self.table.terms
+        window: List[Tuple[int, str]] = []
+        for position, word in enumerate(words):
+            term_id = memo.get(word)
+            if term_id is None:
+                term_id = self.term_id(word)
+            if term_id == STOPWORD:
+                # N-grams only join words that are next to each other.
+                window.clear()
+                continue
+            yield position, term_id
+            window.append((position, terms[term_id]))
+            if len(window) > self.ngrams:
+                del window[0]
+            for start in range(len(window) - 1):
+                yield window[start][0], self.table.intern(" ".join(term for _, term in window[start:]))
+
+    def ids(self, words : Iterable[str]) -> Iterator[int]:
+        """
+        Yields the term id of every term of a sequence of words.
+        """
+        if self.ngrams == 1:
+            memo = self.__memo
+            for word in words:
+                term_id = memo.get(word)
+                if term_id is None:
+                    term_id = self.term_id(word)
+                if term_id != STOPWORD:
+                    yield term_id
+        else:
+            for _, term_id in self.positions(words):
+                yield term_id
+
+    def counts(self, words : Iterable[str]) -> Dict[int, int]:
+        """
+        Counts the terms of a document by term id. Without n-grams the raw words are
+        counted first, so each distinct word of the document is analyzed only once.
+        """
+        if self.ngrams > 1:
+            return Counter(self.ids(words))
+        memo = self.__memo
+        counts: Dict[int, int] = {}
+        for word, count in Counter(words).items():
+            term_id = memo.get(word)
+            if term_id is None:
+                term_id = self.term_id(word)
+            if term_id != STOPWORD:
+                counts[term_id] = counts.get(term_id, 0) + count
+        return counts
+
+    def term_positions(self, words : Iterable[str]) -> Dict[int, array]:
+        """
+        Collects the sorted positions of every term of a document, by term id.
+        """
+        if self.ngrams > 1:
+            term_positions: Dict[int, array] = {}
+            for position, term_id in self.positions(words):
+                positions = term_positions.get(term_id)
+                if positions is None:
+                    positions = term_positions[term_id] = array("I")
+                positions.append(position)
+            return term_positions
+        word_positions: Dict[str, array] = {}
+        for position, word in enumerate(words):
+            positions = word_positions.get(word)
+            if positions is None:
+                positions = word_positions[word] = array("I")
+            positions.append(position)
+        memo = self.__memo
+        term_positions = {}
+        for word, positions in word_positions.items():
+            term_id = memo.get(word)
+            if term_id is None:
+                term_id = self.term_id(word)
+            if term_id == STOPWORD:
+                continue
+            merged = term_positions.get(term_id)
+            # Several words can share a stem ("run", "runs"); their positions are merged.
+            term_positions[term_id] = positions if merged is None else array("I", sorted(merged + positions))
+        return term_positions
+
+    def __query_positions(self, words : Iterable[str]) -> Iterator[Tuple[int, str]]:
+        """
+        Yields (position, term) like positions, for the words of a query: terms are
+        looked up with term and never interned.
+        """
+        window: List[Tuple[int, str]] = []
+        for position, word in enumerate(words):
+            term = self.term(word)
+            if term is None:
+                window.clear()
+                continue
+            yield position, term
+            if self.ngrams == 1:
+                continue
+            window.append((position, term))
+            if len(window) > self.ngrams:
+                del window[0]
+            for start in range(len(window) - 1):
+                yield window[start][0], " ".join(term for _, term in window[start:])
+
+    def terms(self, text : str) -> List[str]:
+        """
+        Analyzes a piece of text, such as a query, into its terms.
+        """
+        return [term for _, term in self.__query_positions(tokenizer.tokenize(text, lowercase=False))]
+
+    def phrase(self, text : str) -> List[Tuple[int, str]]:
+        """
+        Analyzes a phrase into (offset, term) pairs of single words, for phrase matching.
+        """
+        return [(position, term) for position, term in
+                self.__query_positions(tokenizer.tokenize(text, lowercase=False)) if " " not in term]
+
+
+DEFAULT_ANALYZER = Analyzer()
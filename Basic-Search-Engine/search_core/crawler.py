@@ -0,0 +1,281 @@
+"""
+Finds and reads the documents under an indexing root.
+
+The crawl walks a folder tree with os.scandir, which reports whether an entry
+is a file or a folder without a stat call of its own. It picks up:
+
+    page.txt                    plain text
+    page.html, page.htm         HTML, stripped to its text
+    page.txt.gz, page.html.gz   gzip-compressed text or HTML
+    dump.tar, dump.tar.gz, dump.tgz, dump.tar.bz2, dump.tar.xz
+                                archives of the above; every member is a document
+
+Archives are read as a stream, one member after another, so they are never
+extracted to disk and need not be seekable. Members are not held in memory
+either: each is read straight from the archive stream, once, so indexing
+hashes and tokenizes it in the same pass. A document inside an archive is
+named by the archive path and the member name joined by MEMBER_SEPARATOR,
+e.g. "dumps/site.tar.gz::site/index.html".
+"""
+import gzip
+import io
+import os
+import tarfile
+from collections import namedtuple
+from html.parser import HTMLParser
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
+
+from . import tokenizer
+
+MEMBER_SEPARATOR = "::"
+TEXT_EXTENSIONS = (".txt",)
+HTML_EXTENSIONS = (".html", ".htm")
+ARCHIVE_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# A file found by the crawl, with the mtime and size used to detect changes.
+SourceFile = namedtuple("SourceFile", "path mtime size")
+
+
+def document_kind(name : str) -> Optional[str]:
+    """
+    Tells what a file holds from its name: "archive", "html", "text", or None if it
+    is not indexed.
+    """
+    name = name.lower()
+    if name.endswith(ARCHIVE_EXTENSIONS):
+        return "archive"
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith(HTML_EXTENSIONS):
+        return "html"
+    if name.endswith(TEXT_EXTENSIONS):
+        return "text"
+    return None
+
+
+def crawl(root : str) -> Iterator[SourceFile]:
+    """
+    Walks a folder tree depth first and yields every file that holds documents,
+    in name order within each folder. Symbolic links to folders are not followed,
+    so the walk cannot loop.
+
+    Raises:
+        FileNotFoundError: If the root folder does not exist.
+    """
+    pending = [root]
+    while pending:
+        folder = pending.pop()
+        try:
+            with os.scandir(folder) as scan:
+                entries = sorted(scan, key=lambda entry: entry.name)
+        except (FileNotFoundError, PermissionError):
+            if folder == root:
+                raise
+            continue
+        folders = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                folders.append(entry.path)
+            elif document_kind(entry.name) is not None and entry.is_file():
+                stat = entry.stat()
+                yield SourceFile(entry.path, stat.st_mtime, stat.st_size)
+        pending.extend(reversed(folders))
+
+
+def source_path(key : str) -> str:
+    """
+    Returns the path of the file holding a document: the archive of an archive
+    member, the document's own path otherwise.
+    """
+    return key.split(MEMBER_SEPARATOR, 1)[0]
+
+
+class HTMLText(HTMLParser):
+    """
+    Collects the text of an HTML document fed to it piece by piece, leaving out
+    markup, comments, scripts and style sheets. Tags become spaces, so words on
+    either side of a tag are not joined.
+    """
+    SKIPPED = frozenset(("script", "style", "noscript", "template"))
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag : str, attrs : list) -> None:
+        if tag in self.SKIPPED:
+            self.skipping += 1
+        self.parts.append(" ")
+
+    def handle_endtag(self, tag : str) -> None:
+        if tag in self.SKIPPED and self.skipping:
+            self.skipping -= 1
+        self.parts.append(" ")
+
+    def handle_data(self, data : str) -> None:
+        if not self.skipping:
+            self.parts.append(data)
+
+    def take(self) -> str:
+        text = "".join(self.parts)
+        self.parts.clear()
+        return text
+
+
+def html_text(chunks : Iterable[str]) -> Iterator[str]:
+    """
+    Strips HTML given as consecutive pieces down to its text, piece by piece.
+    """
+    parser = HTMLText()
+    for chunk in chunks:
+        parser.feed(chunk)
+        text = parser.take()
+        if text:
+            yield text
+    parser.close()
+    text = parser.take()
+    if text:
+        yield text
+
+
+class Document:
+    """
+    One document: a text or HTML file, possibly gzip-compressed, or a member of an archive.
+    """
+    def __init__(self, key : str, name : str, opener : Callable[[], BinaryIO], is_file : bool = False) -> None:
+        """
+        Parameters:
+            key (str): The name the document is indexed under.
+            name (str): The file or member name, which tells its format.
+            opener (Callable): Returns a new binary stream of the (possibly compressed) content.
+            is_file (bool): Whether the stream is the document's own file rather than
+                an archive member.
+        """
+        self.key = key
+        self.is_file = is_file
+        self.html = document_kind(name) == "html"
+        self.compressed = name.lower().endswith(".gz")
+        # A plain text file holds exactly the document's text, so any byte offset
+        # of the text can be read directly with a seek.
+        self.seekable = is_file and not self.html and not self.compressed
+        self.__opener = opener
+
+    def open(self) -> BinaryIO:
+        """
+        Opens the document's content as a binary stream, decompressed. A member of an
+        archive being crawled can only be opened once, while the crawl is at it.
+        """
+        stream = self.__opener()
+        return gzip.GzipFile(fileobj=stream, mode="rb") if self.compressed else stream
+
+    def text(self, chunk_size : int = tokenizer.CHUNK_SIZE, hasher=None, timings : dict = None) -> Iterator[str]:
+        """
+        Yields the document's text one piece at a time, stripped of markup for HTML.
+
+        Parameters:
+            chunk_size (int): Number of bytes read at a time.
+            hasher: Optional hashlib object updated with every (decompressed) byte read.
+            timings (dict): If given, the seconds spent reading are added to its "read" key.
+
+        Raises:
+            UnicodeDecodeError: If the content is not valid UTF-8.
+            OSError: If the content cannot be read or decompressed.
+        """
+        with self.open() as stream:
+            chunks = tokenizer.decode_chunks(stream, chunk_size, hasher, timings)
+            yield from html_text(chunks) if self.html else chunks
+
+
+def _file_opener(path : str) -> Callable[[], BinaryIO]:
+    return lambda: open(path, "rb")
+
+
+def _member_opener(archive : tarfile.TarFile, member : tarfile.TarInfo) -> Callable[[], BinaryIO]:
+    """
+    Streams a member from the archive. A streamed archive cannot go back to a
+    member, so it can only be opened once.
+    """
+    opened = False
+
+    def opener() -> BinaryIO:
+        nonlocal opened
+        if opened:
+            raise OSError(f"The archive member '{member.name}' was already read.")
+        opened = True
+        return archive.extractfile(member)
+    return opener
+
+
+class _MemberStream(io.RawIOBase):
+    """
+    A member of an archive opened for it alone, read straight from the archive;
+    closing it closes the archive.
+    """
+    def __init__(self, archive : tarfile.TarFile, member : tarfile.TarInfo) -> None:
+        super().__init__()
+        self.__archive = archive
+        self.__stream = archive.extractfile(member)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.__stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.__stream.close()
+            self.__archive.close()
+        super().close()
+
+
+def documents(path : str) -> Iterator[Document]:
+    """
+    Yields the documents held in a file found by crawl. An archive's members must
+    be used before moving on to the next one.
+
+    Raises:
+        OSError, tarfile.TarError: If an archive cannot be read.
+    """
+    if document_kind(path) != "archive":
+        yield Document(path, path, _file_opener(path), is_file=True)
+        return
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            if member.isfile() and document_kind(member.name) in ("html", "text"):
+                yield Document(path + MEMBER_SEPARATOR + member.name, member.name, _member_opener(archive, member))
+
+
+def open_document(key : str) -> Document:
+    """
+    Finds an indexed document again by its key, to show its content.
+
+    Raises:
+        FileNotFoundError: If the file or archive member does not exist.
+    """
+    path, separator, member_name = key.partition(MEMBER_SEPARATOR)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"The file '{path}' does not exist.")
+    if not separator:
+        return Document(key, key, _file_opener(key), is_file=True)
+
+    def opener() -> BinaryIO:
+        # Iterating reads member headers only up to the member, seeking past the data of
+        # the ones before it (decompressing it, in a compressed archive), and the member
+        # is streamed from there, so a reader that stops early, like a snippet near the
+        # start of a document, never reads the rest of the archive. getmember would list
+        # every member first, reading the whole archive.
+        archive = tarfile.open(path, "r:*")
+        try:
+            for member in archive:
+                if member.isfile() and member.name == member_name:
+                    return _MemberStream(archive, member)
+        except BaseException:
+            archive.close()
+            raise
+        archive.close()
+        raise FileNotFoundError(f"The archive '{path}' has no member '{member_name}'.")
+    return Document(key, member_name, opener)
@@ -0,0 +1,220 @@
+"""
+Near-duplicate detection: finds documents whose text is almost the same as a
+document already indexed, such as mirrored pages or pages that only differ in
+a date or a navigation bar, so they can be collapsed into that one.
+
+A document's signature is a MinHash sketch of its set of word shingles (runs
+of a few consecutive words). Two signatures agree in about the same fraction
+of their values as the two shingle sets have in common (their Jaccard
+similarity). The sketch uses one hash per shingle, which picks one of the
+signature's bins and competes for its minimum, rather than one hash function
+per value; empty bins of short documents borrow the value of the next bin.
+
+LSHIndex cuts signatures into bands and buckets documents by each band, so
+finding the near-duplicates of a document only compares it with documents
+that share a bucket with it instead of with every indexed document.
+"""
+import hashlib
+import struct
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+MASK = (1 << 64) - 1
+# Odd 64-bit constants: the shingle hash's multiplier and the step added to values
+# borrowed by empty bins.
+MULTIPLIER = 0x9E3779B97F4A7C15
+BORROW_STEP = 0x5851F42D4C957F2D
+EMPTY = MASK
+
+
+class Deduplicator:
+    """
+    Computes MinHash signatures of documents and tells how similar two are.
+    """
+    THRESHOLD = 0.8
+    # Distinct words whose hashes are remembered before the memo is cleared.
+    MEMO_SIZE = 1 << 20
+
+    def __init__(self, threshold : float = THRESHOLD, shingle : int = 3, hashes : int = 64, bands : int = 16) -> None:
+        """
+        Parameters:
+            threshold (float): Estimated share of shingles two documents must have in
+                common to count as near-duplicates.
+            shingle (int): Number of consecutive words in a shingle.
+            hashes (int): Number of values in a signature, a power of 2. More values
+                estimate the similarity more precisely and take more space.
+            bands (int): Number of LSH bands the signature is cut into; it must divide
+                hashes. More bands find pairs of lower similarity at the cost of more
+                comparisons.
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("The threshold must be above 0 and at most 1.")
+        if shingle < 1:
+            raise ValueError("Shingles need at least one word.")
+        if hashes < 1 or hashes & (hashes - 1) or hashes > 256:
+            raise ValueError("The number of hashes must be a power of 2 up to 256.")
+        if bands < 1 or hashes % bands:
+            raise ValueError("The number of bands must divide the number of hashes.")
+        self.threshold = threshold
+        self.shingle = shingle
+        self.hashes = hashes
+        self.bands = bands
+        self.__bits = hashes.bit_length() - 1
+        self.__format = struct.Struct(f"<B{hashes}H")
+        self.__memo: Dict[str, int] = {}
+
+    @property
+    def spec(self) -> dict:
+        """
+        The deduplicator's settings as plain data.
+        """
+        return {"threshold": self.threshold, "shingle": self.shingle, "hashes": self.hashes, "bands": self.bands}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Deduplicator) and self.spec == other.spec
+
+    def __repr__(self) -> str:
+        return (f"Deduplicator(threshold={self.threshold}, shingle={self.shingle}, hashes={self.hashes}, "
+                f"bands={self.bands})")
+
+    def __getstate__(self) -> dict:
+        # Worker processes start with an empty memo.
+        return self.spec
+
+    def __setstate__(self, spec : dict) -> None:
+        self.__init__(spec["threshold"], spec["shingle"], spec["hashes"], spec["bands"])
+
+    def __word_hash(self, word : str) -> int:
+        value = self.__memo.get(word)
+        if value is None:
+            if len(self.__memo) >= self.MEMO_SIZE:
+                self.__memo.clear()
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            value = self.__memo[word] = int.from_bytes(digest, "little")
+        return value
+
+    def signature(self, words : Sequence[str]) -> bytes:
+        """
+        Computes the MinHash signature of a document.
+
+        Parameters:
+            words (Sequence[str]): The document's words, in order.
+
+        Returns:
+            bytes: The shingle size and the signature's values, 16 bits each, or no
+            bytes for a document without words.
+        """
+        if not words:
+            return b""
+        memo, word_hash = self.__memo, self.__word_hash
+        hashes = [memo.get(word) or word_hash(word) for word in words]
+        width = min(self.shingle, len(hashes))
+        # The shingle hash is a polynomial over its word hashes, rolled one word at a
+        # time. Its top bits, which depend on every bit of the words' hashes, pick the bin.
+        leading = pow(MULTIPLIER, width - 1, 1 << 64)
+        value = 0
+        for word in hashes[:width]:
+            value = (value * MULTIPLIER + word) & MASK
+        shift = 64 - self.__bits
+        minimums = [EMPTY] * self.hashes
+        for dropped, added in zip(hashes, hashes[width:]):
+            slot = value >> shift
+            if value < minimums[slot]:
+                minimums[slot] = value
+            value = ((value - dropped * leading) * MULTIPLIER + added) & MASK
+        slot = value >> shift
+        if value < minimums[slot]:
+            minimums[slot] = value
+        bins = self.hashes - 1
+        values = minimums[:]
+        for slot, minimum in enumerate(minimums):
+            if minimum == EMPTY:
+                for step in range(1, self.hashes):
+                    borrowed = minimums[(slot + step) & bins]
+                    if borrowed != EMPTY:
+                        values[slot] = borrowed + step * BORROW_STEP
+                        break
+        return self.__format.pack(self.shingle, *(value & 0xFFFF for value in values))
+
+    def compatible(self, signature : bytes) -> bool:
+        """
+        Whether a signature was made with this deduplicator's shingle size and number of values.
+        """
+        return len(signature) == self.__format.size and signature[0] == self.shingle
+
+    def similarity(self, first : bytes, second : bytes) -> float:
+        """
+        Estimates the share of shingles two documents have in common from their signatures.
+        """
+        if not self.compatible(first) or not self.compatible(second):
+            return 0.0
+        first_values, second_values = array("H", first[1:]), array("H", second[1:])
+        return sum(a == b for a, b in zip(first_values, second_values)) / self.hashes
+
+
+class LSHIndex:
+    """
+    Finds the indexed documents whose signature is similar to a given one. Only
+    canonical documents are added; a near-duplicate points to the document it
+    was collapsed into.
+    """
+    def __init__(self, dedup : Deduplicator) -> None:
+        self.dedup = dedup
+        self.__buckets: Dict[bytes, List[str]] = {}
+        self.__signatures: Dict[str, bytes] = {}
+        self.comparisons = 0
+        band_bytes = dedup.hashes // dedup.bands * 2
+        self.__bands = [(band, 1 + band * band_bytes, 1 + (band + 1) * band_bytes) for band in range(dedup.bands)]
+
+    def __keys(self, signature : bytes) -> List[bytes]:
+        return [bytes((band,)) + signature[start:end] for band, start, end in self.__bands]
+
+    def add(self, key : str, signature : bytes) -> None:
+        """
+        Adds a canonical document. Signatures made with other settings are ignored.
+        """
+        if not self.dedup.compatible(signature) or key in self.__signatures:
+            return
+        self.__signatures[key] = signature
+        for bucket in self.__keys(signature):
+            self.__buckets.setdefault(bucket, []).append(key)
+
+    def remove(self, key : str) -> None:
+        """
+        Removes a document, if it was added.
+        """
+        signature = self.__signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket in self.__keys(signature):
+            keys = self.__buckets[bucket]
+            keys.remove(key)
+            if not keys:
+                del self.__buckets[bucket]
+
+    def find(self, signature : bytes) -> Optional[str]:
+        """
+        Finds the indexed document most similar to a signature, if it is at least as
+        similar as the deduplicator's threshold.
+
+        Returns:
+            Optional[str]: The key of the document, or None if there is none.
+        """
+        if not self.dedup.compatible(signature):
+            return None
+        candidates: Dict[str, None] = {}
+        for bucket in self.__keys(signature):
+            candidates.update(dict.fromkeys(self.__buckets.get(bucket, ())))
+        best, best_similarity = None, self.dedup.threshold
+        for key in candidates:
+            self.comparisons += 1
+            similarity = self.dedup.similarity(signature, self.__signatures[key])
+            if similarity > best_similarity or (best is None and similarity == best_similarity):
+                best, best_similarity = key, similarity
+        return best
+
+    def __contains__(self, key) -> bool:
+        return key in self.__signatures
+
+    def __len__(self) -> int:
+        return len(self.__signatures)
@@ -0,0 +1,1548 @@
+import contextlib
+import hashlib
+import heapq
+import math
+import os
+import tarfile
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Sequence
+from functools import partial
+from typing import Callable, Iterable, Iterator, List, Dict, Mapping, Optional, Set, Tuple
+
+from . import crawler, index_storage, instrumentation, query_parser, scoring, snippets, tokenizer
+from .analysis import Analyzer
+from .dedup import Deduplicator, LSHIndex
+from .query_cache import QueryCache
+from .storage import MemoryStorage
+from .term_dictionary import TermDictionary, has_wildcards
+
+class WordInfo:
+    """
+    Represents information about a word in a file.
+    """
+    def __init__(self, file_name : str, count: int = 0, doc_id : int = 0, positions : Optional[array] = None) -> None:
+        self.file_name = file_name
+        self.count = count
+        self.doc_id = doc_id
+        self.positions = positions
+
+    def __lt__(self, other : "WordInfo") -> bool:
+        if not isinstance(other, WordInfo):
+            raise TypeError("Invalid type!")
+        return self.count < other.count 
+    
+    def __repr__(self) -> str:
+        return f"{self.file_name} - {self.count}"
+
+class PostingList(Sequence):
+    """
+    The postings of one term, stored column-wise: doc ids and counts live in
+    compact integer arrays (and positions in one array per posting) instead of
+    one WordInfo object per posting. Indexing or iterating the list builds
+    WordInfo views on the fly, so code written against lists of WordInfo keeps
+    working.
+    """
+    __slots__ = ("doc_ids", "counts", "positions", "doc_names")
+
+    def __init__(self, doc_names : Dict[int, str], positional : bool = False) -> None:
+        """
+        Parameters:
+            doc_names (Dict[int, str]): The engine's doc table, mapping doc ids to file paths.
+            positional (bool): Whether the list keeps token positions.
+        """
+        self.doc_ids = array("I")
+        self.counts = array("I")
+        self.positions: Optional[List[array]] = [] if positional else None
+        self.doc_names = doc_names
+
+    def append(self, doc_id : int, count : int, positions : Optional[array] = None) -> None:
+        """
+        Adds a posting. Doc ids must be appended in ascending order.
+        """
+        self.doc_ids.append(doc_id)
+        self.counts.append(count)
+        if self.positions is not None:
+            self.positions.append(positions if positions is not None else array("I"))
+
+    def extend(self, other : "PostingList") -> None:
+        """
+        Appends the postings of another list, whose doc ids must all be above this one's.
+        """
+        self.doc_ids.extend(other.doc_ids)
+        self.counts.extend(other.counts)
+        if self.positions is not None:
+            self.positions.extend(other.positions)
+
+    def remove(self, doc_id : int) -> None:
+        """
+        Removes the posting of a document, if the term occurs in it.
+        """
+        i = bisect_left(self.doc_ids, doc_id)
+        if i < len(self.doc_ids) and self.doc_ids[i] == doc_id:
+            del self.doc_ids[i]
+            del self.counts[i]
+            if self.positions is not None:
+                del self.positions[i]
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        doc_id = self.doc_ids[i]
+        positions = self.positions[i] if self.positions is not None else None
+        return WordInfo(self.doc_names[doc_id], self.counts[i], doc_id, positions)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+class FileRecord:
+    """
+    Manifest entry describing an indexed file as it was when it was indexed. The
+    offsets are its encoded offset table, which lets snippets seek into its text,
+    and the signature its MinHash signature for near-duplicate detection. A
+    near-duplicate names the canonical document it was collapsed into; it has no
+    postings of its own and a length of 0.
+    """
+    def __init__(self, mtime : float, size : int, digest : bytes, length : int = 0, offsets : bytes = b"",
+                 signature : bytes = b"", canonical : Optional[str] = None, doc_id : int = -1) -> None:
+        self.mtime = mtime
+        self.size = size
+        self.digest = digest
+        self.length = length
+        self.offsets = offsets
+        self.signature = signature
+        self.canonical = canonical
+        self.doc_id = doc_id
+
+    def __repr__(self) -> str:
+        return f"FileRecord(mtime={self.mtime}, size={self.size}, digest={self.digest.hex()}, length={self.length})"
+
+# Errors that make one file unreadable without stopping the rest of an indexing run.
+READ_ERRORS = (OSError, EOFError, UnicodeDecodeError, tarfile.TarError, zlib.error)
+
+def _needs_reading(source : crawler.SourceFile, records : Dict[str, FileRecord]) -> bool:
+    """
+    Whether a file changed since its documents were indexed, going by mtime and size.
+    """
+    return not records or any(record.mtime != source.mtime or record.size != source.size
+                              for record in records.values())
+
+def _index_shard(tasks : List[Tuple[crawler.SourceFile, Dict[str, FileRecord]]], positional : bool = False,
+                 analyzer : Optional[Analyzer] = None, dedup : Optional[Deduplicator] = None) -> Tuple[dict, list, list, dict, dict]:
+    """
+    Tokenizes a shard of files into a partial index. Runs in worker processes
+    when indexing in parallel, so it only touches its arguments. A file holds one
+    document, or many if it is an archive.
+
+    Parameters:
+        tasks (list): (file, manifest records of the documents it held when last
+            indexed) pairs.
+        positional (bool): Whether to record the token positions of every posting.
+        analyzer (Optional[Analyzer]): Turns the words of a file into terms. Defaults
+            to a plain analyzer that only lowercases.
+        dedup (Optional[Deduplicator]): If given, every new record gets the MinHash
+            signature of its document's words.
+
+    Returns:
+        Tuple[dict, list, list, dict, dict]: The partial index mapping each term to
+        (document, count, positions or None) triples, a (document, new record, whether
+        the content changed) triple per document whose manifest record needs updating,
+        the documents that are gone from their archive, the seconds spent in each
+        stage and the shard's counters.
+    """
+    if analyzer is None:
+        analyzer = Analyzer()
+    plain = analyzer.is_plain
+    # Otherwise terms are counted by id, and every posting of a term shares the table's string.
+    terms = analyzer.table.terms
+    partial_index: Dict[str, list] = {}
+    updates = []
+    removed = []
+    timings = {"index.hash": 0.0, "index.read": 0.0, "index.tokenize": 0.0}
+    if dedup is not None:
+        timings["index.signature"] = 0.0
+    counters = {"files_unchanged": 0, "files_tokenized": 0, "files_unreadable": 0, "tokens": 0, "bytes_read": 0}
+    for source, records in tasks:
+        if not _needs_reading(source, records):
+            counters["files_unchanged"] += len(records)
+            continue
+        counters["bytes_read"] += source.size
+        seen = set()
+        try:
+            for document in crawler.documents(source.path):
+                seen.add(document.key)
+                record = records.get(document.key)
+                if record is not None and document.is_file:
+                    # A file can be hashed first and read again only if it changed. An archive
+                    # member is read once, so it is hashed while it is tokenized below.
+                    start = time.perf_counter()
+                    with document.open() as stream:
+                        digest = tokenizer.hash_stream(stream, hashlib.sha1())
+                    timings["index.hash"] += time.perf_counter() - start
+                    if record.digest == digest:
+                        counters["files_unchanged"] += 1
+                        updates.append((document.key, FileRecord(source.mtime, source.size, digest, record.length,
+                                                                 record.offsets, record.signature, record.canonical),
+                                        False))
+                        continue
+                hasher = hashlib.sha1()
+                file_timings = {"read": 0.0}
+                checkpoints = []
+                start = time.perf_counter()
+                words = tokenizer.tokenize_chunks(document.text(hasher=hasher, timings=file_timings),
+                                                  analyzer.lowercase, checkpoints)
+                if dedup is not None:
+                    # The signature needs the words in order, so they are kept for it.
+                    words = list(words)
+                if plain:
+                    # The tokenizer already lowercased the words, so every word is its own term.
+                    if positional:
+                        term_positions: Dict[str, array] = {}
+                        length = 0
+                        for length, word in enumerate(words, start=1):
+                            positions = term_positions.get(word)
+                            if positions is None:
+                                positions = term_positions[word] = array("I")
+                            positions.append(length - 1)
+                        postings = ((word, len(positions), positions) for word, positions in term_positions.items())
+                    else:
+                        word_counts = Counter(words)
+                        length = sum(word_counts.values())
+                        postings = ((word, count, None) for word, count in word_counts.items())
+                elif positional:
+                    term_positions = analyzer.term_positions(words)
+                    length = sum(len(positions) for positions in term_positions.values())
+                    postings = ((terms[term_id], len(positions), positions) for term_id, positions in term_positions.items())
+                else:
+                    term_counts = analyzer.counts(words)
+                    length = sum(term_counts.values())
+                    postings = ((terms[term_id], count, None) for term_id, count in term_counts.items())
+                # Tokenizing time includes counting the terms, but not reading the file.
+                timings["index.read"] += file_timings["read"]
+                timings["index.tokenize"] += time.perf_counter() - start - file_timings["read"]
+                digest = hasher.digest()
+                if record is not None and record.digest == digest:
+                    # An archive member whose content did not change keeps its postings.
+                    counters["files_unchanged"] += 1
+                    updates.append((document.key, FileRecord(source.mtime, source.size, digest, record.length,
+                                                             record.offsets, record.signature, record.canonical),
+                                    False))
+                    continue
+                # Only added once the whole document was read, so an unreadable one leaves nothing behind.
+                for term, count, positions in postings:
+                    partial_index.setdefault(term, []).append((document.key, count, positions))
+                counters["files_tokenized"] += 1
+                counters["tokens"] += length
+                signature = b""
+                if dedup is not None:
+                    start = time.perf_counter()
+                    signature = dedup.signature(words)
+                    timings["index.signature"] += time.perf_counter() - start
+                offsets = snippets.encode_offsets(checkpoints)
+                updates.append((document.key, FileRecord(source.mtime, source.size, digest, length, offsets,
+                                                         signature), True))
+        except READ_ERRORS:
+            # The documents already read are kept; the file's other documents keep their old postings.
+            counters["files_unreadable"] += 1
+            continue
+        removed.extend(key for key in records if key not in seen)
+    return partial_index, updates, removed, timings, counters
+
+class _StagedIndex:
+    """
+    The tokenized batches of an indexing run that are not in the index yet. Each
+    batch's postings are moved into posting lists of the run's own as it arrives,
+    so the run holds compact arrays rather than a tuple per posting, and cancelling
+    it just drops them. Changed documents get the doc ids they will have in the
+    index, above every indexed one, so applying the run adds each term's staged
+    list to the index in one step.
+    """
+    def __init__(self, new_posting_list : Callable[[], PostingList], first_doc_id : int, keep_terms : bool) -> None:
+        """
+        Parameters:
+            new_posting_list (Callable): Builds an empty posting list of the engine.
+            first_doc_id (int): The doc id the first changed document will get.
+            keep_terms (bool): Whether to note the terms of every staged document,
+                which removing it from the index or leaving it out later needs.
+        """
+        self.index: Dict[str, PostingList] = {}
+        self.doc_ids: Dict[str, int] = {}
+        self.terms: Optional[Dict[str, List[str]]] = {} if keep_terms else None
+        # The (updates, removed documents) of every batch, in file order.
+        self.batches: List[Tuple[list, list]] = []
+        self.first_doc_id = first_doc_id
+        self.__new_posting_list = new_posting_list
+
+    def add(self, partial_index : Dict[str, list], updates : list, removed : list) -> None:
+        """
+        Stages a batch tokenized by _index_shard. Batches must be added in file order.
+        """
+        doc_ids = self.doc_ids
+        for file_name, record, changed in updates:
+            if changed:
+                doc_ids[file_name] = self.first_doc_id + len(doc_ids)
+        index, terms = self.index, self.terms
+        for term, entries in partial_index.items():
+            postings = index.get(term)
+            if postings is None:
+                postings = index[term] = self.__new_posting_list()
+            for file_name, count, positions in entries:
+                postings.append(doc_ids[file_name], count, positions)
+                if terms is not None:
+                    terms.setdefault(file_name, []).append(term)
+        self.batches.append((updates, removed))
+
+class BasicSearchEngine:
+    """
+    A basic search engine that indexes text files and allows searching for words within them.
+    """
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    SUGGESTION_DISTANCE = 1
+    SUGGESTIONS = 5
+    SHARD_SIZE = 256
+    SHARD_BYTES = 32 * 1024 * 1024
+    SNIPPET_WORDS = 30
+    SNIPPET_RESULTS = 10
+    SNIPPET_SCAN_BYTES = 64 * 1024
+
+    def __init__(self, workers : int = 1, positional : bool = False, cache_size : int = 128,
+                 storage : Optional[MemoryStorage] = None, analyzer : Optional[Analyzer] = None,
+                 document_cache_size : int = 4 * 1024 * 1024, dedup : Optional[Deduplicator] = None,
+                 read_only : bool = False) -> None:
+        """
+        Initializes the search engine with empty indexes and no indexed files.
+
+        Parameters:
+            workers (int): Number of processes used to tokenize files while indexing.
+            positional (bool): Whether to record token positions, which phrase and
+                proximity queries need.
+            cache_size (int): Number of query results kept in the LRU cache. 0 disables it.
+            storage (Optional[MemoryStorage]): Where the index lives. Defaults to a
+                MemoryStorage; a SegmentStorage keeps it in an on-disk segment file and
+                reopens the index a previous session left there, and a LogStructuredStorage
+                writes each indexing run to a new small segment and merges them in the background.
+            analyzer (Optional[Analyzer]): Turns the words of files and queries into terms,
+                for example with stopword removal and stemming. Defaults to lowercasing only.
+                An index loaded from a file or storage keeps the analyzer it was built with.
+            document_cache_size (int): Bytes of document text kept in the LRU cache
+                snippets are read through. 0 disables it.
+            dedup (Optional[Deduplicator]): If given, a new document whose text is a
+                near-duplicate of an indexed one is collapsed into it: it is kept in the
+                manifest, but its postings are left out of the index.
+            read_only (bool): Whether the engine only answers queries over an index loaded
+                with load_index, such as a snapshot, before the queries start. Its queries
+                then run without the engine's lock, so threads answer them side by side,
+                and index_files, merge_partial_index and remove_file raise RuntimeError.
+        """
+        self.workers = workers
+        self.__read_only = bool(read_only)
+        self.__storage = storage if storage is not None else MemoryStorage()
+        self.__positional = bool(positional)
+        self.__analyzer = analyzer if analyzer is not None else Analyzer()
+        self.__manifest: Dict[str, FileRecord] = {}
+        self.__file_terms: Dict[str, List[str]] = {}
+        self.__total_length = 0
+        self.__doc_names: Dict[int, str] = {}
+        self.__doc_lengths = array("I")
+        self.__generation = 0
+        self.__cache = QueryCache(cache_size)
+        self.__documents = snippets.DocumentCache(document_cache_size)
+        self.__dedup = dedup
+        self.__near = LSHIndex(dedup) if dedup is not None else None
+        # Near-duplicate -> canonical document, canonical document -> its near-duplicates,
+        # and near-duplicates whose canonical document was removed or changed.
+        self.__canonicals: Dict[str, str] = {}
+        self.__duplicates: Dict[str, Set[str]] = {}
+        self.__orphans: Set[str] = set()
+        self.__terms: Optional[TermDictionary] = None
+        self.__terms_generation = -1
+        self.__matrix: Optional[scoring.BM25Matrix] = None
+        self.__matrix_generation = -1
+        self.__lock = threading.RLock()
+        # Nothing changes a read-only engine's index while queries run, so they share it
+        # unlocked. The lazily built term dictionary and BM25 matrix still take the lock.
+        self.__read_lock = contextlib.nullcontext() if self.__read_only else self.__lock
+        self.__instrumentation = instrumentation.Instrumentation()
+        mapped = self.__storage.restore(self.__new_posting_list)
+        if mapped is not None:
+            self.__adopt(mapped)
+
+    @property
+    def index(self) -> dict:
+        return self.__storage.index
+
+    @index.setter
+    def index(self, index : dict) -> None:
+        if not isinstance(index, dict):
+            raise TypeError("Invalid type!")
+        self.__storage.replace(index)
+        self.__generation += 1
+
+    @property
+    def storage(self) -> MemoryStorage:
+        """
+        Getter for the storage backend holding the index.
+        """
+        return self.__storage
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    @workers.setter
+    def workers(self, workers : int) -> None:
+        if not isinstance(workers, int) or isinstance(workers, bool):
+            raise TypeError("Invalid type!")
+        if workers < 1:
+            raise ValueError("At least one worker is required.")
+        self.__workers = workers
+
+    @property
+    def positional(self) -> bool:
+        """
+        Getter for whether the index records token positions.
+        """
+        return self.__positional
+
+    @property
+    def read_only(self) -> bool:
+        """
+        Getter for whether the engine only answers queries, without taking its lock.
+        """
+        return self.__read_only
+
+    @property
+    def analyzer(self) -> Analyzer:
+        """
+        Getter for the analyzer applied to indexed files and to queries.
+        """
+        return self.__analyzer
+
+    @property
+    def dedup(self) -> Optional[Deduplicator]:
+        """
+        Getter for the near-duplicate detector new documents go through, if any.
+        """
+        return self.__dedup
+
+    def duplicates(self, file_name : str) -> List[str]:
+        """
+        Returns the near-duplicates collapsed into an indexed document, sorted.
+        """
+        with self.__read_lock:
+            return sorted(self.__duplicates.get(file_name, ()))
+
+    @property
+    def indexed_files(self) -> set:
+        """
+        Getter for the set of indexed files.
+        """
+        return set(self.__manifest)
+
+    @property
+    def manifest(self) -> Dict[str, FileRecord]:
+        """
+        Getter for the mtime, size and content hash recorded for each indexed file.
+        """
+        return self.__manifest
+
+    @property
+    def generation(self) -> int:
+        """
+        Getter for the index generation, which grows every time the index changes.
+        Cached query results are only reused within one generation.
+        """
+        return self.__generation
+
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Getter for the query cache's hit, miss, eviction and invalidation counters.
+        """
+        return self.__cache.stats()
+
+    @property
+    def instrumentation(self) -> instrumentation.Instrumentation:
+        """
+        Getter for the stage timers, counters and query latency histograms.
+        """
+        return self.__instrumentation
+
+    def statistics(self) -> dict:
+        """
+        Returns a snapshot of the instrumentation together with the size of the index
+        and the query and document cache counters.
+        """
+        with self.__read_lock:
+            stats = self.__instrumentation.snapshot()
+            stats["index"] = {"documents": len(self.__manifest), "duplicates": len(self.__canonicals),
+                              "terms": len(self.__storage.index), "postings": self.__storage.posting_count()}
+            stats["cache"] = self.__cache.stats()
+            stats["document_cache"] = self.__documents.stats()
+            return stats
+
+    def export_statistics(self, path : str) -> None:
+        """
+        Writes the statistics snapshot to a JSON file.
+
+        Parameters:
+            path (str): The file to write.
+        """
+        instrumentation.export_stats(self.statistics(), path)
+
+    @property
+    def term_dictionary(self) -> TermDictionary:
+        """
+        Getter for the sorted dictionary of indexed terms used by wildcard and fuzzy
+        lookups. It is rebuilt on first use after the index changes. Multi-word
+        n-gram terms are left out, since query words only stand for single words.
+        """
+        with self.__lock:
+            if self.__terms is None or self.__terms_generation != self.__generation:
+                terms = self.__storage.index
+                if self.__analyzer.ngrams > 1:
+                    terms = [term for term in terms if " " not in term]
+                self.__terms = TermDictionary(terms)
+                self.__terms_generation = self.__generation
+            return self.__terms
+
+    def expand_term(self, pattern : str, max_distance : int = 0) -> List[str]:
+        """
+        Finds the indexed terms a query word stands for.
+
+        Parameters:
+            pattern (str): A lowercase word, or a pattern using the '*' and '?' wildcards.
+            max_distance (int): If above 0, also match terms within this many edits of the word.
+
+        Returns:
+            List[str]: The matching terms.
+        """
+        with self.__read_lock:
+            if has_wildcards(pattern):
+                return self.term_dictionary.wildcard(pattern)
+            if max_distance > 0:
+                return [term for term, _ in self.term_dictionary.fuzzy(pattern, max_distance)]
+            return [pattern] if pattern in self.__storage.index else []
+
+    def index_files(self, folder_path : str, progress : Optional[Callable[[int, int, int], None]] = None,
+                    cancel : Optional[threading.Event] = None, include : Optional[Callable[[str], bool]] = None) -> bool:
+        """
+        Indexes every document under the specified folder and its subfolders: text and
+        HTML files, gzip-compressed or not, and the members of tar archives, which are
+        streamed without being extracted. Files that are unchanged since they were last
+        indexed are skipped, changed files are re-tokenized and documents that were
+        deleted are removed from the index. With more than one worker the files are
+        tokenized in a process pool and the partial indexes are merged in file order.
+
+        Files are tokenized in batches without touching the index, which keeps answering
+        queries from its previous state. Each batch is staged in posting lists of the
+        run's own as it arrives; once every file is read, the run is applied under the
+        engine's lock, adding each term's staged postings in one step. This lets the
+        method run on a background thread, one indexing run at a time.
+
+        Parameters:
+            folder_path (str): The path to the folder containing the web pages.
+            progress (Optional[Callable]): Called after every batch with the number of files
+                done, the total number of files and the number of bytes read so far.
+            cancel (Optional[threading.Event]): When set, indexing stops before the next batch
+                and the index is left unchanged.
+            include (Optional[Callable]): Picks the files of the folder this engine indexes,
+                such as the files of one shard. Files it rejects are treated as absent.
+
+        Returns:
+            bool: Whether the folder was indexed, False if it was missing, indexing failed
+            or was cancelled.
+
+        Raises:
+            RuntimeError: If the engine is read-only.
+        """
+
+        self.__check_writable()
+        stats = self.__instrumentation
+        try:
+            if not os.path.isdir(folder_path):
+                print(f"Error: The folder '{folder_path}' does not exist.")
+                return False
+            started = time.perf_counter()
+            with stats.timer("index.scan"):
+                files = list(crawler.crawl(folder_path))
+                if include is not None:
+                    files = [source for source in files if include(source.path)]
+                root = os.path.join(os.path.abspath(folder_path), "")
+                present = {source.path for source in files}
+                # The manifest records of each file's documents, and documents whose file is gone.
+                held: Dict[str, Dict[str, FileRecord]] = {}
+                deleted = []
+                for key, record in self.__manifest.items():
+                    path = crawler.source_path(key)
+                    if path in present:
+                        held.setdefault(path, {})[key] = record
+                    elif os.path.abspath(path).startswith(root):
+                        deleted.append(key)
+
+            tasks = [(source, held.get(source.path, {})) for source in files]
+            staged = self.__new_staged_index()
+            done = read = 0
+            totals = Counter()
+            for shard_size, (partial_index, updates, removed, timings, counters) in self.__tokenize_shards(tasks):
+                if cancel is not None and cancel.is_set():
+                    print("Indexing cancelled, the index was left unchanged.")
+                    return False
+                with stats.timer("index.stage"):
+                    staged.add(partial_index, updates, removed)
+                for stage, seconds in timings.items():
+                    stats.add_time(stage, seconds)
+                for name, amount in counters.items():
+                    stats.count(name, amount)
+                totals.update(counters)
+                done += shard_size
+                read += counters["bytes_read"]
+                if progress is not None:
+                    progress(done, len(tasks), read)
+
+            with self.__lock, stats.timer("index.merge"):
+                for file_name in deleted:
+                    self.remove_file(file_name)
+                applied = Counter()
+                for updates, removed in staged.batches:
+                    deleted.extend(removed)
+                self.__apply(staged, applied)
+                if self.__orphans:
+                    self.__reindex_orphans(files, applied)
+
+            with self.__lock, stats.timer("index.flush"):
+                self.flush()
+            seconds = time.perf_counter() - started
+            stats.add_time("index.total", seconds)
+            stats.count("files_removed", len(deleted))
+            documents = totals["files_unchanged"] + totals["files_tokenized"]
+            unreadable = f", {totals['files_unreadable']} unreadable" if totals["files_unreadable"] else ""
+            collapsed = ""
+            if applied["collapsed"]:
+                share = applied["postings_skipped"] / max(1, applied["postings_skipped"] + applied["postings_added"])
+                plural = "s" if applied["collapsed"] > 1 else ""
+                collapsed = (f"; collapsed {applied['collapsed']} near-duplicate{plural}, leaving out "
+                             f"{applied['postings_skipped']} postings ({share:.0%})")
+            megabytes = read / (1024 * 1024)
+            print(f"Indexed {documents} web pages from {len(files)} files ({applied['added']} new, "
+                  f"{applied['updated']} changed, {len(deleted)} removed{unreadable}){collapsed}; "
+                  f"read {megabytes:.1f} MB at {megabytes / seconds:.1f} MB/s.")
+            return True
+        except FileNotFoundError:
+            print(f"Error: The folder '{folder_path}' does not exist.")
+        except Exception as e:
+            print(f"An error occurred during indexing: {e}")
+        return False
+
+    def __new_staged_index(self) -> _StagedIndex:
+        return _StagedIndex(self.__new_posting_list, len(self.__doc_lengths),
+                            not self.__storage.append_only or self.__dedup is not None)
+
+    def __apply(self, staged : _StagedIndex, applied : Counter) -> None:
+        """
+        Applies a staged indexing run: removes the documents gone from their archives,
+        stores the new manifest records and adds the staged postings to the index. A
+        new document that is a near-duplicate of an indexed one is collapsed into it
+        and its postings are left out. Counts what it did in applied.
+        """
+        if staged.first_doc_id != len(self.__doc_lengths):
+            raise RuntimeError("The index was changed by something else while the files were being indexed.")
+        collapsed = {}
+        comparisons = self.__near.comparisons if self.__near is not None else 0
+        for updates, removed in staged.batches:
+            for file_name in removed:
+                self.remove_file(file_name)
+            for file_name, record, changed in updates:
+                previous = self.__manifest.get(file_name)
+                if not changed:
+                    record.doc_id = previous.doc_id
+                else:
+                    if previous is not None:
+                        self.remove_file(file_name)
+                        applied["updated"] += 1
+                    else:
+                        applied["added"] += 1
+                    record.doc_id = staged.doc_ids[file_name]
+                    canonical = self.__near.find(record.signature) if self.__near is not None else None
+                    if canonical is not None:
+                        record.canonical = canonical
+                        record.length = 0
+                        collapsed[file_name] = record.doc_id
+                    self.__doc_lengths.append(record.length)
+                self.__set_record(file_name, record)
+        if self.__near is not None:
+            self.__instrumentation.count("dedup_comparisons", self.__near.comparisons - comparisons)
+        skipped = 0
+        for file_name, doc_id in collapsed.items():
+            for term in staged.terms.pop(file_name, ()):
+                staged.index[term].remove(doc_id)
+                skipped += 1
+        added = sum(len(postings) for postings in staged.index.values())
+        if added:
+            index = self.__writable_index()
+            for term, postings in staged.index.items():
+                if not postings:
+                    continue
+                indexed = index.get(term)
+                if indexed is None:
+                    index[term] = postings
+                else:
+                    indexed.extend(postings)
+            if not self.__storage.append_only:
+                self.__file_terms.update(staged.terms)
+            self.__generation += 1
+        self.__instrumentation.count("postings_added", added)
+        applied["postings_added"] += added
+        if collapsed:
+            applied["collapsed"] += len(collapsed)
+            applied["postings_skipped"] += skipped
+            self.__instrumentation.count("documents_collapsed", len(collapsed))
+            self.__instrumentation.count("postings_skipped", skipped)
+
+    def __reindex_orphans(self, files : List[crawler.SourceFile], applied : Counter) -> None:
+        """
+        Finds a new canonical document for every near-duplicate whose canonical
+        document was removed or changed. Those without one are tokenized again and
+        indexed as documents of their own, since they have no postings to fall back on.
+        """
+        orphans, self.__orphans = self.__orphans, set()
+        sources = {source.path: source for source in files}
+        paths = set()
+        for file_name in sorted(orphans):
+            record = self.__manifest.get(file_name)
+            if record is None or record.canonical is None:
+                continue
+            canonical = self.__near.find(record.signature) if self.__near is not None else None
+            if canonical is not None:
+                self.__set_record(file_name, FileRecord(record.mtime, record.size, record.digest, 0, record.offsets,
+                                                        record.signature, canonical, record.doc_id))
+                continue
+            self.remove_file(file_name)
+            if crawler.source_path(file_name) in sources:
+                paths.add(crawler.source_path(file_name))
+        if not paths:
+            return
+        held: Dict[str, Dict[str, FileRecord]] = {path: {} for path in paths}
+        for key, record in self.__manifest.items():
+            path = crawler.source_path(key)
+            if path in held:
+                held[path][key] = record
+        tasks = [(sources[path], held[path]) for path in sorted(paths)]
+        partial_index, updates, removed, timings, counters = _index_shard(tasks, self.__positional, self.__analyzer,
+                                                                          self.__dedup)
+        for stage, seconds in timings.items():
+            self.__instrumentation.add_time(stage, seconds)
+        self.__instrumentation.count("files_tokenized", counters["files_tokenized"])
+        staged = self.__new_staged_index()
+        staged.add(partial_index, updates, removed)
+        self.__apply(staged, applied)
+
+    def __tokenize_shards(self, tasks : list):
+        """
+        Yields (batch size, partial index) pairs in file order. Shards that have not
+        started yet are cancelled if the caller stops iterating.
+        """
+        if self.__workers > 1 and len(tasks) > 1:
+            # Imported only here: multiprocessing would add to the start-up time of every
+            # program using the engine, and most index with a single process.
+            from concurrent.futures import ProcessPoolExecutor
+            shards = list(self.__batches(tasks, self.__workers * 4))
+            executor = ProcessPoolExecutor(max_workers=self.__workers)
+            try:
+                partials = executor.map(partial(_index_shard, positional=self.__positional, analyzer=self.__analyzer,
+                                                dedup=self.__dedup), shards)
+                for shard, result in zip(shards, partials):
+                    yield len(shard), result
+            finally:
+                executor.shutdown(cancel_futures=True)
+        else:
+            for shard in self.__batches(tasks):
+                yield len(shard), _index_shard(shard, self.__positional, self.__analyzer, self.__dedup)
+
+    def __batches(self, tasks : list, count : Optional[int] = None) -> Iterator[list]:
+        """
+        Splits the tasks into batches of at most SHARD_SIZE files and SHARD_BYTES bytes
+        to read, so a few large archives do not end up in one batch. With count, the
+        limits are set so there are about that many batches of similar size instead.
+        """
+        max_files, max_bytes = self.SHARD_SIZE, self.SHARD_BYTES
+        sizes = [source.size if _needs_reading(source, records) else 0 for source, records in tasks]
+        if count is not None:
+            max_files = -(-len(tasks) // count)
+            max_bytes = max(1, -(-sum(sizes) // count))
+        batch, batch_bytes = [], 0
+        for task, size in zip(tasks, sizes):
+            if batch and (len(batch) == max_files or batch_bytes + size > max_bytes):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(task)
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def merge_partial_index(self, partial_index : Dict[str, list], skip : Optional[Set[str]] = None) -> int:
+        """
+        Appends the postings of a partial index built by a worker to the index.
+        The files must already be in the manifest, with doc ids above every
+        indexed file, so posting lists stay sorted by doc id.
+
+        Parameters:
+            partial_index (dict): Term to list of (file path, count, positions or None) triples.
+            skip (Optional[Set[str]]): Files whose postings are left out, such as
+                near-duplicates collapsed into another document.
+
+        Returns:
+            int: The number of postings added.
+
+        Raises:
+            RuntimeError: If the engine is read-only.
+        """
+        self.__check_writable()
+        if not partial_index:
+            return 0
+        added = 0
+        skip = skip or ()
+        with self.__lock:
+            index = self.__writable_index()
+            self.__generation += 1
+            for word, entries in partial_index.items():
+                postings = index.get(word)
+                skipped = 0
+                for file_name, count, positions in entries:
+                    if file_name in skip:
+                        skipped += 1
+                        continue
+                    if postings is None:
+                        postings = index[word] = self.__new_posting_list()
+                    postings.append(self.__manifest[file_name].doc_id, count, positions)
+                    if not self.__storage.append_only:
+                        self.__file_terms.setdefault(file_name, []).append(word)
+                added += len(entries) - skipped
+            self.__instrumentation.count("postings_added", added)
+        return added
+
+    def remove_file(self, file_name : str) -> None:
+        """
+        Removes a file and all of its postings from the index.
+
+        Parameters:
+            file_name (str): The path of the indexed file to remove.
+
+        Raises:
+            RuntimeError: If the engine is read-only.
+        """
+        self.__check_writable()
+        with self.__lock:
+            record = self.__manifest.get(file_name)
+            if record is None:
+                return
+            if self.__storage.append_only:
+                # Segments are immutable: the postings are skipped by queries and
+                # dropped when the segment holding them is merged.
+                self.__storage.delete(record.doc_id)
+            else:
+                index = self.__writable_index()
+                for word in self.__file_terms.pop(file_name, ()):
+                    postings = index.get(word)
+                    if postings is None:
+                        continue
+                    postings.remove(record.doc_id)
+                    if not postings:
+                        del index[word]
+            self.__manifest.pop(file_name)
+            self.__total_length -= record.length
+            self.__doc_names.pop(record.doc_id, None)
+            self.__forget_duplicate(file_name, record)
+            # Its near-duplicates have no postings; index_files finds them another canonical document.
+            self.__orphans.update(self.__duplicates.pop(file_name, ()))
+            self.__orphans.discard(file_name)
+            self.__generation += 1
+
+    def __check_writable(self) -> None:
+        if self.__read_only:
+            raise RuntimeError("The engine is read-only; load a new index instead of changing this one.")
+
+    def __set_record(self, file_name : str, record : FileRecord) -> None:
+        """
+        Stores a manifest record, keeping the total document length used by BM25 in step.
+        """
+        previous = self.__manifest.get(file_name)
+        if previous is not None:
+            self.__total_length -= previous.length
+            self.__forget_duplicate(file_name, previous)
+        if previous is None or previous.doc_id != record.doc_id or previous.canonical != record.canonical:
+            self.__generation += 1
+        # A document whose doc id is unchanged (a file that was only touched) keeps its
+        # place in the doc table, so the table stays in doc id order.
+        if previous is not None and previous.doc_id != record.doc_id:
+            self.__doc_names.pop(previous.doc_id, None)
+        self.__manifest[file_name] = record
+        self.__total_length += record.length
+        self.__doc_names[record.doc_id] = file_name
+        self.__note_duplicate(file_name, record)
+
+    def __note_duplicate(self, file_name : str, record : FileRecord) -> None:
+        """
+        Adds a record to the near-duplicate tables: a canonical document to the LSH
+        index new documents are looked up in, a near-duplicate to its canonical document.
+        """
+        if record.canonical is not None:
+            self.__canonicals[file_name] = record.canonical
+            self.__duplicates.setdefault(record.canonical, set()).add(file_name)
+        elif self.__near is not None and record.signature:
+            self.__near.add(file_name, record.signature)
+
+    def __forget_duplicate(self, file_name : str, record : FileRecord) -> None:
+        if record.canonical is not None:
+            self.__canonicals.pop(file_name, None)
+            duplicates = self.__duplicates.get(record.canonical)
+            if duplicates is not None:
+                duplicates.discard(file_name)
+                if not duplicates:
+                    del self.__duplicates[record.canonical]
+        elif self.__near is not None:
+            self.__near.remove(file_name)
+
+    def __new_posting_list(self) -> PostingList:
+        return PostingList(self.__doc_names, self.__positional)
+
+    def __writable_index(self) -> dict:
+        """
+        Returns the index as a mutable dict, decoding a loaded index file first if needed.
+        """
+        if self.__storage.mapped:
+            for word, postings in self.__storage.writable().items():
+                for doc_id in postings.doc_ids:
+                    self.__file_terms.setdefault(self.__doc_names[doc_id], []).append(word)
+        return self.__storage.writable()
+
+    def flush(self) -> None:
+        """
+        Persists the changes made since the last flush to the storage backend.
+        index_files and load_index flush on their own; with a SegmentStorage the
+        index is then reopened from its segment file.
+        """
+        with self.__lock:
+            manifest = dict(sorted(self.__manifest.items(), key=lambda item: item[1].doc_id))
+            mapped = self.__storage.flush(manifest, self.__positional, self.__new_posting_list, self.__analyzer.spec)
+            if mapped is not None:
+                self.__adopt(mapped)
+
+    def save_index(self, path : str) -> None:
+        """
+        Writes the index and its file manifest to a binary file that later sessions
+        can load instead of re-indexing.
+
+        Parameters:
+            path (str): The file to write the index to.
+        """
+        with self.__lock:
+            manifest = dict(sorted(self.__manifest.items(), key=lambda item: item[1].doc_id))
+            index_storage.save_index(self.__storage.index, path, manifest, self.__positional, self.__analyzer.spec)
+
+    def load_index(self, path : str) -> None:
+        """
+        Replaces the index with one saved by save_index. The file is memory-mapped and
+        postings are decoded on lookup, so loading does not depend on the corpus size.
+
+        Parameters:
+            path (str): The index file to load.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is not a valid index file.
+        """
+        with self.__lock:
+            self.__adopt(self.__storage.open(path, self.__new_posting_list))
+            self.flush()
+
+    def __adopt(self, mapped : Mapping) -> None:
+        """
+        Rebuilds the manifest and document tables from a freshly opened index, either
+        a mapped index file or the segments of a LogStructuredStorage.
+        """
+        self.__positional = mapped.positional
+        spec = mapped.analyzer
+        if spec is None and mapped.doc_count:
+            # Index files from before analyzers were saved only lowercased.
+            spec = Analyzer().spec
+        if spec is not None and spec != self.__analyzer.spec:
+            self.__analyzer = Analyzer.from_spec(spec)
+        self.__manifest = {file_name: FileRecord(*record, doc_id=doc_id)
+                           for doc_id, file_name, record in mapped.documents()}
+        self.__file_terms = {}
+        self.__total_length = sum(record.length for record in self.__manifest.values())
+        self.__doc_names.clear()
+        self.__doc_names.update((record.doc_id, file_name) for file_name, record in self.__manifest.items())
+        self.__near = LSHIndex(self.__dedup) if self.__dedup is not None else None
+        self.__canonicals = {}
+        self.__duplicates = {}
+        for file_name, record in self.__manifest.items():
+            self.__note_duplicate(file_name, record)
+        self.__orphans = {file_name for file_name, canonical in self.__canonicals.items()
+                          if canonical not in self.__manifest}
+        # Doc ids of deleted documents may leave gaps, which keep a length of 0.
+        self.__doc_lengths = array("I", [0]) * mapped.doc_count
+        for record in self.__manifest.values():
+            self.__doc_lengths[record.doc_id] = record.length
+        self.__generation += 1
+
+    def search(self, query : str, limit : Optional[int] = None, max_distance : int = 0) -> dict:
+        """
+        Searches for web pages containing the query words. Words may use the '*' and
+        '?' wildcards ("index*"), and with max_distance misspelled words also match
+        terms within that many edits. Results are cached until the index changes, so
+        repeating a query does not sort its posting lists again.
+
+        Parameters:
+            query (str): The search query entered by the user.
+            limit (Optional[int]): If given, only the top results for each word are kept.
+                They are picked with a bounded heap instead of sorting every posting.
+            max_distance (int): Largest edit distance for fuzzy matches. 0 only matches exact words.
+
+        Returns:
+            Dict mapping each matched term to its postings, highest count first.
+        """
+
+        with self.__read_lock, self.__instrumentation.query("search"):
+            # Plain words are analyzed like indexed text; stopwords are dropped and
+            # wildcard patterns are matched against the indexed terms as written.
+            patterns = {}
+            for word in tokenizer.tokenize_query(query, self.__analyzer.lowercase):
+                pattern = word if has_wildcards(word) else self.__analyzer.term(word)
+                if pattern is not None:
+                    patterns.setdefault(word, pattern)
+            key = ("search", tuple(dict.fromkeys(patterns.values())), limit, max_distance)
+            hit, cached = self.__cache.get(key, self.__generation)
+            if hit:
+                results, missing = cached
+            else:
+                results, missing = {}, {}
+                for pattern in key[1]:
+                    with self.__instrumentation.timer("search.expand"):
+                        terms = self.expand_term(pattern, max_distance)
+                    if not terms:
+                        # Suggest close terms for a plain word that was not found.
+                        suggestions = [] if has_wildcards(pattern) or max_distance else \
+                            self.term_dictionary.fuzzy(pattern, self.SUGGESTION_DISTANCE)
+                        missing[pattern] = [term for term, _ in suggestions[:self.SUGGESTIONS]]
+                    with self.__instrumentation.timer("search.sort"):
+                        for word in terms:
+                            if word not in results:
+                                results[word] = self.__sorted_postings(word, limit)
+                self.__cache.put(key, self.__generation, (results, missing))
+            for word, pattern in patterns.items():
+                if pattern in missing:
+                    suggestions = f" Did you mean: {', '.join(missing[pattern])}?" if missing[pattern] else ""
+                    print(f"'{word}' not found in the index.{suggestions}")
+            return {word: list(postings) for word, postings in results.items()}
+
+    def __sorted_postings(self, word : str, limit : Optional[int]) -> List[WordInfo]:
+        postings = self.__storage.index[word]
+        # Order positions by count first so WordInfo views are only built for
+        # the postings that are returned.
+        if limit is None:
+            order = sorted(range(len(postings)), key=postings.counts.__getitem__, reverse=True)
+        else:
+            order = heapq.nlargest(limit, range(len(postings)), key=postings.counts.__getitem__)
+        return [postings[i] for i in order]
+
+    def term_statistics(self, query : str) -> dict:
+        """
+        Returns the collection statistics BM25 needs for the words of a query: the
+        number of documents, near-duplicates aside, their total length in tokens and
+        the document frequency of every word. Shards of a split index add these up so that every shard
+        scores with the statistics of the whole collection.
+        """
+        with self.__read_lock:
+            terms = sorted(set(self.__analyzer.terms(query)))
+            return {
+                "documents": len(self.__manifest) - len(self.__canonicals),
+                "length": self.__total_length,
+                "frequencies": {word: len(self.__storage.index.get(word) or ()) for word in terms},
+            }
+
+    def ranked_search(self, query : str, k : int = 10, statistics : Optional[dict] = None) -> List[Tuple[str, float]]:
+        """
+        Scores every file containing at least one query word with BM25 and returns
+        the best k as a single ranking. Only the top k are kept in a bounded heap, so
+        posting lists are never sorted. Rankings are cached until the index changes.
+
+        Parameters:
+            query (str): The search query entered by the user.
+            k (int): Maximum number of results to return.
+            statistics (Optional[dict]): Collection statistics in the form returned by
+                term_statistics, used instead of this index's own. Shards pass the
+                totals over every shard so their scores can be compared.
+
+        Returns:
+            List[Tuple[str, float]]: (file path, score) pairs, best first.
+        """
+        with self.__read_lock, self.__instrumentation.query("ranked"):
+            if statistics is None:
+                doc_count = len(self.__manifest) - len(self.__canonicals)
+                total_length, frequencies = self.__total_length, {}
+            else:
+                doc_count, total_length, frequencies = \
+                    statistics["documents"], statistics["length"], statistics["frequencies"]
+            if doc_count == 0 or k < 1 or not self.__manifest:
+                return []
+            terms = tuple(sorted(set(self.__analyzer.terms(query))))
+            key = ("ranked", terms, k, doc_count, total_length, tuple(sorted(frequencies.items())))
+            hit, ranking = self.__cache.get(key, self.__generation)
+            if hit:
+                return list(ranking)
+            average_length = total_length / doc_count or 1.0
+            scores: Dict[int, float] = {}
+            for word in terms:
+                postings = self.__storage.index.get(word)
+                if not postings:
+                    continue
+                document_frequency = frequencies.get(word) or len(postings)
+                idf = math.log(1 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                for doc_id, count in zip(postings.doc_ids, postings.counts):
+                    length = self.__doc_lengths[doc_id] or average_length
+                    norm = self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * length / average_length)
+                    score = idf * count * (self.BM25_K1 + 1) / (count + norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            ranking = [(self.__doc_names[doc_id], score) for doc_id, score in top]
+            self.__cache.put(key, self.__generation, ranking)
+            return list(ranking)
+
+    @property
+    def bm25_matrix(self) -> scoring.BM25Matrix:
+        """
+        Getter for the index as a sparse matrix of BM25 weights, which batch_ranked_search
+        scores queries against. It is rebuilt on first use after the index changes.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+        """
+        with self.__lock:
+            if self.__matrix is None or self.__matrix_generation != self.__generation:
+                self.__matrix = None
+                with self.__instrumentation.timer("batch.build"):
+                    self.__matrix = scoring.BM25Matrix(self.__storage.index, self.__doc_lengths,
+                                                       len(self.__manifest) - len(self.__canonicals),
+                                                       self.__total_length, self.BM25_K1, self.BM25_B)
+                self.__matrix_generation = self.__generation
+            return self.__matrix
+
+    def batch_ranked_search(self, queries : List[str], k : int = 10) -> List[List[Tuple[str, float]]]:
+        """
+        Ranks a batch of queries with BM25, as ranked_search ranks one, such as a query
+        log replayed to evaluate the ranking. With NumPy every query is scored against
+        bm25_matrix with vectorized operations; without it each query goes through
+        ranked_search. Either way the scores are the same.
+
+        Parameters:
+            queries (List[str]): The queries.
+            k (int): Maximum number of results per query.
+
+        Returns:
+            List[List[Tuple[str, float]]]: For every query, its (file path, score) pairs,
+            best first.
+        """
+        if scoring.numpy() is None:
+            return [self.ranked_search(query, k) for query in queries]
+        with self.__read_lock, self.__instrumentation.query("batch"):
+            if k < 1 or not self.__manifest:
+                return [[] for _ in queries]
+            terms = [sorted(set(self.__analyzer.terms(query))) for query in queries]
+            ranked = self.bm25_matrix.top_k(terms, k)
+            self.__instrumentation.count("batch_queries", len(queries))
+            return [[(self.__doc_names[doc_id], score) for doc_id, score in ranking] for ranking in ranked]
+
+    def boolean_search(self, query : str) -> List[str]:
+        """
+        Finds the web pages matching a boolean query such as
+        "python AND (html OR css) AND NOT java". Adjacent words are ANDed.
+        Conjunctions gallop through posting lists sorted by doc id, so their cost
+        follows the rarest term rather than the most common one.
+
+        Parameters:
+            query (str): The boolean query entered by the user.
+
+        Returns:
+            List[str]: Paths of the matching files, in indexing order.
+
+        Raises:
+            ValueError: If the query is malformed.
+        """
+        with self.__read_lock, self.__instrumentation.query("boolean"):
+            tree = query_parser.parse_query(query)
+            key = ("boolean", repr(tree))
+            hit, matches = self.__cache.get(key, self.__generation)
+            if hit:
+                return list(matches)
+            evaluator = query_parser.QueryEvaluator(self.__boolean_postings, self.__indexed_doc_ids)
+            matches = [self.__doc_names[doc_id] for doc_id in evaluator.evaluate(tree)]
+            self.__cache.put(key, self.__generation, matches)
+            return list(matches)
+
+    def __boolean_postings(self, word : str) -> Sequence:
+        term = self.__analyzer.term(word)
+        if term is None:
+            # A stopword is in nearly every document, so it does not narrow the query.
+            return self.__indexed_doc_ids()
+        postings = self.__storage.index.get(term)
+        return postings.doc_ids if postings is not None else []
+
+    def __indexed_doc_ids(self) -> List[int]:
+        """
+        The doc ids of every document with postings, in ascending order as NOT's
+        galloping needs: collapsed near-duplicates are left out, as every other query
+        mode leaves them out.
+        """
+        canonicals = self.__canonicals
+        return sorted(doc_id for doc_id, file_name in self.__doc_names.items() if file_name not in canonicals)
+
+    def phrase_search(self, phrase : str, distance : Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Finds the web pages containing an exact phrase or, when a distance is given,
+        all of the phrase's words within that many words of each other.
+
+        Parameters:
+            phrase (str): The words to look for.
+            distance (Optional[int]): Maximum gap between the first and last word of a match.
+                None asks for the exact phrase.
+
+        Returns:
+            List[Tuple[str, int]]: (file path, number of matches) pairs, most matches first.
+
+        Raises:
+            ValueError: If the index was built without positions.
+        """
+        with self.__read_lock, self.__instrumentation.query("phrase"):
+            if not self.__positional:
+                raise ValueError("Phrase and proximity queries need a positional index.")
+            terms = self.__analyzer.phrase(phrase)
+            key = ("phrase", tuple(terms), distance)
+            hit, results = self.__cache.get(key, self.__generation)
+            if hit:
+                return list(results)
+            results = self.__phrase_matches(terms, distance)
+            self.__cache.put(key, self.__generation, results)
+            return list(results)
+
+    def __phrase_matches(self, phrase : List[Tuple[int, str]], distance : Optional[int]) -> List[Tuple[str, int]]:
+        # Offsets keep the gaps left by stopwords: "state of the art" looks for "art" three words after "state".
+        words = [term for _, term in phrase]
+        offsets = [offset - phrase[0][0] for offset, _ in phrase] if phrase else []
+        terms = list(dict.fromkeys(words))
+        posting_lists = []
+        for word in terms:
+            postings = self.__storage.index.get(word)
+            if not postings:
+                return []
+            posting_lists.append(postings)
+        if not posting_lists:
+            return []
+
+        by_length = sorted(posting_lists, key=len)
+        doc_ids = by_length[0].doc_ids
+        for postings in by_length[1:]:
+            doc_ids = query_parser.intersect(doc_ids, postings.doc_ids)
+
+        cursors = [0] * len(posting_lists)
+        results = []
+        for doc_id in doc_ids:
+            positions = {}
+            for i, postings in enumerate(posting_lists):
+                cursors[i] = query_parser.gallop_to(postings.doc_ids, doc_id, cursors[i])
+                positions[terms[i]] = postings.positions[cursors[i]]
+            if distance is None:
+                matches = query_parser.count_phrase_matches(words, positions, offsets)
+            else:
+                matches = query_parser.count_proximity_matches(list(positions.values()), distance)
+            if matches:
+                results.append((self.__doc_names[doc_id], matches))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def snippet(self, file_name : str, query : str, words : int = SNIPPET_WORDS,
+                terms : Optional[Iterable[str]] = None) -> Optional[snippets.Snippet]:
+        """
+        Builds a snippet of an indexed document: the stretch of its text that holds
+        the most query terms, with the matched words highlighted. With a positional
+        index the matches come from the postings, and only the bytes between the
+        document's checkpoints around them are read; otherwise the start of the
+        document is scanned for the query terms. Reads go through an LRU cache of
+        document blocks, so repeated snippets of a document do not touch the disk.
+
+        Parameters:
+            file_name (str): The document, as indexed.
+            query (str): The query whose words are highlighted.
+            words (int): Number of words in the snippet.
+            terms (Optional[Iterable[str]]): Index terms to highlight instead of the
+                query's, such as the terms a wildcard expanded to.
+
+        Returns:
+            Optional[Snippet]: The snippet, or None if the document is not indexed or
+            can no longer be read as it was indexed.
+        """
+        with self.__read_lock:
+            record = self.__manifest.get(file_name)
+            if record is None:
+                return None
+            terms = set(self.__analyzer.terms(query) if terms is None else terms)
+            matches = self.__snippet_matches(record.doc_id, terms) if self.__positional else None
+        try:
+            with self.__instrumentation.timer("snippet"):
+                if matches is None:
+                    return self.__scanned_snippet(file_name, record, terms, words)
+                window = snippets.best_window(matches, words)
+                highlighted = {position + i for position, covered, _ in matches
+                               if window[0] <= position < window[1] for i in range(covered)}
+                return self.__read_snippet(file_name, record, window, highlighted)
+        except (ValueError,) + READ_ERRORS:
+            return None
+
+    def __snippet_matches(self, doc_id : int, terms : Set[str]) -> List[Tuple[int, int, str]]:
+        """
+        The (word number, words covered, term) of every occurrence of the terms in a
+        document, in word order. An n-gram covers each of its words.
+        """
+        matches = []
+        for term in terms:
+            postings = self.__storage.index.get(term)
+            if not postings:
+                continue
+            i = bisect_left(postings.doc_ids, doc_id)
+            if i < len(postings.doc_ids) and postings.doc_ids[i] == doc_id:
+                covered = term.count(" ") + 1
+                matches.extend((position, covered, term) for position in postings.positions[i])
+        matches.sort()
+        return matches
+
+    def __read_snippet(self, file_name : str, record : FileRecord, window : Tuple[int, int],
+                       highlighted : Set[int]) -> snippets.Snippet:
+        """
+        Reads a window of words from the checkpoint before it, up to the checkpoint
+        after it or, past the last checkpoint, until the word after the window is seen.
+        """
+        first_word, start, end = snippets.checkpoints_around(record.offsets, window[0], window[1])
+        bounded = end is not None
+        if not bounded:
+            end = start + self.SNIPPET_SCAN_BYTES // 4
+        while True:
+            data = self.__documents.read(file_name, record, start, end)
+            complete = len(data) < end - start
+            text = data.decode("utf-8", errors="ignore")
+            if bounded or complete:
+                break
+            # A word cut by the end of the data may be incomplete; read on until the
+            # window's words and the one after it are all there.
+            if len(tokenizer.WORD_PATTERN.findall(text)) > window[1] - first_word + 1:
+                break
+            end += self.SNIPPET_SCAN_BYTES // 4
+        return snippets.build_snippet(text, first_word, window, highlighted, complete)
+
+    def __scanned_snippet(self, file_name : str, record : FileRecord, terms : Set[str],
+                          words : int) -> snippets.Snippet:
+        """
+        Finds the query terms in the start of a document, for an index without positions.
+        """
+        data = self.__documents.read(file_name, record, 0, self.SNIPPET_SCAN_BYTES)
+        complete = len(data) < self.SNIPPET_SCAN_BYTES
+        text = data.decode("utf-8", errors="ignore")
+        if not complete:
+            # Leave out the last word, which the end of the data may have cut.
+            text = text[:max(text.rfind(" "), text.rfind("\n"), 0)]
+        matches = []
+        with self.__read_lock:
+            for position, word in enumerate(tokenizer.WORD_PATTERN.findall(text)):
+                term = self.__analyzer.term(word)
+                if term in terms:
+                    matches.append((position, 1, term))
+        window = snippets.best_window(matches, words)
+        highlighted = {position for position, _, _ in matches}
+        return snippets.build_snippet(text, 0, window, highlighted, complete)
+
+    def __print_snippet(self, file_name : str, query : str, terms : Optional[Iterable[str]] = None) -> None:
+        snippet = self.snippet(file_name, query, terms=terms)
+        if snippet is not None and snippet.text:
+            print(f"    {snippet.marked()}")
+
+    def display_search_results(self, sorted_results : dict, query : str) -> None:
+        """
+        Displays the search results to the user, with a snippet under each of the
+        first SNIPPET_RESULTS results for every word.
+
+        Parameters:
+            sorted_results (list): List of tuples containing web page filenames and scores.
+            query (str): The original search` query.
+        """
+
+        with self.__instrumentation.timer("render"):
+            for word, word_info_list in sorted_results.items():
+                if word_info_list:
+                    print(f"\nSearch results for '{word}':")
+                    for rank, wi in enumerate(word_info_list):
+                        print(f"{wi} match(es)")
+                        if rank < self.SNIPPET_RESULTS:
+                            self.__print_snippet(wi.file_name, query, terms=[word])
+                else :
+                    print(f"'{word}' not found in the index.")
+            print("-" * 40)
+
+    def display_ranked_results(self, ranked_results : List[Tuple[str, float]], query : str) -> None:
+        """
+        Displays a BM25 ranking to the user, with a snippet under each result and the
+        number of near-duplicates collapsed into it.
+
+        Parameters:
+            ranked_results (list): (file path, score) pairs, best first.
+            query (str): The original search query.
+        """
+
+        with self.__instrumentation.timer("render"):
+            if not ranked_results:
+                print(f"No results found for '{query}'.")
+            else:
+                print(f"\nRanked results for '{query}':")
+                for rank, (file_name, score) in enumerate(ranked_results, start=1):
+                    duplicates = len(self.__duplicates.get(file_name, ()))
+                    similar = f" (+{duplicates} near-duplicate{'s' if duplicates > 1 else ''})" if duplicates else ""
+                    print(f"{rank}. {file_name} - {score:.3f}{similar}")
+                    self.__print_snippet(file_name, query)
+            print("-" * 40)
+
+    def display_boolean_results(self, matches : List[str], query : str) -> None:
+        """
+        Displays the files matching a boolean query, with a snippet under each of the
+        first SNIPPET_RESULTS files.
+
+        Parameters:
+            matches (list): Paths of the matching files.
+            query (str): The original search query.
+        """
+
+        with self.__instrumentation.timer("render"):
+            if not matches:
+                print(f"No files match '{query}'.")
+            else:
+                print(f"\n{len(matches)} file(s) match '{query}':")
+                words = " ".join(query_parser.query_words(query_parser.parse_query(query)))
+                for rank, file_name in enumerate(matches):
+                    print(file_name)
+                    if rank < self.SNIPPET_RESULTS:
+                        self.__print_snippet(file_name, words)
+            print("-" * 40)
+
+    def display_phrase_results(self, phrase_results : List[Tuple[str, int]], query : str) -> None:
+        """
+        Displays the files matching a phrase or proximity query, with a snippet under
+        each of the first SNIPPET_RESULTS files.
+
+        Parameters:
+            phrase_results (list): (file path, number of matches) pairs.
+            query (str): The original search query.
+        """
+
+        with self.__instrumentation.timer("render"):
+            if not phrase_results:
+                print(f"No files match '{query}'.")
+            else:
+                print(f"\nPhrase results for '{query}':")
+                phrase, _ = query_parser.parse_phrase_query(query)
+                for rank, (file_name, matches) in enumerate(phrase_results):
+                    print(f"{file_name} - {matches} match(es)")
+                    if rank < self.SNIPPET_RESULTS:
+                        self.__print_snippet(file_name, phrase)
+            print("-" * 40)
+
+    def view_file_content(self) -> None:
+        """
+        Displays the content of the specified file if it has been indexed.
+        """
+        while True:
+            file_name = input("Enter the name of the file you wish to view: ").strip()
+            
+            if not file_name:
+                print("Please enter a valid file name.")
+                continue
+            
+            if file_name not in self.__manifest and not os.path.isfile(file_name):
+                print(f"Error: The file '{file_name}' does not exist or was not indexed.")
+                retry = input("Do you want to try again? (y/n): ").strip().lower()
+                if retry == 'y':
+                    continue
+                else:
+                    break
+            try:
+                content = "".join(crawler.open_document(file_name).text())
+                print(f"\nContent of '{file_name}':")
+                print(content)
+            except Exception as e:
+                print(f"An error occurred while reading the file: {e}")
+            break
+            
+    def get_indexed_files(self) -> List[str]:
+        """
+        Retrieves a sorted list of all indexed file paths.
+
+        Returns:
+            List[str]: List of indexed file paths.
+        """
+        return sorted(self.__manifest)
+
+    def get_file_content(self, file_path: str) -> str:
+        """
+        Retrieves the content of the specified file: its text, without markup for
+        HTML pages. Documents inside archives are read from the archive.
+
+        Parameters:
+            file_path (str): The full path of the file to retrieve.
+
+        Returns:
+            str: The content of the file.
+
+        Raises:
+            FileNotFoundError: If the file is not indexed or does not exist.
+            Exception: For any other issues during file reading.
+        """
+        if not file_path:
+            raise ValueError("File path must be provided.")
+
+        if file_path not in self.__manifest:
+            raise FileNotFoundError(f"The file '{file_path}' is not indexed or does not exist.")
+
+        try:
+            return "".join(crawler.open_document(file_path).text())
+        except FileNotFoundError:
+            raise FileNotFoundError(f"The file '{file_path}' does not exist.")
+        except Exception as e:
+            raise Exception(f"An error occurred while reading the file: {e}")
+
+    def read_file_chunks(self, file_path: str, chunk_size: int = tokenizer.CHUNK_SIZE) -> Iterator[str]:
+        """
+        Reads the content of an indexed file lazily, one chunk at a time, so a viewer
+        can show the start of a large file without loading all of it.
+
+        Parameters:
+            file_path (str): The full path of the file to read.
+            chunk_size (int): Number of bytes read at a time.
+
+        Returns:
+            Iterator[str]: Consecutive pieces of the file's text.
+
+        Raises:
+            FileNotFoundError: If the file is not indexed or does not exist.
+        """
+        if not file_path:
+            raise ValueError("File path must be provided.")
+
+        if file_path not in self.__manifest:
+            raise FileNotFoundError(f"The file '{file_path}' is not indexed or does not exist.")
+
+        return crawler.open_document(file_path).text(chunk_size)
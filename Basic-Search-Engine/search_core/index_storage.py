@@ -0,0 +1,343 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+# File layout (all integers little-endian):
+#   header        MAGIC, version, flags, doc count, term count, then the byte offsets
+#                 of the doc table, the term table and the postings section
+#   analyzer      UTF-8 JSON settings of the analyzer that produced the terms, up to
+#                 the doc table (version 5; version 4 files have none and were plain)
+#   doc table     doc count fixed-size entries (u64 offset of the doc's entry in the doc blob)
+#   doc blob      per document: varint length + UTF-8 path, then its manifest
+#                 record (f64 mtime, u64 size, 20-byte SHA-1 of the content,
+#                 u64 length in tokens), then (version 6) varint length + its
+#                 offset table, the checkpoints snippets seek to, then (version 7)
+#                 varint length + its near-duplicate signature and varint length +
+#                 UTF-8 path of the document it was collapsed into, empty if none
+#   term table    term count fixed-size entries sorted by term bytes:
+#                 (u64 term blob offset, u64 postings offset, u32 posting count)
+#   term blob     varint length + UTF-8 term, one per term
+#   postings      per term: delta-encoded doc ids, then the counts, then (only when
+#                 FLAG_POSITIONS is set) each posting's delta-encoded token
+#                 positions, all varints
+MAGIC = b"BSEIDX01"
+VERSION = 7
+READABLE_VERSIONS = (4, 5, 6, 7)
+FLAG_POSITIONS = 1
+HEADER = struct.Struct("<8sIIIIQQQ")
+DOC_ENTRY = struct.Struct("<Q")
+TERM_ENTRY = struct.Struct("<QQI")
+FILE_RECORD = struct.Struct("<dQ20sQ")
+
+
+def encode_varint(value : int, out : bytearray) -> None:
+    """
+    Appends an unsigned integer to a buffer using 7 bits per byte.
+
+    Parameters:
+        value (int): The non-negative integer to encode.
+        out (bytearray): The buffer the encoded bytes are appended to.
+    """
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(buffer, offset : int) -> Tuple[int, int]:
+    """
+    Reads one varint from a buffer.
+
+    Parameters:
+        buffer: Any object supporting integer indexing (bytes, mmap).
+        offset (int): Position of the first byte of the varint.
+
+    Returns:
+        Tuple[int, int]: The decoded value and the offset right after it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def save_index(index : Mapping, path : str, manifest : Mapping, positional : bool = False,
+               analyzer : Optional[dict] = None) -> None:
+    """
+    Writes an inverted index to a compact binary file.
+
+    Parameters:
+        index (Mapping): Term to posting list with doc_ids, counts and positions columns.
+            Terms without postings are left out.
+        path (str): Destination file. It is replaced atomically.
+        manifest (Mapping): File path to a record with mtime, size, digest, length,
+            offsets, signature, canonical and doc_id attributes, in ascending doc id order. Doc ids are renumbered
+            0, 1, 2... in that order.
+        positional (bool): Whether to save the token positions of every posting.
+        analyzer (Optional[dict]): Settings of the analyzer the terms came from, as
+            returned by Analyzer.spec, so the index is queried with the same analysis.
+    """
+    analyzer_blob = json.dumps(analyzer, sort_keys=True).encode("utf-8") if analyzer is not None else b""
+    doc_ids: Dict[int, int] = {}
+    doc_table = bytearray()
+    doc_blob = bytearray()
+    for file_name, record in manifest.items():
+        doc_ids[record.doc_id] = len(doc_ids)
+        doc_table += DOC_ENTRY.pack(len(doc_blob))
+        encoded = file_name.encode("utf-8")
+        encode_varint(len(encoded), doc_blob)
+        doc_blob += encoded
+        doc_blob += FILE_RECORD.pack(record.mtime, record.size, record.digest, record.length)
+        for blob in (record.offsets, record.signature, (record.canonical or "").encode("utf-8")):
+            encode_varint(len(blob), doc_blob)
+            doc_blob += blob
+
+    terms = sorted((term.encode("utf-8"), term) for term in index)
+    term_count = 0
+    term_table = bytearray()
+    term_blob = bytearray()
+    postings_blob = bytearray()
+    for encoded, term in terms:
+        postings = index[term]
+        if not len(postings):
+            continue
+        term_count += 1
+        term_table += TERM_ENTRY.pack(len(term_blob), len(postings_blob), len(postings))
+        encode_varint(len(encoded), term_blob)
+        term_blob += encoded
+        previous = 0
+        for doc_id in postings.doc_ids:
+            doc_id = doc_ids[doc_id]
+            encode_varint(doc_id - previous, postings_blob)
+            previous = doc_id
+        for count in postings.counts:
+            encode_varint(count, postings_blob)
+        if positional:
+            for positions in postings.positions:
+                previous = 0
+                for position in positions:
+                    encode_varint(position - previous, postings_blob)
+                    previous = position
+
+    doc_table_offset = HEADER.size + len(analyzer_blob)
+    term_table_offset = doc_table_offset + len(doc_table) + len(doc_blob)
+    postings_offset = term_table_offset + len(term_table) + len(term_blob)
+    header = HEADER.pack(MAGIC, VERSION, FLAG_POSITIONS if positional else 0, len(doc_ids), term_count,
+                         doc_table_offset, term_table_offset, postings_offset)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        for part in (header, analyzer_blob, doc_table, doc_blob, term_table, term_blob, postings_blob):
+            file.write(part)
+    os.replace(tmp_path, path)
+
+
+class MappedIndex(Mapping):
+    """
+    Read-only view of an index file. The file is memory-mapped and a term's
+    postings are only decoded when the term is looked up.
+    """
+    def __init__(self, path : str, posting_list_type : Callable) -> None:
+        self.__posting_list_type = posting_list_type
+        self.__file = open(path, "rb")
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.__file.close()
+            raise ValueError(f"The file '{path}' is not a valid index file.")
+        if len(self.__map) < HEADER.size:
+            self.close()
+            raise ValueError(f"The file '{path}' is not a valid index file.")
+        magic, version, flags, self.__doc_count, self.__term_count, \
+            self.__doc_table, self.__term_table, self.__postings = HEADER.unpack_from(self.__map, 0)
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            self.close()
+            raise ValueError(f"The file '{path}' is not a valid index file.")
+        analyzer_blob = self.__map[HEADER.size:self.__doc_table]
+        self.__analyzer = json.loads(analyzer_blob) if analyzer_blob else None
+        self.__doc_blob = self.__doc_table + self.__doc_count * DOC_ENTRY.size
+        self.__term_blob = self.__term_table + self.__term_count * TERM_ENTRY.size
+        self.__positional = bool(flags & FLAG_POSITIONS)
+        self.__version = version
+
+    @property
+    def positional(self) -> bool:
+        """
+        Whether the file stores token positions for every posting.
+        """
+        return self.__positional
+
+    @property
+    def analyzer(self) -> Optional[dict]:
+        """
+        Settings of the analyzer the file's terms came from, or None for a plain index.
+        """
+        return self.__analyzer
+
+    def close(self) -> None:
+        self.__map.close()
+        self.__file.close()
+
+    @property
+    def doc_count(self) -> int:
+        """
+        Number of documents in the file. Their doc ids are 0 to doc_count - 1.
+        """
+        return self.__doc_count
+
+    def documents(self) -> Iterator[Tuple[int, str, Tuple[float, int, bytes, int, bytes, bytes, Optional[str]]]]:
+        """
+        Yields the doc id, path and (mtime, size, digest, length, offsets, signature,
+        canonical) record of each document, in doc id order. Files older than version 6
+        have no offset tables and files older than version 7 no near-duplicates; they
+        give empty offsets and signatures and no canonical document.
+        """
+        # Every document is decoded when an index is opened, so this loop is part of
+        # the start-up time: the doc table is unpacked at once and one-byte varints,
+        # which almost every length is, are read inline.
+        view, doc_blob = self.__map, self.__doc_blob
+        table = view[self.__doc_table:self.__doc_table + self.__doc_count * DOC_ENTRY.size]
+        # Version 6 added the offset table, version 7 the signature and canonical path.
+        blob_count = 3 if self.__version >= 7 else 1 if self.__version >= 6 else 0
+        unpack_record, record_size = FILE_RECORD.unpack_from, FILE_RECORD.size
+        for doc_id, (offset,) in enumerate(DOC_ENTRY.iter_unpack(table)):
+            start = doc_blob + offset
+            length = view[start]
+            if length < 0x80:
+                start += 1
+            else:
+                length, start = decode_varint(view, start)
+            name = view[start:start + length].decode("utf-8")
+            record = unpack_record(view, start + length)
+            start += length + record_size
+            blobs = [b"", b"", b""]
+            for i in range(blob_count):
+                size = view[start]
+                if size < 0x80:
+                    start += 1
+                else:
+                    size, start = decode_varint(view, start)
+                blobs[i] = view[start:start + size]
+                start += size
+            offsets, signature, canonical = blobs
+            yield doc_id, name, record + (offsets, signature, canonical.decode("utf-8") or None)
+
+    @property
+    def manifest(self) -> Dict[str, Tuple[float, int, bytes, int, bytes, bytes, Optional[str]]]:
+        """
+        The (mtime, size, digest, length, offsets, signature, canonical) record saved
+        for each document, keyed by path and in doc id order.
+        """
+        return {name: record for _, name, record in self.documents()}
+
+    def __term_entry(self, position : int) -> Tuple[bytes, int, int]:
+        blob_offset, postings_offset, count = TERM_ENTRY.unpack_from(
+            self.__map, self.__term_table + position * TERM_ENTRY.size)
+        length, start = decode_varint(self.__map, self.__term_blob + blob_offset)
+        return self.__map[start:start + length], postings_offset, count
+
+    def __find(self, term : str):
+        """Binary search over the sorted term table."""
+        key = term.encode("utf-8")
+        low, high = 0, self.__term_count
+        while low < high:
+            middle = (low + high) // 2
+            encoded, postings_offset, count = self.__term_entry(middle)
+            if encoded < key:
+                low = middle + 1
+            elif encoded > key:
+                high = middle
+            else:
+                return postings_offset, count
+        return None
+
+    def __decode_postings(self, postings_offset : int, count : int) -> list:
+        offset = self.__postings + postings_offset
+        doc_ids = []
+        doc_id = 0
+        for _ in range(count):
+            delta, offset = decode_varint(self.__map, offset)
+            doc_id += delta
+            doc_ids.append(doc_id)
+        counts = []
+        for _ in range(count):
+            term_count, offset = decode_varint(self.__map, offset)
+            counts.append(term_count)
+        postings = self.__posting_list_type()
+        for doc_id, term_count in zip(doc_ids, counts):
+            positions = None
+            if self.__positional:
+                positions = array("I")
+                position = 0
+                for _ in range(term_count):
+                    delta, offset = decode_varint(self.__map, offset)
+                    position += delta
+                    positions.append(position)
+            postings.append(doc_id, term_count, positions)
+        return postings
+
+    def __getitem__(self, term : str) -> list:
+        entry = self.__find(term) if isinstance(term, str) else None
+        if entry is None:
+            raise KeyError(term)
+        return self.__decode_postings(*entry)
+
+    def __contains__(self, term) -> bool:
+        return isinstance(term, str) and self.__find(term) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(self.__term_count):
+            yield self.__term_entry(position)[0].decode("utf-8")
+
+    def __len__(self) -> int:
+        return self.__term_count
+
+    @property
+    def posting_count(self) -> int:
+        """
+        Total number of postings in the file, read from the term table without decoding them.
+        """
+        table = memoryview(self.__map)[self.__term_table:self.__term_table + self.__term_count * TERM_ENTRY.size]
+        try:
+            return sum(count for _, _, count in TERM_ENTRY.iter_unpack(table))
+        finally:
+            table.release()
+
+    def to_dict(self) -> Dict[str, list]:
+        """
+        Decodes the whole file into a regular in-memory index.
+        """
+        index = {}
+        for position in range(self.__term_count):
+            encoded, postings_offset, count = self.__term_entry(position)
+            index[encoded.decode("utf-8")] = self.__decode_postings(postings_offset, count)
+        return index
+
+
+def load_index(path : str, posting_list_type : Callable) -> MappedIndex:
+    """
+    Opens an index file written by save_index without decoding its postings.
+
+    Parameters:
+        path (str): The index file to open.
+        posting_list_type (Callable): Returns an empty posting list for a term. Decoded
+            postings are added with its append(doc_id, count, positions) method;
+            positions is None unless the file is positional.
+
+    Returns:
+        MappedIndex: A lazily decoded, read-only mapping of term to postings.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file is not an index file.
+    """
+    return MappedIndex(path, posting_list_type)
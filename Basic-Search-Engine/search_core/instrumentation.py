@@ -0,0 +1,170 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with logarithmic buckets, each GROWTH times wider than the
+    previous one. Memory stays constant however many samples are recorded, and
+    percentiles are accurate to within one bucket (about 5%).
+    """
+    GROWTH = 1.05
+    SMALLEST = 1e-6  # seconds
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds : float) -> None:
+        bucket = 0 if seconds <= self.SMALLEST else int(math.log(seconds / self.SMALLEST, self.GROWTH)) + 1
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction : float) -> float:
+        """
+        Returns the latency below which the given fraction of samples fall, in seconds.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                upper = self.SMALLEST * self.GROWTH ** bucket
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """
+        Returns the sample count and the mean, p50, p95, p99 and max latencies in milliseconds.
+        """
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class Instrumentation:
+    """
+    Collects per-stage timers, counters and per-query-kind latency histograms.
+    Every method is thread-safe, so indexing on a background thread and searching
+    on the main thread can report into the same instance.
+    """
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.__stages: Dict[str, list] = {}
+            self.__counters: Dict[str, int] = {}
+            self.__queries: Dict[str, LatencyHistogram] = {}
+
+    def add_time(self, stage : str, seconds : float, calls : int = 1) -> None:
+        """
+        Adds time spent in a stage, for stages timed elsewhere (e.g. in worker processes).
+        """
+        with self.__lock:
+            totals = self.__stages.setdefault(stage, [0, 0.0])
+            totals[0] += calls
+            totals[1] += seconds
+
+    @contextmanager
+    def timer(self, stage : str) -> Iterator[None]:
+        """
+        Times the enclosed block as one call of a stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def count(self, name : str, amount : int = 1) -> None:
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + amount
+
+    def record_query(self, kind : str, seconds : float) -> None:
+        with self.__lock:
+            histogram = self.__queries.get(kind)
+            if histogram is None:
+                histogram = self.__queries[kind] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def query(self, kind : str) -> Iterator[None]:
+        """
+        Records the latency of the enclosed query in the histogram of its kind.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_query(kind, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the stages (calls and total milliseconds), counters and query
+        latency summaries as plain data.
+        """
+        with self.__lock:
+            return {
+                "stages": {stage: {"calls": calls, "total_ms": seconds * 1000}
+                           for stage, (calls, seconds) in sorted(self.__stages.items())},
+                "counters": dict(sorted(self.__counters.items())),
+                "queries": {kind: histogram.summary() for kind, histogram in sorted(self.__queries.items())},
+            }
+
+
+def format_stats(stats : dict) -> str:
+    """
+    Formats a statistics snapshot as a human-readable report.
+    """
+    lines = []
+    if stats.get("index"):
+        lines.append("Index:")
+        lines.extend(f"  {name:<24} {value}" for name, value in stats["index"].items())
+    if stats.get("stages"):
+        lines.append("Stages:")
+        lines.append(f"  {'stage':<24} {'calls':>8} {'total (ms)':>12}")
+        lines.extend(f"  {stage:<24} {totals['calls']:>8} {totals['total_ms']:>12.1f}"
+                     for stage, totals in stats["stages"].items())
+    if stats.get("counters"):
+        lines.append("Counters:")
+        lines.extend(f"  {name:<24} {value}" for name, value in stats["counters"].items())
+    if stats.get("queries"):
+        lines.append("Query latency:")
+        lines.append(f"  {'kind':<10} {'count':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}")
+        for kind, summary in stats["queries"].items():
+            if summary["count"]:
+                lines.append(f"  {kind:<10} {summary['count']:>7} {summary['p50_ms']:>9.3f} {summary['p95_ms']:>9.3f} "
+                             f"{summary['p99_ms']:>9.3f} {summary['max_ms']:>9.3f}")
+    if stats.get("cache"):
+        lines.append("Query cache:")
+        lines.extend(f"  {name:<24} {value}" for name, value in stats["cache"].items())
+    return "\n".join(lines)
+
+
+def export_stats(stats : dict, path : str, indent : Optional[int] = 2) -> None:
+    """
+    Writes a statistics snapshot to a JSON file.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(stats, file, indent=indent)
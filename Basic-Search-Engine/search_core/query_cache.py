@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of query results. Every lookup passes the index generation
+    it is valid for; when the generation moves on, all cached results are dropped
+    at once, so results computed from an older index are never returned. It is
+    safe to share between threads.
+    """
+    def __init__(self, capacity : int = 128) -> None:
+        """
+        Parameters:
+            capacity (int): Maximum number of cached queries. 0 disables caching.
+        """
+        if not isinstance(capacity, int) or isinstance(capacity, bool):
+            raise TypeError("Invalid type!")
+        if capacity < 0:
+            raise ValueError("Cache capacity cannot be negative.")
+        self.__capacity = capacity
+        self.__entries: OrderedDict = OrderedDict()
+        self.__generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __sync(self, generation : int) -> None:
+        if generation != self.__generation:
+            if self.__entries:
+                self.invalidations += 1
+                self.__entries.clear()
+            self.__generation = generation
+
+    def get(self, key : Hashable, generation : int) -> Tuple[bool, Any]:
+        """
+        Looks up a query.
+
+        Parameters:
+            key (Hashable): The normalised query.
+            generation (int): The current index generation.
+
+        Returns:
+            Tuple[bool, Any]: Whether the query was cached, and its result.
+        """
+        with self.__lock:
+            self.__sync(generation)
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return True, self.__entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key : Hashable, generation : int, value : Any) -> None:
+        """
+        Stores a query result, evicting the least recently used one if the cache is full.
+
+        Parameters:
+            key (Hashable): The normalised query.
+            generation (int): The index generation the result was computed from.
+            value (Any): The result.
+        """
+        if self.__capacity == 0:
+            return
+        with self.__lock:
+            self.__sync(generation)
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            if len(self.__entries) > self.__capacity:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit, miss, eviction and invalidation counters with the current size.
+        """
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self.__entries),
+                "capacity": self.__capacity,
+            }
@@ -0,0 +1,300 @@
+import heapq
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Boolean query syntax:
+#   expression := or_expr
+#   or_expr    := and_expr ("OR" and_expr)*
+#   and_expr   := not_expr (["AND"] not_expr)*     adjacent terms are ANDed
+#   not_expr   := "NOT" not_expr | "(" expression ")" | word
+# Operators must be written in upper case; any other word is a search term.
+# The parser produces nested tuples: ("term", word), ("not", node),
+# ("and", [nodes]) and ("or", [nodes]).
+TOKEN_PATTERN = re.compile(r'\(|\)|\w+')
+OPERATORS = ("AND", "OR", "NOT")
+
+
+class _Parser:
+    def __init__(self, query : str) -> None:
+        self.tokens = TOKEN_PATTERN.findall(query)
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self) -> tuple:
+        if not self.tokens:
+            raise ValueError("Empty query.")
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected '{self.peek()}' in query.")
+        return node
+
+    def parse_or(self) -> tuple:
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and(self) -> tuple:
+        children = [self.parse_not()]
+        while self.peek() not in (None, ")", "OR"):
+            if self.peek() == "AND":
+                self.take()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_not(self) -> tuple:
+        token = self.peek()
+        if token is None:
+            raise ValueError("Query ends unexpectedly.")
+        if token == "NOT":
+            self.take()
+            return ("not", self.parse_not())
+        if token == "(":
+            self.take()
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise ValueError("Missing ')' in query.")
+            self.take()
+            return node
+        if token == ")" or token in OPERATORS:
+            raise ValueError(f"Unexpected '{token}' in query.")
+        return ("term", self.take().lower())
+
+
+def parse_query(query : str) -> tuple:
+    """
+    Parses a boolean query into a tree of nested tuples.
+
+    Parameters:
+        query (str): A query using AND, OR, NOT and parentheses.
+
+    Returns:
+        tuple: The root node of the query tree.
+
+    Raises:
+        ValueError: If the query is empty or malformed.
+    """
+    return _Parser(query).parse()
+
+
+def query_words(node : tuple) -> List[str]:
+    """
+    Returns the words a document matching a query tree can contain, in query
+    order: every term except those under a NOT.
+    """
+    kind, value = node
+    if kind == "term":
+        return [value]
+    if kind == "not":
+        return []
+    return [word for child in value for word in query_words(child)]
+
+
+def gallop_to(postings : Sequence, target : int, low : int, key : Optional[Callable] = None) -> int:
+    """
+    Finds the first position at or after low whose doc id is >= target. The search
+    doubles its step from low before bisecting, so skipping ahead by d entries
+    costs O(log d) instead of O(log n).
+
+    Parameters:
+        postings (Sequence): Postings sorted by doc id.
+        target (int): The doc id to look for.
+        low (int): Position to start from.
+        key (Optional[Callable]): Extracts the doc id from a posting. Defaults to the posting itself.
+
+    Returns:
+        int: The position found, or len(postings) if every doc id is smaller.
+    """
+    size = len(postings)
+    step = 1
+    high = low
+    while high < size and (key(postings[high]) if key else postings[high]) < target:
+        low = high + 1
+        high += step
+        step *= 2
+    return bisect_left(postings, target, low, min(high, size), key=key)
+
+
+def intersect(doc_ids : Sequence[int], postings : Sequence, key : Optional[Callable] = None) -> List[int]:
+    """
+    Doc ids present in both a short sorted list and a (usually longer) posting list.
+    Costs O(len(doc_ids) * log(len(postings) / len(doc_ids))).
+    """
+    result = []
+    position = 0
+    size = len(postings)
+    for doc_id in doc_ids:
+        position = gallop_to(postings, doc_id, position, key)
+        if position == size:
+            break
+        if (key(postings[position]) if key else postings[position]) == doc_id:
+            result.append(doc_id)
+    return result
+
+
+def difference(doc_ids : Sequence[int], postings : Sequence, key : Optional[Callable] = None) -> List[int]:
+    """
+    Doc ids of a sorted list that are not in a posting list.
+    """
+    result = []
+    position = 0
+    size = len(postings)
+    for doc_id in doc_ids:
+        position = gallop_to(postings, doc_id, position, key)
+        if position == size or (key(postings[position]) if key else postings[position]) != doc_id:
+            result.append(doc_id)
+    return result
+
+
+def union(lists : List[Sequence[int]]) -> List[int]:
+    """
+    Sorted, de-duplicated merge of several sorted doc id lists.
+    """
+    result = []
+    for doc_id in heapq.merge(*lists):
+        if not result or result[-1] != doc_id:
+            result.append(doc_id)
+    return result
+
+
+class QueryEvaluator:
+    """
+    Evaluates query trees against posting lists sorted by doc id.
+    """
+    def __init__(self, postings_of : Callable, all_doc_ids : Callable, key : Optional[Callable] = None) -> None:
+        """
+        Parameters:
+            postings_of (Callable): Returns the posting list of a term, sorted by doc id.
+            all_doc_ids (Callable): Returns every doc id in ascending order, used by NOT.
+            key (Optional[Callable]): Extracts the doc id from a posting.
+        """
+        self.postings_of = postings_of
+        self.all_doc_ids = all_doc_ids
+        self.key = key
+
+    def evaluate(self, node : tuple) -> List[int]:
+        """
+        Returns the sorted doc ids matching a query tree.
+        """
+        kind = node[0]
+        if kind == "term":
+            postings = self.postings_of(node[1])
+            return [self.key(p) for p in postings] if self.key else list(postings)
+        if kind == "or":
+            return union([self.evaluate(child) for child in node[1]])
+        if kind == "not":
+            return self._and([node])
+        return self._and(node[1])
+
+    def _and(self, children : List[tuple]) -> List[int]:
+        # Terms stay as raw posting lists so they can be galloped over without
+        # decoding every doc id; only the shortest operand is walked in full.
+        positives, negatives = [], []
+        for child in children:
+            if child[0] == "not":
+                negatives.append(self._operand(child[1]))
+            else:
+                positives.append(self._operand(child))
+        positives.sort(key=lambda operand: len(operand[0]))
+        if positives:
+            postings, key = positives[0]
+            result = [key(p) for p in postings] if key else list(postings)
+        else:
+            result = list(self.all_doc_ids())
+        for postings, key in positives[1:]:
+            if not result:
+                break
+            result = intersect(result, postings, key)
+        for postings, key in negatives:
+            if not result:
+                break
+            result = difference(result, postings, key)
+        return result
+
+    def _operand(self, node : tuple):
+        if node[0] == "term":
+            return self.postings_of(node[1]), self.key
+        return self.evaluate(node), None
+
+
+PHRASE_PATTERN = re.compile(r'^\s*"?(.*?)"?\s*(?:~\s*(\d+))?\s*$', re.DOTALL)
+
+
+def parse_phrase_query(query : str) -> Tuple[str, Optional[int]]:
+    """
+    Splits a phrase query into its words and an optional proximity distance.
+    '"machine learning"' is an exact phrase; 'machine learning ~5' asks for the
+    words to appear within 5 words of each other, in any order.
+
+    Parameters:
+        query (str): The phrase query entered by the user.
+
+    Returns:
+        Tuple[str, Optional[int]]: The phrase and the distance, or None for an exact phrase.
+    """
+    match = PHRASE_PATTERN.match(query)
+    phrase, distance = match.group(1), match.group(2)
+    return phrase, int(distance) if distance is not None else None
+
+
+def count_phrase_matches(words : List[str], positions : Dict[str, Sequence[int]],
+                         offsets : Optional[List[int]] = None) -> int:
+    """
+    Counts the places where the words appear consecutively, in order.
+
+    Parameters:
+        words (List[str]): The phrase, one word per token.
+        positions (Dict[str, Sequence[int]]): Token positions of each word in one document.
+        offsets (Optional[List[int]]): Position of each word relative to the first, for
+            phrases with gaps such as removed stopwords. Defaults to 0, 1, 2...
+
+    Returns:
+        int: Number of occurrences of the phrase.
+    """
+    if offsets is None:
+        offsets = range(len(words))
+    starts = set(positions[words[0]])
+    for offset, word in zip(offsets[1:], words[1:]):
+        starts &= {position - offset for position in positions[word]}
+        if not starts:
+            break
+    return len(starts)
+
+
+def count_proximity_matches(position_lists : List[Sequence[int]], distance : int) -> int:
+    """
+    Counts the minimal windows of at most distance words that contain every word.
+    Sweeps the merged positions once, shrinking the window from the left.
+
+    Parameters:
+        position_lists (List[Sequence[int]]): Sorted token positions of each distinct word.
+        distance (int): Largest allowed gap between the first and last word of a window.
+
+    Returns:
+        int: Number of matching windows.
+    """
+    merged = list(heapq.merge(*[[(position, i) for position in positions]
+                                for i, positions in enumerate(position_lists)]))
+    seen = [0] * len(position_lists)
+    covered = 0
+    left = 0
+    matches = 0
+    for position, i in merged:
+        if seen[i] == 0:
+            covered += 1
+        seen[i] += 1
+        while seen[merged[left][1]] > 1:
+            seen[merged[left][1]] -= 1
+            left += 1
+        if covered == len(position_lists) and position - merged[left][0] <= distance:
+            matches += 1
+    return matches
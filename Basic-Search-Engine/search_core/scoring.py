@@ -0,0 +1,161 @@
+"""
+Batch BM25 scoring with NumPy, for replaying many queries at once, such as a
+query log when evaluating a ranking offline.
+
+BM25Matrix holds the index as a CSR sparse matrix with a row per term and a
+column per doc id. Its entries are already BM25 weights: the term's idf times
+its saturated, length-normalized count in the document. A query's score for a
+document is the sum of its terms' rows, so a block of queries is scored by
+gathering the rows of all of them, adding up the weights of every (query,
+document) pair in one pass, and sorting the pairs once to pick the best k of
+each query. None of it loops over postings in Python.
+
+NumPy is optional: without it, BasicSearchEngine.batch_ranked_search runs
+ranked_search once per query instead. It takes longer to import than the rest
+of the engine put together, so it is only imported when a batch is first scored.
+"""
+import math
+from typing import List, Mapping, Sequence, Tuple
+
+np = None
+
+
+def numpy():
+    """
+    Imports NumPy on first use.
+
+    Returns:
+        The numpy module, or None if it is not installed.
+    """
+    global np
+    if np is None:
+        try:
+            import numpy as np
+        except ImportError:
+            return None
+    return np
+
+
+class BM25Matrix:
+    """
+    The BM25 weights of an index as a CSR matrix, scored against blocks of queries.
+    Weights match ranked_search's, and so do scores, which add a query's terms
+    in sorted order as ranked_search does.
+    """
+    # Postings gathered for one block of queries, which bounds a block's memory.
+    BLOCK_POSTINGS = 1 << 22
+    # Below this many (query, doc) cells per gathered posting, pairs are summed
+    # in a dense array instead of being sorted.
+    DENSE_CELLS = 4
+
+    def __init__(self, index : Mapping, doc_lengths : Sequence[int], doc_count : int, total_length : int,
+                 k1 : float, b : float) -> None:
+        """
+        Parameters:
+            index (Mapping): Term to posting list with doc_ids and counts columns.
+            doc_lengths (Sequence[int]): Length of each document by doc id; 0 for a
+                doc id without a document, or with no length recorded.
+            doc_count (int): Number of documents BM25 counts.
+            total_length (int): Their total length in terms.
+            k1 (float): BM25's term frequency saturation.
+            b (float): BM25's length normalization.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+        """
+        if numpy() is None:
+            raise ImportError("Batch scoring needs NumPy (pip install numpy).")
+        self.rows = {}
+        ids, counts, sizes = [], [], []
+        for term in index:
+            postings = index[term]
+            if not len(postings):
+                continue
+            self.rows[term] = len(sizes)
+            ids.append(np.asarray(postings.doc_ids, dtype=np.int64))
+            counts.append(np.asarray(postings.counts, dtype=np.float64))
+            sizes.append(len(postings))
+        self.columns = len(doc_lengths)
+        self.__sizes = sizes
+        frequencies = np.array(sizes, dtype=np.int64)
+        self.indptr = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(frequencies, out=self.indptr[1:])
+        self.indices = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+        counts = np.concatenate(counts) if counts else np.zeros(0, dtype=np.float64)
+        average_length = total_length / doc_count if doc_count else 0.0
+        average_length = average_length or 1.0
+        lengths = np.asarray(doc_lengths, dtype=np.float64)[self.indices]
+        lengths[lengths == 0] = average_length
+        norm = k1 * (1 - b + b * lengths / average_length)
+        # math.log rather than np.log, whose last bit may differ, so scores equal ranked_search's.
+        idf = np.array([math.log(1 + (doc_count - size + 0.5) / (size + 0.5)) for size in sizes], dtype=np.float64)
+        self.data = np.repeat(idf, frequencies) * counts * (k1 + 1) / (counts + norm)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory taken by the matrix's arrays.
+        """
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def top_k(self, queries : List[Sequence[str]], k : int) -> List[List[Tuple[int, float]]]:
+        """
+        Scores a batch of queries against every document.
+
+        Parameters:
+            queries (list): The distinct terms of each query, sorted.
+            k (int): Maximum number of results per query.
+
+        Returns:
+            list: For every query, (doc id, score) pairs of its best k documents, best
+            first and by doc id among equal scores.
+        """
+        results = []
+        block, block_postings = [], 0
+        for terms in queries:
+            rows = [self.rows[term] for term in terms if term in self.rows]
+            postings = sum(self.__sizes[row] for row in rows)
+            if block and block_postings + postings > self.BLOCK_POSTINGS:
+                results.extend(self.__score_block(block, k))
+                block, block_postings = [], 0
+            block.append(rows)
+            block_postings += postings
+        if block:
+            results.extend(self.__score_block(block, k))
+        return results
+
+    def __score_block(self, block : List[List[int]], k : int) -> List[List[Tuple[int, float]]]:
+        rows = np.array([row for rows in block for row in rows], dtype=np.int64)
+        if k < 1 or not len(rows):
+            return [[] for _ in block]
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        # Positions of every posting of every row gathered, row after row.
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(int(lengths.sum()), dtype=np.int64) + np.repeat(starts - offsets, lengths)
+        slots = np.repeat(np.arange(len(block), dtype=np.int64), [len(rows) for rows in block])
+        cells = np.repeat(slots, lengths) * self.columns + self.indices[positions]
+        weights = self.data[positions]
+        # Each cell's weights are added in the order gathered, that is by term.
+        if len(block) * self.columns <= self.DENSE_CELLS * len(cells):
+            dense = np.bincount(cells, weights=weights, minlength=len(block) * self.columns)
+            dense = dense.reshape(len(block), self.columns)
+            if k < self.columns:
+                # Only documents scoring at least a query's k-th best score are sorted.
+                kth = np.partition(dense, self.columns - k, axis=1)[:, self.columns - k]
+                queries, doc_ids = np.nonzero((dense >= kth[:, None]) & (dense > 0))
+            else:
+                queries, doc_ids = np.nonzero(dense)
+            scores = dense[queries, doc_ids]
+        else:
+            cells, inverse = np.unique(cells, return_inverse=True)
+            scores = np.bincount(inverse.ravel(), weights=weights)
+            queries, doc_ids = np.divmod(cells, self.columns)
+        order = np.lexsort((doc_ids, -scores, queries))
+        queries, doc_ids, scores = queries[order], doc_ids[order], scores[order]
+        first = np.searchsorted(queries, np.arange(len(block)))
+        keep = np.arange(len(queries)) - first[queries] < k
+        queries, doc_ids, scores = queries[keep], doc_ids[keep], scores[keep]
+        bounds = np.searchsorted(queries, np.arange(len(block) + 1)).tolist()
+        doc_ids, scores = doc_ids.tolist(), scores.tolist()
+        return [list(zip(doc_ids[start:end], scores[start:end])) for start, end in zip(bounds, bounds[1:])]
@@ -0,0 +1,362 @@
+"""
+HTTP/JSON search service.
+
+Serves a BasicSearchEngine over HTTP/1.1 with asyncio. Queries never touch the
+index being built: indexing runs on a separate writer engine, and when it
+finishes the index is saved to a snapshot file that a fresh, read-only engine
+memory-maps. New requests then use the new snapshot, while requests already
+running finish on the previous one. Snapshot engines are read-only, so their
+queries do not take the engine's lock and the query threads run side by side.
+With snippets=1, the words mode keeps the best k postings of each word unless
+a limit is given, so a common word does not read a snippet for every page.
+
+Endpoints (responses are JSON):
+    GET  /search?q=...&mode=ranked|words|boolean|phrase[&k=10][&limit=][&distance=][&fuzzy=][&snippets=1]
+    POST /index            {"folder": "web_pages"}
+    GET  /documents
+    GET  /document?path=...
+    GET  /stats
+    GET  /health
+
+Run it with:
+    python3 -m search_core.service --folder web_pages --port 8080 --positional
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import instrumentation
+from .analysis import ENGLISH_STOPWORDS, STEMMERS, Analyzer
+from .dedup import Deduplicator
+from .engine import BasicSearchEngine
+
+MAX_BODY = 1024 * 1024
+MAX_HEADERS = 100
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status : int, message : str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class SearchService:
+    """
+    Owns the writer engine that indexes files and the read-only snapshot engine
+    that answers queries.
+    """
+    def __init__(self, snapshot_dir : str, workers : int = 1, positional : bool = False,
+                 cache_size : int = 128, query_threads : int = 4, analyzer : Optional[Analyzer] = None,
+                 dedup : Optional[Deduplicator] = None) -> None:
+        """
+        Parameters:
+            snapshot_dir (str): Where index snapshots are written.
+            workers (int): Number of processes used to tokenize files while indexing.
+            positional (bool): Whether to record token positions for phrase queries.
+            cache_size (int): Query cache size of every snapshot engine.
+            query_threads (int): Threads queries run on, so slow ones do not stall the event loop.
+            analyzer (Optional[Analyzer]): Turns words into terms; snapshots keep it, so
+                their engines analyze queries the same way.
+            dedup (Optional[Deduplicator]): If given, near-duplicate pages are collapsed
+                into the first indexed copy.
+        """
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self.snapshot_dir = snapshot_dir
+        self.cache_size = cache_size
+        self.__writer = BasicSearchEngine(workers=workers, positional=positional, cache_size=0, analyzer=analyzer,
+                                          dedup=dedup)
+        self.__reader = BasicSearchEngine(positional=positional, cache_size=cache_size, analyzer=analyzer,
+                                          read_only=True)
+        self.__snapshot = 0
+        self.__snapshot_path: Optional[str] = None
+        self.__published_generation = -1
+        self.__indexing = threading.Lock()
+        self.__pool = ThreadPoolExecutor(max_workers=query_threads, thread_name_prefix="query")
+        self.__instrumentation = instrumentation.Instrumentation()
+
+    @property
+    def reader(self) -> BasicSearchEngine:
+        """
+        Getter for the engine of the current snapshot.
+        """
+        return self.__reader
+
+    @property
+    def snapshot(self) -> int:
+        return self.__snapshot
+
+    def load(self, path : str) -> None:
+        """
+        Loads a saved index into the writer and publishes it.
+        """
+        with self.__indexing:
+            self.__writer.load_index(path)
+            self.__publish()
+
+    def index(self, folder_path : str) -> bool:
+        """
+        Indexes a folder on the writer engine and publishes a new snapshot.
+        Blocks; the service calls it on a worker thread.
+
+        Raises:
+            HTTPError: If another indexing run is in progress.
+        """
+        if not self.__indexing.acquire(blocking=False):
+            raise HTTPError(409, "Indexing is already running.")
+        try:
+            indexed = self.__writer.index_files(folder_path)
+            if indexed and self.__writer.generation != self.__published_generation:
+                self.__publish()
+            return indexed
+        finally:
+            self.__indexing.release()
+
+    def __publish(self) -> None:
+        """
+        Saves the writer's index to a new snapshot file and swaps in an engine reading it.
+        """
+        path = os.path.join(self.snapshot_dir, f"snapshot-{self.__snapshot + 1}.idx")
+        self.__writer.save_index(path)
+        reader = BasicSearchEngine(positional=self.__writer.positional, cache_size=self.cache_size, read_only=True)
+        reader.load_index(path)
+        previous = self.__snapshot_path
+        self.__reader, self.__snapshot_path = reader, path
+        self.__published_generation = self.__writer.generation
+        self.__snapshot += 1
+        if previous is not None:
+            # Requests still running keep the old file mapped until they finish.
+            try:
+                os.remove(previous)
+            except OSError:
+                pass
+
+    def search(self, params : dict) -> dict:
+        reader = self.__reader
+        query = params.get("q", "")
+        mode = params.get("mode", "ranked")
+        if not query.strip():
+            raise HTTPError(400, "The 'q' parameter is required.")
+        # With snippets=1, every result but boolean ones comes with the text around its matches.
+        snippets = bool(integer(params, "snippets", 0))
+        if mode == "ranked":
+            ranking = reader.ranked_search(query, integer(params, "k", 10))
+            return {"results": [with_snippet(reader, {"file": file_name, "score": score,
+                                                      "duplicates": reader.duplicates(file_name)}, query, snippets)
+                                for file_name, score in ranking]}
+        if mode == "words":
+            max_distance = integer(params, "fuzzy", 0)
+            # Every returned posting reads a snippet, so with snippets the limit defaults to k.
+            limit = integer(params, "limit", integer(params, "k", 10) if snippets else None)
+            results = reader.search(query, limit, max_distance)
+            return {"results": {word: [with_snippet(reader, {"file": info.file_name, "count": info.count}, query,
+                                                    snippets, [word]) for info in postings]
+                                for word, postings in results.items()}}
+        if mode == "boolean":
+            return {"results": reader.boolean_search(query)}
+        if mode == "phrase":
+            matches = reader.phrase_search(query, integer(params, "distance", None))
+            return {"results": [with_snippet(reader, {"file": file_name, "matches": count}, query, snippets)
+                                for file_name, count in matches]}
+        raise HTTPError(400, f"Unknown search mode '{mode}'.")
+
+    def documents(self) -> dict:
+        files = self.__reader.get_indexed_files()
+        return {"count": len(files), "documents": files}
+
+    def document(self, params : dict) -> dict:
+        path = params.get("path", "")
+        try:
+            return {"path": path, "content": self.__reader.get_file_content(path)}
+        except FileNotFoundError as e:
+            raise HTTPError(404, str(e))
+
+    def statistics(self) -> dict:
+        return {"snapshot": self.__snapshot, "engine": self.__reader.statistics(),
+                "http": self.__instrumentation.snapshot()}
+
+    async def run(self, function : Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.__pool, function, *args)
+
+    async def dispatch(self, method : str, target : str, body : bytes) -> Tuple[int, dict]:
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        route = url.path.rstrip("/") or "/"
+        routes = {
+            "/search": ("GET", lambda: self.run(self.search, params)),
+            "/index": ("POST", lambda: self.__index_request(body)),
+            "/documents": ("GET", lambda: self.run(self.documents)),
+            "/document": ("GET", lambda: self.run(self.document, params)),
+            "/stats": ("GET", lambda: self.run(self.statistics)),
+            "/health": ("GET", lambda: self.__health()),
+        }
+        if route not in routes:
+            raise HTTPError(404, f"No endpoint at '{route}'.")
+        allowed, handler = routes[route]
+        if method != allowed:
+            raise HTTPError(405, f"'{route}' only accepts {allowed}.")
+        with self.__instrumentation.query(route.strip("/")):
+            return 200, await handler()
+
+    async def __health(self) -> dict:
+        return {"status": "ok", "snapshot": self.__snapshot}
+
+    async def __index_request(self, body : bytes) -> dict:
+        try:
+            folder = json.loads(body or b"{}").get("folder")
+        except (ValueError, AttributeError):
+            raise HTTPError(400, "The body must be a JSON object.")
+        if not isinstance(folder, str) or not folder:
+            raise HTTPError(400, "The 'folder' field is required.")
+        # On the loop's default executor, so indexing does not hold a query thread.
+        indexed = await asyncio.get_running_loop().run_in_executor(None, self.index, folder)
+        return {"indexed": indexed, "snapshot": self.__snapshot, "documents": len(self.__reader.manifest)}
+
+    async def handle_connection(self, reader : asyncio.StreamReader, writer : asyncio.StreamWriter) -> None:
+        """
+        Serves HTTP/1.1 requests on one connection, keeping it open between requests.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                keep_alive = False
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    headers = await read_headers(reader)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY:
+                        keep_alive = False
+                        raise HTTPError(413, "The request body is too large.")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except ValueError as e:
+                    status, payload = 400, {"error": str(e)}
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                self.__instrumentation.count(f"http_{status}")
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        self.__pool.shutdown()
+
+
+def with_snippet(engine : BasicSearchEngine, result : dict, query : str, wanted : bool,
+                 terms : Optional[list] = None) -> dict:
+    """
+    Adds the snippet of a result to it, as its text and the [start, end) character
+    spans of the matched words, when snippets were asked for.
+    """
+    if wanted:
+        snippet = engine.snippet(result["file"], query, terms=terms)
+        result["snippet"] = {"text": snippet.text, "highlights": snippet.highlights} if snippet is not None else None
+    return result
+
+
+def integer(params : dict, name : str, default : Optional[int]) -> Optional[int]:
+    value = params.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError(400, f"The '{name}' parameter must be an integer.")
+
+
+async def read_headers(reader : asyncio.StreamReader) -> dict:
+    headers = {}
+    for _ in range(MAX_HEADERS):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    raise HTTPError(400, "Too many headers.")
+
+
+def encode_response(status : int, payload : dict, keep_alive : bool) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def serve(service : SearchService, host : str, port : int, ready : Optional[Callable] = None) -> None:
+    """
+    Serves requests until cancelled. ready, if given, is called with the bound (host, port).
+    """
+    server = await asyncio.start_server(service.handle_connection, host, port, backlog=1024)
+    async with server:
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[:2])
+        await server.serve_forever()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serves the search engine over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on, 0 for any free port")
+    parser.add_argument("--folder", help="folder to index at startup")
+    parser.add_argument("--index", help="saved index file to load at startup")
+    parser.add_argument("--positional", action="store_true", help="record token positions for phrase queries")
+    parser.add_argument("--stopwords", action="store_true", help="leave common English words out of the index")
+    parser.add_argument("--stemmer", choices=sorted(STEMMERS), help="reduce words to their stems")
+    parser.add_argument("--ngrams", type=int, default=1, help="also index runs of up to this many words")
+    parser.add_argument("--dedup", action="store_true", help="collapse near-duplicate pages into one")
+    parser.add_argument("--dedup-threshold", type=float, default=Deduplicator.THRESHOLD,
+                        help="share of shingles near-duplicates have in common")
+    parser.add_argument("--workers", type=int, default=1, help="indexing processes")
+    parser.add_argument("--query-threads", type=int, default=4, help="threads queries run on")
+    parser.add_argument("--cache-size", type=int, default=128, help="query results cached per snapshot")
+    parser.add_argument("--snapshot-dir", help="where index snapshots are kept (a temporary folder by default)")
+    parser.add_argument("--quiet", action="store_true", help="silence the engine's console output")
+    args = parser.parse_args()
+
+    if args.quiet:
+        sys.stdout = open(os.devnull, "w")
+    # Printed even when quiet, so scripts starting the service on port 0 learn the port.
+    announce = lambda address: print(f"Serving on http://{address[0]}:{address[1]}", file=sys.__stdout__, flush=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = Analyzer(stopwords=ENGLISH_STOPWORDS if args.stopwords else None,
+                            stemmer=args.stemmer, ngrams=args.ngrams)
+        dedup = Deduplicator(args.dedup_threshold) if args.dedup else None
+        service = SearchService(args.snapshot_dir or tmp, args.workers, args.positional,
+                                args.cache_size, args.query_threads, analyzer, dedup)
+        if args.index:
+            service.load(args.index)
+        if args.folder and not service.index(args.folder):
+            return 1
+        try:
+            asyncio.run(serve(service, args.host, args.port, announce))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
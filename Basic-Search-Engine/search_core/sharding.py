@@ -0,0 +1,373 @@
+"""
+Sharded search over local sockets.
+
+The documents of a folder are split across several shard servers by a hash of
+their path. Each shard is a BasicSearchEngine in its own process, answering
+newline-delimited JSON requests on a TCP socket. ShardedSearchEngine is the
+coordinator: it sends every query to all shards in parallel and merges their
+partial results.
+
+Ranked queries run in two rounds so that scores are comparable across shards:
+the coordinator first collects each shard's document count, total length and
+document frequencies, adds them up, and then asks every shard for its top k
+scored with the global statistics. The merged top k is the same ranking one
+engine holding every document would return.
+
+Run a shard by hand with:
+    python3 -m search_core.sharding --shard 0 --shards 2 --port 7001
+"""
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .analysis import ENGLISH_STOPWORDS, STEMMERS, Analyzer
+from .engine import BasicSearchEngine
+
+
+def shard_of(file_name : str, shards : int) -> int:
+    """
+    Returns the shard a file belongs to. Stable across processes and runs.
+    """
+    return zlib.crc32(os.path.abspath(file_name).encode("utf-8")) % shards
+
+
+class ShardRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Answers requests on one connection until the coordinator closes it. A request
+    is a JSON object with an "op" and its arguments; the reply is
+    {"ok": true, "result": ...} or {"ok": false, "type": ..., "error": ...}.
+    """
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                result = self.server.dispatch(request.pop("op"), request)
+                reply = {"ok": True, "result": result}
+            except Exception as e:
+                reply = {"ok": False, "type": type(e).__name__, "error": str(e)}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class ShardServer(socketserver.ThreadingTCPServer):
+    """
+    Serves one shard of the index. Every connection is handled on its own
+    thread; the engine's lock keeps queries and indexing consistent.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address : Tuple[str, int], shard : int, shards : int, workers : int = 1,
+                 positional : bool = False, analyzer : Optional[Analyzer] = None) -> None:
+        """
+        Parameters:
+            address (Tuple[str, int]): Host and port to listen on. Port 0 picks a free port.
+            shard (int): The number of this shard, from 0 to shards - 1.
+            shards (int): The number of shards the documents are split across.
+            workers (int): Number of processes used to tokenize files while indexing.
+            positional (bool): Whether to record token positions for phrase queries.
+            analyzer (Optional[Analyzer]): Turns words into terms. Every shard of a cluster
+                must use the same analyzer, or their term statistics cannot be added up.
+        """
+        if not 0 <= shard < shards:
+            raise ValueError(f"Shard {shard} is out of range for {shards} shards.")
+        super().__init__(address, ShardRequestHandler)
+        self.shard = shard
+        self.shards = shards
+        self.engine = BasicSearchEngine(workers=workers, positional=positional, analyzer=analyzer)
+
+    def dispatch(self, op : str, args : dict):
+        engine = self.engine
+        if op == "index":
+            return engine.index_files(args["folder"], include=lambda file_name: shard_of(file_name, self.shards) == self.shard)
+        if op == "term_statistics":
+            return engine.term_statistics(args["query"])
+        if op == "ranked":
+            return engine.ranked_search(args["query"], args["k"], args.get("statistics"))
+        if op == "search":
+            results = engine.search(args["query"], args.get("limit"), args.get("max_distance", 0))
+            return {word: [(info.file_name, info.count) for info in postings] for word, postings in results.items()}
+        if op == "boolean":
+            return engine.boolean_search(args["query"])
+        if op == "phrase":
+            return engine.phrase_search(args["query"], args.get("distance"))
+        if op == "info":
+            return {"shard": self.shard, "shards": self.shards, "documents": len(engine.manifest),
+                    "terms": len(engine.index), "positional": engine.positional}
+        if op == "statistics":
+            return engine.statistics()
+        if op == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return True
+        raise ValueError(f"Unknown operation '{op}'.")
+
+
+class ShardClient:
+    """
+    A persistent connection to one shard server. Calls are serialized per connection.
+    """
+    def __init__(self, address : Tuple[str, int], timeout : Optional[float] = None) -> None:
+        self.address = tuple(address)
+        self.__socket = socket.create_connection(self.address, timeout=timeout)
+        self.__file = self.__socket.makefile("rwb")
+        self.__lock = threading.Lock()
+
+    def call(self, op : str, **args):
+        """
+        Sends a request and waits for its result.
+
+        Raises:
+            ValueError: If the shard rejected the request, e.g. a malformed query.
+            ConnectionError: If the shard failed or went away.
+        """
+        with self.__lock:
+            try:
+                self.__file.write(json.dumps(dict(args, op=op)).encode("utf-8") + b"\n")
+                self.__file.flush()
+                line = self.__file.readline()
+            except OSError as e:
+                raise ConnectionError(f"Shard {self.address} is unreachable: {e}") from e
+        if not line:
+            raise ConnectionError(f"Shard {self.address} closed the connection.")
+        reply = json.loads(line)
+        if reply["ok"]:
+            return reply["result"]
+        if reply["type"] == "ValueError":
+            raise ValueError(reply["error"])
+        raise ConnectionError(f"Shard {self.address} failed: {reply['type']}: {reply['error']}")
+
+    def close(self) -> None:
+        self.__file.close()
+        self.__socket.close()
+
+
+class ShardedSearchEngine:
+    """
+    Coordinator of a sharded index. Scatters every request to all shards in
+    parallel and gathers their partial results into the answer one engine over
+    the whole collection would give.
+    """
+    def __init__(self, addresses : List[Tuple[str, int]], timeout : Optional[float] = None) -> None:
+        """
+        Parameters:
+            addresses (list): (host, port) of every shard server.
+            timeout (Optional[float]): Socket timeout in seconds for each shard call.
+        """
+        if not addresses:
+            raise ValueError("At least one shard is required.")
+        self.__clients = [ShardClient(address, timeout) for address in addresses]
+        self.__pool = ThreadPoolExecutor(max_workers=len(self.__clients), thread_name_prefix="scatter")
+
+    @property
+    def shards(self) -> int:
+        return len(self.__clients)
+
+    def __scatter(self, op : str, **args) -> list:
+        """
+        Sends the same request to every shard and returns their results in shard order.
+        """
+        futures = [self.__pool.submit(client.call, op, **args) for client in self.__clients]
+        return [future.result() for future in futures]
+
+    def index_files(self, folder_path : str) -> bool:
+        """
+        Has every shard index its share of the folder's files.
+
+        Returns:
+            bool: Whether every shard indexed its files.
+        """
+        return all(self.__scatter("index", folder=os.path.abspath(folder_path)))
+
+    def info(self) -> List[dict]:
+        """
+        Returns the document and term counts of every shard.
+        """
+        return self.__scatter("info")
+
+    def statistics(self) -> List[dict]:
+        """
+        Returns the instrumentation snapshot of every shard.
+        """
+        return self.__scatter("statistics")
+
+    def term_statistics(self, query : str) -> dict:
+        """
+        Adds up the BM25 collection statistics of every shard.
+        """
+        total = {"documents": 0, "length": 0, "frequencies": {}}
+        for statistics in self.__scatter("term_statistics", query=query):
+            total["documents"] += statistics["documents"]
+            total["length"] += statistics["length"]
+            for word, frequency in statistics["frequencies"].items():
+                total["frequencies"][word] = total["frequencies"].get(word, 0) + frequency
+        return total
+
+    def ranked_search(self, query : str, k : int = 10) -> List[Tuple[str, float]]:
+        """
+        Ranks the files of all shards with BM25 and returns the best k.
+        """
+        statistics = self.term_statistics(query)
+        if statistics["documents"] == 0 or k < 1:
+            return []
+        rankings = self.__scatter("ranked", query=query, k=k, statistics=statistics)
+        top = heapq.nlargest(k, (tuple(result) for ranking in rankings for result in ranking),
+                             key=lambda item: item[1])
+        return [(file_name, score) for file_name, score in top]
+
+    def search(self, query : str, limit : Optional[int] = None, max_distance : int = 0) -> Dict[str, List[Tuple[str, int]]]:
+        """
+        Finds the files containing each query word.
+
+        Returns:
+            dict: Each word found to (file path, count) pairs, highest count first.
+        """
+        merged: Dict[str, list] = {}
+        for results in self.__scatter("search", query=query, limit=limit, max_distance=max_distance):
+            for word, postings in results.items():
+                merged.setdefault(word, []).extend(tuple(posting) for posting in postings)
+        for word, postings in merged.items():
+            postings.sort(key=lambda posting: posting[1], reverse=True)
+            if limit is not None:
+                del postings[limit:]
+        return merged
+
+    def boolean_search(self, query : str) -> List[str]:
+        """
+        Finds the files matching a boolean query on any shard, in file path order.
+
+        Raises:
+            ValueError: If the query is malformed.
+        """
+        # Every shard answers in the order of its own doc ids, which mean nothing to the
+        # others, so the matches are put in the one order all shards share.
+        return sorted(file_name for matches in self.__scatter("boolean", query=query) for file_name in matches)
+
+    def phrase_search(self, phrase : str, distance : Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Finds the files containing a phrase on any shard, most matches first.
+
+        Raises:
+            ValueError: If the shards were started without positions.
+        """
+        results = [tuple(result) for matches in self.__scatter("phrase", query=phrase, distance=distance)
+                   for result in matches]
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def shutdown(self) -> None:
+        """
+        Stops every shard server and closes the connections.
+        """
+        try:
+            self.__scatter("shutdown")
+        except ConnectionError:
+            pass
+        self.close()
+
+    def close(self) -> None:
+        self.__pool.shutdown()
+        for client in self.__clients:
+            client.close()
+
+
+def serve_shard(host : str, port : int, shard : int, shards : int, workers : int = 1,
+                positional : bool = False, ready=None, quiet : bool = False, analyzer : Optional[Analyzer] = None) -> None:
+    """
+    Runs a shard server until it is shut down.
+
+    Parameters:
+        ready: Optional connection the bound (host, port) is sent to once the server listens.
+        quiet (bool): Whether to silence the engine's console output.
+    """
+    if quiet:
+        sys.stdout = open(os.devnull, "w")
+    with ShardServer((host, port), shard, shards, workers, positional, analyzer) as server:
+        if ready is not None:
+            ready.send(server.server_address[:2])
+            ready.close()
+        server.serve_forever()
+
+
+class LocalCluster:
+    """
+    Starts several shard servers as processes on this machine and connects a
+    coordinator to them. Meant for tests and benchmarks:
+
+        with LocalCluster(4, positional=True) as engine:
+            engine.index_files("web_pages")
+            engine.ranked_search("python")
+    """
+    def __init__(self, shards : int, workers : int = 1, positional : bool = False, host : str = "127.0.0.1",
+                 analyzer : Optional[Analyzer] = None) -> None:
+        self.shards = shards
+        self.workers = workers
+        self.positional = positional
+        self.analyzer = analyzer
+        self.host = host
+        self.processes: List[multiprocessing.Process] = []
+        self.engine: Optional[ShardedSearchEngine] = None
+
+    def __enter__(self) -> ShardedSearchEngine:
+        addresses = []
+        try:
+            for shard in range(self.shards):
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(
+                    target=serve_shard, name=f"shard-{shard}", daemon=True,
+                    args=(self.host, 0, shard, self.shards, self.workers, self.positional, sender, True, self.analyzer))
+                process.start()
+                sender.close()
+                if not receiver.poll(30):
+                    raise ConnectionError(f"Shard {shard} did not start.")
+                addresses.append(tuple(receiver.recv()))
+                receiver.close()
+                self.processes.append(process)
+            self.engine = ShardedSearchEngine(addresses)
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self.engine
+
+    def __exit__(self, *exc_info) -> None:
+        if self.engine is not None:
+            self.engine.shutdown()
+            self.engine = None
+        for process in self.processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.processes = []
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Runs one shard server of a sharded search engine.")
+    parser.add_argument("--shard", type=int, required=True, help="number of this shard, from 0")
+    parser.add_argument("--shards", type=int, required=True, help="number of shards in the cluster")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=0, help="port to listen on, 0 for any free port")
+    parser.add_argument("--workers", type=int, default=1, help="indexing processes")
+    parser.add_argument("--positional", action="store_true", help="record token positions for phrase queries")
+    parser.add_argument("--stopwords", action="store_true", help="leave common English words out of the index")
+    parser.add_argument("--stemmer", choices=sorted(STEMMERS), help="reduce words to their stems")
+    parser.add_argument("--ngrams", type=int, default=1, help="also index runs of up to this many words")
+    args = parser.parse_args()
+    analyzer = Analyzer(stopwords=ENGLISH_STOPWORDS if args.stopwords else None, stemmer=args.stemmer, ngrams=args.ngrams)
+    with ShardServer((args.host, args.port), args.shard, args.shards, args.workers, args.positional, analyzer) as server:
+        host, port = server.server_address[:2]
+        print(f"Shard {args.shard}/{args.shards} listening on {host}:{port}", flush=True)
+        server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
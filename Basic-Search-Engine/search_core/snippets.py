@@ -0,0 +1,301 @@
+"""
+Result snippets: the words of a document around the query terms it matched,
+with those terms highlighted.
+
+While a document is indexed, the tokenizer notes every CHECKPOINT_BYTES bytes
+of text or so which word starts there and at what byte offset of the document's
+UTF-8 text. This offset table is saved with the document's manifest record, so
+the words around a token position are found again by reading only the bytes
+between the checkpoints on either side of it, not the whole document.
+
+Plain text files are read with a seek. HTML, compressed pages and archive
+members have no byte offsets of their own, so their text is read from the
+start up to the bytes needed. Either way the bytes go through DocumentCache,
+a small LRU cache of fixed-size blocks, so the documents that keep coming up
+in results are served from memory.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import crawler, tokenizer
+from .index_storage import decode_varint, encode_varint
+
+SPACES = re.compile(r"\s+")
+ELLIPSIS = "..."
+
+
+def encode_offsets(checkpoints : Iterable[Tuple[int, int]]) -> bytes:
+    """
+    Packs a document's (word number, byte offset) checkpoints, both ascending, as
+    delta-encoded varints.
+    """
+    out = bytearray()
+    previous_word = previous_offset = 0
+    for word, offset in checkpoints:
+        encode_varint(word - previous_word, out)
+        encode_varint(offset - previous_offset, out)
+        previous_word, previous_offset = word, offset
+    return bytes(out)
+
+
+def checkpoints_around(blob : bytes, first_word : int, end_word : int) -> Tuple[int, int, Optional[int]]:
+    """
+    Finds in an offset table the checkpoints on either side of a stretch of words.
+    The table is only decoded up to the checkpoint after the stretch.
+
+    Parameters:
+        blob (bytes): The encoded offset table.
+        first_word (int): Number of the first word of the stretch.
+        end_word (int): Number of the word after its last one.
+
+    Returns:
+        Tuple[int, int, Optional[int]]: The word number and byte offset of the last
+        checkpoint at or before first_word (every document has one at word 0, byte 0),
+        and the byte offset of the first checkpoint after end_word, or None if there is none.
+    """
+    word = offset = 0
+    start_word = start_offset = 0
+    position = 0
+    while position < len(blob):
+        delta, position = decode_varint(blob, position)
+        step, position = decode_varint(blob, position)
+        word += delta
+        offset += step
+        if word <= first_word:
+            start_word, start_offset = word, offset
+        elif word > end_word:
+            return start_word, start_offset, offset
+    return start_word, start_offset, None
+
+
+class Snippet(namedtuple("Snippet", "text highlights")):
+    """
+    A piece of a document's text and the (start, end) character spans of the
+    matched words in it.
+    """
+    __slots__ = ()
+
+    def marked(self, before : str = "[", after : str = "]") -> str:
+        """
+        Returns the text with every highlighted word wrapped in the given markers.
+        """
+        parts = []
+        position = 0
+        for start, end in self.highlights:
+            parts += (self.text[position:start], before, self.text[start:end], after)
+            position = end
+        parts.append(self.text[position:])
+        return "".join(parts)
+
+
+def best_window(matches : List[Tuple[int, int, str]], width : int) -> Tuple[int, int]:
+    """
+    Picks the stretch of text to show: the width words holding the most distinct
+    matched terms, then the most matches, the earliest of equals. The matches are
+    centred in it.
+
+    Parameters:
+        matches (list): (word number, words covered, term) of every match, in word order.
+        width (int): Number of words in the window.
+
+    Returns:
+        Tuple[int, int]: The window's first word number and the one after its last.
+    """
+    if not matches:
+        return 0, width
+    counts: Dict[str, int] = {}
+    best = (0, 0)
+    best_span = (0, 0)
+    left = 0
+    for right, (position, covered, term) in enumerate(matches):
+        counts[term] = counts.get(term, 0) + 1
+        while matches[left][0] <= position - width:
+            dropped = matches[left][2]
+            counts[dropped] -= 1
+            if not counts[dropped]:
+                del counts[dropped]
+            left += 1
+        score = (len(counts), right - left + 1)
+        if score > best:
+            best = score
+            best_span = (matches[left][0], min(position + covered, matches[left][0] + width))
+    first = max(0, best_span[0] - (width - (best_span[1] - best_span[0])) // 2)
+    return first, first + width
+
+
+def build_snippet(text : str, first_word : int, window : Tuple[int, int], highlighted : Set[int],
+                  complete : bool) -> Snippet:
+    """
+    Cuts a window of words out of a piece of a document's text.
+
+    Parameters:
+        text (str): The text, starting at a word boundary.
+        first_word (int): The word number of the first word of the text.
+        window (Tuple[int, int]): The first word number shown and the one after the last.
+        highlighted (Set[int]): Word numbers of the matched words.
+        complete (bool): Whether the text runs to the end of the document.
+
+    Returns:
+        Snippet: The words of the window with the gaps between them kept, runs of
+        whitespace folded into one space. An ellipsis marks text left out before or after.
+    """
+    start, end = window
+    pieces = [ELLIPSIS + " "] if start > 0 else []
+    length = len(pieces[0]) if pieces else 0
+    highlights = []
+    previous_end = None
+    more = not complete
+    for number, match in enumerate(tokenizer.WORD_PATTERN.finditer(text), start=first_word):
+        if number < start:
+            continue
+        if number >= end:
+            more = True
+            break
+        if previous_end is not None:
+            gap = SPACES.sub(" ", text[previous_end:match.start()])
+            pieces.append(gap)
+            length += len(gap)
+        word = match.group()
+        if number in highlighted:
+            highlights.append((length, length + len(word)))
+        pieces.append(word)
+        length += len(word)
+        previous_end = match.end()
+    if more:
+        pieces.append(" " + ELLIPSIS)
+    return Snippet("".join(pieces), highlights)
+
+
+class DocumentCache:
+    """
+    Bounded LRU cache of document text in fixed-size blocks of UTF-8 bytes. Blocks
+    are keyed by document and content digest, so a re-indexed document never gets
+    blocks of its old content back; they simply age out. It may be used from
+    several threads; reading files happens outside its lock.
+    """
+    BLOCK_SIZE = 4 * 1024
+
+    def __init__(self, capacity : int = 4 * 1024 * 1024) -> None:
+        """
+        Parameters:
+            capacity (int): Maximum number of bytes cached. 0 disables caching.
+        """
+        if not isinstance(capacity, int) or isinstance(capacity, bool):
+            raise TypeError("Invalid type!")
+        if capacity < 0:
+            raise ValueError("Cache capacity cannot be negative.")
+        self.__capacity = capacity
+        self.__blocks: OrderedDict = OrderedDict()
+        self.__size = 0
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_read = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def read(self, key : str, record, start : int, end : int) -> bytes:
+        """
+        Returns bytes [start, end) of a document's UTF-8 text, or fewer if the text
+        ends before.
+
+        Parameters:
+            key (str): The document, as it was indexed.
+            record: The document's manifest record. Its digest tells versions of the
+                content apart; its mtime and size tell whether the file still holds
+                the indexed content.
+            start (int): Offset of the first byte.
+            end (int): Offset after the last byte.
+
+        Raises:
+            FileNotFoundError: If the document no longer exists.
+            ValueError: If its file changed since it was indexed.
+            OSError: If the document cannot be read.
+        """
+        if end <= start:
+            return b""
+        size = self.BLOCK_SIZE
+        first, last = start // size, (end - 1) // size
+        blocks: Dict[int, bytes] = {}
+        missing = []
+        with self.__lock:
+            for number in range(first, last + 1):
+                block = self.__blocks.get((key, record.digest, number))
+                if block is None:
+                    missing.append(number)
+                else:
+                    self.__blocks.move_to_end((key, record.digest, number))
+                    blocks[number] = block
+            self.hits += len(blocks)
+            self.misses += len(missing)
+        if missing:
+            loaded = self.__load(key, record, missing[0], missing[-1])
+            self.__store(key, record.digest, loaded)
+            blocks.update(loaded)
+        data = b"".join(blocks.get(number, b"") for number in range(first, last + 1))
+        return data[start - first * size:end - first * size]
+
+    def __load(self, key : str, record, first : int, last : int) -> Dict[int, bytes]:
+        source = crawler.source_path(key)
+        stat = os.stat(source)
+        if stat.st_mtime != record.mtime or stat.st_size != record.size:
+            raise ValueError(f"The file '{source}' changed since it was indexed.")
+        document = crawler.open_document(key)
+        size = self.BLOCK_SIZE
+        if document.seekable:
+            with document.open() as stream:
+                stream.seek(first * size)
+                data = stream.read((last - first + 1) * size)
+        else:
+            # Without byte offsets to seek to, the text is read from the start. The
+            # blocks before the ones asked for are kept too.
+            first = 0
+            limit = (last + 1) * size
+            buffer = bytearray()
+            for text in document.text():
+                buffer += text.encode("utf-8")
+                if len(buffer) >= limit:
+                    break
+            data = bytes(buffer[:limit])
+        self.bytes_read += len(data)
+        return {first + i // size: data[i:i + size] for i in range(0, len(data), size)}
+
+    def __store(self, key : str, digest : bytes, blocks : Dict[int, bytes]) -> None:
+        if self.__capacity == 0:
+            return
+        with self.__lock:
+            for number, block in blocks.items():
+                cache_key = (key, digest, number)
+                if cache_key not in self.__blocks:
+                    self.__blocks[cache_key] = block
+                    self.__size += len(block)
+                self.__blocks.move_to_end(cache_key)
+            while self.__size > self.__capacity:
+                _, block = self.__blocks.popitem(last=False)
+                self.__size -= len(block)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__blocks.clear()
+            self.__size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit, miss and eviction counters (in blocks), the bytes read from
+        documents and the current size in bytes.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes_read": self.bytes_read,
+            "size": self.__size,
+            "capacity": self.__capacity,
+        }
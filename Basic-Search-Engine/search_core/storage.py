@@ -0,0 +1,595 @@
+import heapq
+import json
+import math
+import os
+import shutil
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from collections.abc import Mapping
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+from . import index_storage
+
+# The manifest record save_index expects, for documents copied between segments.
+_Record = namedtuple("_Record", "mtime size digest length offsets signature canonical doc_id")
+
+
+class MemoryStorage:
+    """
+    Keeps the index in a dict in memory. An index file opened with open() stays
+    memory-mapped, with postings decoded on lookup, until the first change
+    turns it into a dict.
+
+    Storage backends hold the engine's term -> PostingList mapping in index and
+    are told when to make it writable and when a batch of changes is complete.
+    """
+    persistent = False
+    append_only = False
+
+    def __init__(self) -> None:
+        self.index: Mapping = {}
+        self.source: Optional[str] = None
+
+    @property
+    def mapped(self) -> bool:
+        """
+        Whether the index is currently a read-only view of an index file.
+        """
+        return isinstance(self.index, index_storage.MappedIndex)
+
+    def replace(self, index : dict) -> None:
+        self.close()
+        self.index = index
+        self.source = None
+
+    def open(self, path : str, posting_list_type : Callable) -> index_storage.MappedIndex:
+        """
+        Replaces the index with a memory-mapped index file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is not a valid index file.
+        """
+        mapped = index_storage.load_index(path, posting_list_type)
+        self.close()
+        self.index = mapped
+        self.source = path
+        return mapped
+
+    def writable(self) -> Dict:
+        """
+        Returns the index as a mutable dict, decoding a mapped index file first if needed.
+        """
+        if self.mapped:
+            mapped = self.index
+            self.index = mapped.to_dict()
+            mapped.close()
+            self.source = None
+        return self.index
+
+    def restore(self, posting_list_type : Callable) -> Optional[index_storage.MappedIndex]:
+        """
+        Reopens the index a previous session left behind. Memory storage keeps nothing.
+        """
+        return None
+
+    def flush(self, manifest : Mapping, positional : bool, posting_list_type : Callable,
+              analyzer : Optional[dict] = None) -> Optional[index_storage.MappedIndex]:
+        """
+        Persists a batch of changes. Memory storage has nothing to write.
+        """
+        return None
+
+    def posting_count(self) -> int:
+        """
+        Returns the number of postings in the index.
+        """
+        if self.mapped:
+            return self.index.posting_count
+        return sum(len(postings) for postings in self.index.values())
+
+    def close(self) -> None:
+        if self.mapped:
+            self.index.close()
+
+
+class SegmentStorage(MemoryStorage):
+    """
+    Keeps the index in an on-disk segment file. Changes are made in memory and
+    written back to the segment when a batch of changes is flushed; between
+    flushes the segment is memory-mapped, so postings stay on disk until a
+    query needs them. A new engine using the same path picks the index up again.
+    """
+    persistent = True
+
+    def __init__(self, path : str) -> None:
+        """
+        Parameters:
+            path (str): The segment file.
+        """
+        super().__init__()
+        self.path = path
+
+    def restore(self, posting_list_type : Callable) -> Optional[index_storage.MappedIndex]:
+        if not os.path.exists(self.path):
+            return None
+        return self.open(self.path, posting_list_type)
+
+    def flush(self, manifest : Mapping, positional : bool, posting_list_type : Callable,
+              analyzer : Optional[dict] = None) -> Optional[index_storage.MappedIndex]:
+        """
+        Writes the index to the segment file and maps it back in.
+
+        Parameters:
+            manifest (Mapping): The manifest records in doc id order.
+            positional (bool): Whether the postings carry token positions.
+            posting_list_type (Callable): Builds empty posting lists when decoding.
+            analyzer (Optional[dict]): Settings of the analyzer the terms came from.
+
+        Returns:
+            Optional[MappedIndex]: The new segment, whose doc ids follow the manifest
+            order, or None if the segment was already up to date.
+        """
+        if self.mapped and self.source is not None and os.path.abspath(self.source) == os.path.abspath(self.path):
+            return None
+        temporary = self.path + ".tmp"
+        index_storage.save_index(self.index, temporary, manifest, positional, analyzer)
+        os.replace(temporary, self.path)
+        return self.open(self.path, posting_list_type)
+
+
+class Segment:
+    """
+    An immutable segment of a LogStructuredStorage: a mapped index file whose
+    local doc ids 0, 1, 2... stand for the ascending global doc ids in doc_ids.
+    """
+    __slots__ = ("name", "index", "doc_ids")
+
+    def __init__(self, name : str, index : index_storage.MappedIndex, doc_ids : array) -> None:
+        self.name = name
+        self.index = index
+        self.doc_ids = doc_ids
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __repr__(self) -> str:
+        return f"Segment({self.name}, {len(self.doc_ids)} docs)"
+
+
+class SegmentedIndex(Mapping):
+    """
+    Read-only view of a list of segments followed by an in-memory buffer of
+    postings. Looking a term up reads it from every segment, translates the
+    local doc ids to global ones and skips deleted documents. Segments cover
+    ascending ranges of doc ids and the buffer holds the newest documents, so
+    concatenating the parts keeps the posting list sorted by doc id.
+    """
+    def __init__(self, parts : Callable[[], Tuple[tuple, Mapping, Set[int]]], posting_list_type : Callable) -> None:
+        """
+        Parameters:
+            parts (Callable): Returns the current (segments, buffer, deleted doc ids).
+                Called once per lookup, so a lookup sees one consistent set of segments
+                even while a merge replaces them.
+            posting_list_type (Callable): Builds the empty posting lists lookups fill.
+        """
+        self.__parts = parts
+        self.__posting_list_type = posting_list_type
+
+    @property
+    def positional(self) -> bool:
+        segments, _, _ = self.__parts()
+        return bool(segments) and segments[0].index.positional
+
+    @property
+    def analyzer(self) -> Optional[dict]:
+        segments, _, _ = self.__parts()
+        return segments[0].index.analyzer if segments else None
+
+    @property
+    def doc_count(self) -> int:
+        """
+        One past the highest doc id held in a segment.
+        """
+        segments, _, _ = self.__parts()
+        return segments[-1].doc_ids[-1] + 1 if segments else 0
+
+    def documents(self) -> Iterator[Tuple[int, str, Tuple[float, int, bytes, int, bytes, bytes, Optional[str]]]]:
+        """
+        Yields the global doc id, path and manifest record of each live document
+        held in a segment, in doc id order.
+        """
+        segments, _, deleted = self.__parts()
+        for segment in segments:
+            for local_id, name, record in segment.index.documents():
+                doc_id = segment.doc_ids[local_id]
+                if doc_id not in deleted:
+                    yield doc_id, name, record
+
+    def __getitem__(self, term : str):
+        segments, buffer, deleted = self.__parts()
+        postings = self.__posting_list_type()
+        found = False
+        for segment in segments:
+            local = segment.index.get(term)
+            if local is None:
+                continue
+            found = True
+            self.__copy(local, segment.doc_ids, deleted, postings)
+        buffered = buffer.get(term)
+        if buffered is not None:
+            found = True
+            self.__copy(buffered, None, deleted, postings)
+        if not found:
+            raise KeyError(term)
+        return postings
+
+    @staticmethod
+    def __copy(source, doc_ids : Optional[array], deleted : Set[int], postings) -> None:
+        positions = source.positions
+        for i, (doc_id, count) in enumerate(zip(source.doc_ids, source.counts)):
+            if doc_ids is not None:
+                doc_id = doc_ids[doc_id]
+            if doc_id not in deleted:
+                postings.append(doc_id, count, positions[i] if positions is not None else None)
+
+    def __contains__(self, term) -> bool:
+        segments, buffer, _ = self.__parts()
+        return term in buffer or any(term in segment.index for segment in segments)
+
+    def __iter__(self) -> Iterator[str]:
+        segments, buffer, _ = self.__parts()
+        previous = None
+        # Index files list their terms sorted by UTF-8 bytes, which is code point order.
+        for term in heapq.merge(sorted(buffer), *(segment.index for segment in segments)):
+            if term != previous:
+                yield term
+                previous = term
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class LogStructuredStorage(MemoryStorage):
+    """
+    Keeps the index in a directory of small immutable segment files, in the
+    style of a log-structured merge tree. New documents are buffered in memory
+    and every flush writes them to a new segment, so the cost of adding pages
+    depends on the size of the batch rather than of the index. Deleted documents
+    are recorded as tombstones and skipped by queries.
+
+    A background thread merges runs of merge_factor adjacent segments of similar
+    size into one, dropping the postings of deleted documents. Queries read a
+    snapshot of the segment list and never wait for a merge; the merged segment
+    replaces its inputs in one step once it has been written.
+
+    The directory holds the segment files and segments.json, which lists the
+    live segments in doc id order with the deleted documents of each.
+    """
+    persistent = True
+    append_only = True
+    STATE_FILE = "segments.json"
+
+    def __init__(self, directory : str, merge_factor : int = 4, background_merge : bool = True) -> None:
+        """
+        Parameters:
+            directory (str): Where the segments are kept. It is created if needed.
+            merge_factor (int): Number of similar-sized segments merged at once.
+            background_merge (bool): Whether flushes start the merge thread. Without
+                it segments are only merged by compact().
+        """
+        if merge_factor < 2:
+            raise ValueError("At least two segments must be merged at once.")
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.merge_factor = merge_factor
+        self.background_merge = background_merge
+        self.__lock = threading.Lock()
+        self.__segments: Tuple[Segment, ...] = ()
+        self.__buffer: Dict = {}
+        self.__deleted: Set[int] = set()
+        # Tombstones as of the last flush. Only these are written to disk and
+        # applied by merges, so a merge never publishes a half-applied update.
+        self.__committed: FrozenSet[int] = frozenset()
+        self.__dropped: Set[int] = set()
+        self.__flushed = 0
+        self.__next_segment = 1
+        self.__posting_list_type: Optional[Callable] = None
+        self.__merger: Optional[threading.Thread] = None
+        self.__closing = threading.Event()
+        self.index = SegmentedIndex(self.__parts, self.__new_posting_list)
+
+    def __parts(self) -> Tuple[tuple, Mapping, Set[int]]:
+        return self.__segments, self.__buffer, self.__deleted
+
+    def __new_posting_list(self):
+        return self.__posting_list_type()
+
+    @property
+    def segments(self) -> Tuple[Segment, ...]:
+        """
+        Getter for the live segments, oldest first.
+        """
+        return self.__segments
+
+    @property
+    def mapped(self) -> bool:
+        return False
+
+    def writable(self) -> Dict:
+        """
+        Returns the in-memory buffer new postings are appended to.
+        """
+        return self.__buffer
+
+    def delete(self, doc_id : int) -> None:
+        """
+        Records a tombstone for a document. Its postings stay in their segment
+        until it is merged.
+        """
+        self.__deleted.add(doc_id)
+
+    def replace(self, index : dict) -> None:
+        with self.__lock:
+            self.__retire(self.__segments)
+            self.__segments = ()
+            self.__buffer = index
+            self.__deleted = set()
+            self.__committed = frozenset()
+            self.__flushed = 0
+            self.__write_state()
+
+    def restore(self, posting_list_type : Callable) -> Optional[SegmentedIndex]:
+        self.__posting_list_type = posting_list_type
+        state_path = os.path.join(self.directory, self.STATE_FILE)
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path, "r", encoding="utf-8") as file:
+            state = json.load(file)
+        segments = []
+        doc_id = 0
+        # Doc ids are reassigned densely in segment order on every restore.
+        for entry in state["segments"]:
+            mapped = index_storage.load_index(os.path.join(self.directory, entry["name"]), posting_list_type)
+            doc_ids = array("I", range(doc_id, doc_id + mapped.doc_count))
+            self.__deleted.update(doc_ids[local_id] for local_id in entry["deleted"])
+            segments.append(Segment(entry["name"], mapped, doc_ids))
+            doc_id += mapped.doc_count
+        self.__segments = tuple(segments)
+        self.__committed = frozenset(self.__deleted)
+        self.__flushed = doc_id
+        self.__next_segment = state["next"]
+        # Remove segments left behind by an interrupted flush or merge.
+        live = {segment.name for segment in segments}
+        for name in os.listdir(self.directory):
+            if name.startswith("segment-") and name not in live:
+                os.remove(os.path.join(self.directory, name))
+        return self.index if segments else None
+
+    def open(self, path : str, posting_list_type : Callable) -> SegmentedIndex:
+        """
+        Replaces every segment with a copy of an index file written by save_index.
+        """
+        self.__posting_list_type = posting_list_type
+        with self.__lock:
+            name = self.__new_segment_name()
+            target = os.path.join(self.directory, name)
+            shutil.copyfile(path, target)
+            try:
+                mapped = index_storage.load_index(target, posting_list_type)
+            except ValueError:
+                os.remove(target)
+                raise
+            self.__retire(self.__segments)
+            self.__segments = (Segment(name, mapped, array("I", range(mapped.doc_count))),)
+            self.__buffer = {}
+            self.__deleted = set()
+            self.__committed = frozenset()
+            self.__dropped = set()
+            self.__flushed = mapped.doc_count
+            self.__write_state()
+        return self.index
+
+    def flush(self, manifest : Mapping, positional : bool, posting_list_type : Callable,
+              analyzer : Optional[dict] = None) -> Optional[index_storage.MappedIndex]:
+        """
+        Writes the buffered documents to a new segment and commits the tombstones.
+        Doc ids are kept, so the engine does not need to reload anything.
+
+        Parameters:
+            manifest (Mapping): The manifest records in doc id order.
+            positional (bool): Whether the postings carry token positions.
+            posting_list_type (Callable): Builds empty posting lists when decoding.
+            analyzer (Optional[dict]): Settings of the analyzer the terms came from.
+
+        Returns:
+            None: Always.
+        """
+        self.__posting_list_type = posting_list_type
+        # Documents added since the last flush are the ones with the highest doc ids.
+        records = list(manifest.values())
+        first = bisect_left([record.doc_id for record in records], self.__flushed)
+        added = {name: record for name, record in list(manifest.items())[first:]}
+        with self.__lock:
+            pending = self.__deleted - self.__dropped
+            self.__dropped = set()
+            # Buffered documents that were deleted before reaching a segment are simply gone.
+            self.__deleted = {doc_id for doc_id in pending if doc_id < self.__flushed}
+            if not added and self.__deleted == self.__committed and not self.__buffer:
+                return None
+            segments = self.__segments
+            if added:
+                name = self.__new_segment_name()
+                path = os.path.join(self.directory, name)
+                buffer = self.__buffer
+                buffered = SegmentedIndex(lambda: ((), buffer, pending), posting_list_type)
+                index_storage.save_index(buffered, path, added, positional, analyzer)
+                doc_ids = array("I", (record.doc_id for record in added.values()))
+                segments += (Segment(name, index_storage.load_index(path, posting_list_type), doc_ids),)
+                self.__flushed = doc_ids[-1] + 1
+            self.__segments = segments
+            self.__buffer = {}
+            self.__committed = frozenset(self.__deleted)
+            self.__write_state()
+            if self.background_merge:
+                self.__schedule_merge()
+        return None
+
+    def compact(self) -> None:
+        """
+        Waits for background merges, then merges every segment into one.
+        """
+        self.wait_for_merges()
+        with self.__lock:
+            run = self.__segments
+            committed = self.__committed
+        if len(run) > 1 or (run and any(doc_id in committed for doc_id in run[0].doc_ids)):
+            self.__replace_run(run, *self.__merge(run, committed))
+
+    def wait_for_merges(self) -> None:
+        """
+        Blocks until the background merge thread has nothing left to merge.
+        """
+        merger = self.__merger
+        if merger is not None:
+            merger.join()
+
+    def __schedule_merge(self) -> None:
+        if self.__merger is None and self.__pick_merge(self.__segments) is not None:
+            self.__merger = threading.Thread(target=self.__merge_loop, name="segment-merge", daemon=True)
+            self.__merger.start()
+
+    def __pick_merge(self, segments : tuple) -> Optional[Tuple[int, int]]:
+        """
+        Finds the first run of merge_factor adjacent segments on the same size level,
+        where level n holds segments of merge_factor ** n to merge_factor ** (n + 1) docs.
+        """
+        run = 0
+        previous = None
+        for i, segment in enumerate(segments):
+            level = int(math.log(max(len(segment), 1), self.merge_factor))
+            run = run + 1 if level == previous else 1
+            previous = level
+            if run == self.merge_factor:
+                return i + 1 - run, i + 1
+        return None
+
+    def __merge_loop(self) -> None:
+        while not self.__closing.is_set():
+            with self.__lock:
+                picked = self.__pick_merge(self.__segments)
+                if picked is None:
+                    self.__merger = None
+                    return
+                run = self.__segments[picked[0]:picked[1]]
+                committed = self.__committed
+            self.__replace_run(run, *self.__merge(run, committed))
+        with self.__lock:
+            self.__merger = None
+
+    def __merge(self, run : tuple, committed : FrozenSet[int]) -> Tuple[Optional[Segment], Set[int]]:
+        """
+        Writes the live documents of a run of segments to a new segment.
+
+        Returns:
+            Tuple[Optional[Segment], Set[int]]: The new segment, or None if every
+            document was deleted, and the doc ids of the documents dropped.
+        """
+        manifest = {}
+        dropped = set()
+        for segment in run:
+            for local_id, name, record in segment.index.documents():
+                doc_id = segment.doc_ids[local_id]
+                if doc_id in committed:
+                    dropped.add(doc_id)
+                else:
+                    manifest[name] = _Record(*record, doc_id=doc_id)
+        if not manifest:
+            return None, dropped
+        with self.__lock:
+            name = self.__new_segment_name()
+        path = os.path.join(self.directory, name)
+        merged = SegmentedIndex(lambda: (run, {}, committed), self.__new_posting_list)
+        index_storage.save_index(merged, path, manifest, run[0].index.positional, run[0].index.analyzer)
+        doc_ids = array("I", (record.doc_id for record in manifest.values()))
+        return Segment(name, index_storage.load_index(path, self.__posting_list_type), doc_ids), dropped
+
+    def __replace_run(self, run : tuple, merged : Optional[Segment], dropped : Set[int]) -> None:
+        with self.__lock:
+            segments = self.__segments
+            start = next((i for i, segment in enumerate(segments) if segment is run[0]), None)
+            if start is None or segments[start:start + len(run)] != run:
+                # The segments were replaced by open() or replace() while merging.
+                if merged is not None:
+                    self.__retire((merged,))
+                return
+            self.__segments = segments[:start] + ((merged,) if merged is not None else ()) + \
+                segments[start + len(run):]
+            # Applied by the next flush, while the engine holds its lock and no query runs.
+            self.__dropped |= dropped
+            self.__write_state()
+            self.__retire(run)
+
+    def __retire(self, segments : tuple) -> None:
+        """
+        Deletes the files of segments that left the segment list. Queries that took
+        their snapshot before may still be reading them, so they are not closed: the
+        mapping goes away with the last reference, and on Linux the file stays
+        readable until then.
+        """
+        for segment in segments:
+            try:
+                os.remove(os.path.join(self.directory, segment.name))
+            except OSError:
+                pass  # Still mapped on platforms that forbid this; restore() cleans it up.
+
+    def __new_segment_name(self) -> str:
+        name = f"segment-{self.__next_segment:06d}.idx"
+        self.__next_segment += 1
+        return name
+
+    def __write_state(self) -> None:
+        """
+        Atomically rewrites segments.json. Must be called with the lock held.
+        """
+        segments = self.__segments
+        firsts = [segment.doc_ids[0] for segment in segments]
+        deleted: List[List[int]] = [[] for _ in segments]
+        for doc_id in sorted(self.__committed):
+            i = bisect_right(firsts, doc_id) - 1
+            if i < 0:
+                continue
+            local_id = bisect_left(segments[i].doc_ids, doc_id)
+            if local_id < len(segments[i]) and segments[i].doc_ids[local_id] == doc_id:
+                deleted[i].append(local_id)
+        state = {
+            "next": self.__next_segment,
+            "segments": [{"name": segment.name, "docs": len(segment), "deleted": deleted[i]}
+                         for i, segment in enumerate(segments)],
+        }
+        path = os.path.join(self.directory, self.STATE_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(state, file, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def posting_count(self) -> int:
+        """
+        Returns the number of postings, counting those of deleted documents that
+        have not been merged away yet.
+        """
+        return sum(segment.index.posting_count for segment in self.__segments) + \
+            sum(len(postings) for postings in self.__buffer.values())
+
+    def close(self) -> None:
+        """
+        Stops merging after the current merge and closes every segment.
+        """
+        self.__closing.set()
+        self.wait_for_merges()
+        with self.__lock:
+            for segment in self.__segments:
+                segment.index.close()
+            self.__segments = ()
@@ -0,0 +1,138 @@
+import fnmatch
+import re
+from bisect import bisect_left
+from typing import Iterable, List, Tuple
+
+WILDCARDS = "*?"
+
+
+def _successor(prefix : str) -> str:
+    """The smallest string that sorts after every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _literal_prefix(pattern : str) -> str:
+    for i, char in enumerate(pattern):
+        if char in WILDCARDS:
+            return pattern[:i]
+    return pattern
+
+
+def has_wildcards(pattern : str) -> bool:
+    return any(char in WILDCARDS for char in pattern)
+
+
+class TermDictionary:
+    """
+    Sorted array of the indexed terms. Every term sharing a prefix sits in one
+    contiguous range that two binary searches find, so the array doubles as an
+    implicit trie: prefix, wildcard and fuzzy lookups walk ranges instead of
+    scanning every term. A second array of reversed terms serves patterns that
+    only fix the end of a word, such as "*ing".
+    """
+    def __init__(self, terms : Iterable[str]) -> None:
+        """
+        Parameters:
+            terms (Iterable[str]): The distinct terms of the index, in any order.
+        """
+        self.__terms = sorted(terms)
+        self.__reversed = None
+
+    def __len__(self) -> int:
+        return len(self.__terms)
+
+    def __range(self, terms : List[str], prefix : str, low : int = 0, high : int = None) -> Tuple[int, int]:
+        if high is None:
+            high = len(terms)
+        if not prefix:
+            return low, high
+        start = bisect_left(terms, prefix, low, high)
+        return start, bisect_left(terms, _successor(prefix), start, high)
+
+    def prefix(self, prefix : str) -> List[str]:
+        """
+        Returns the terms starting with prefix, in sorted order.
+        """
+        start, end = self.__range(self.__terms, prefix)
+        return self.__terms[start:end]
+
+    def wildcard(self, pattern : str) -> List[str]:
+        """
+        Returns the terms matching a pattern where '*' stands for any run of
+        characters and '?' for exactly one. Only the terms sharing the pattern's
+        literal prefix (or, failing that, its literal suffix) are tested.
+
+        Parameters:
+            pattern (str): A lowercase pattern such as "index*" or "s?arch".
+
+        Returns:
+            List[str]: The matching terms, in sorted order.
+        """
+        if not has_wildcards(pattern):
+            return [pattern] if self.contains(pattern) else []
+        matcher = re.compile(fnmatch.translate(pattern)).match
+        prefix = _literal_prefix(pattern)
+        suffix = _literal_prefix(pattern[::-1])
+        if len(suffix) > len(prefix):
+            if self.__reversed is None:
+                self.__reversed = sorted(term[::-1] for term in self.__terms)
+            start, end = self.__range(self.__reversed, suffix)
+            return sorted(term[::-1] for term in self.__reversed[start:end] if matcher(term[::-1]))
+        start, end = self.__range(self.__terms, prefix)
+        return [term for term in self.__terms[start:end] if matcher(term)]
+
+    def contains(self, term : str) -> bool:
+        i = bisect_left(self.__terms, term)
+        return i < len(self.__terms) and self.__terms[i] == term
+
+    def fuzzy(self, word : str, max_distance : int = 2) -> List[Tuple[str, int]]:
+        """
+        Returns the terms within max_distance Levenshtein edits of word. The sorted
+        array is walked as a trie, carrying one row of the edit-distance table per
+        prefix; a prefix whose row has no entry within the bound is pruned together
+        with every term below it.
+
+        Parameters:
+            word (str): The (possibly misspelled) word.
+            max_distance (int): Largest number of insertions, deletions and substitutions.
+
+        Returns:
+            List[Tuple[str, int]]: (term, distance) pairs, closest first.
+        """
+        matches = []
+        terms = self.__terms
+        size = len(word)
+        # Distances above the bound are clamped, and only the band of cells that can
+        # still be within it is computed: a prefix of length depth is at least
+        # |depth - i| edits away from the first i characters of word.
+        limit = max_distance + 1
+
+        def walk(low : int, high : int, prefix : str, row : List[int]) -> None:
+            # terms[low:high] all start with prefix, and row holds the edit distances
+            # between prefix and every prefix of word.
+            depth = len(prefix)
+            if len(terms[low]) == depth:
+                if row[size] <= max_distance:
+                    matches.append((terms[low], row[size]))
+                low += 1
+            first = max(1, depth + 1 - max_distance)
+            last = min(size, depth + 1 + max_distance)
+            while low < high:
+                char = terms[low][depth]
+                end = bisect_left(terms, prefix + chr(ord(char) + 1), low, high)
+                next_row = [limit] * (size + 1)
+                next_row[0] = min(depth + 1, limit)
+                best = next_row[0]
+                for i in range(first, last + 1):
+                    cost = min(next_row[i - 1] + 1, row[i] + 1, row[i - 1] + (word[i - 1] != char), limit)
+                    next_row[i] = cost
+                    if cost < best:
+                        best = cost
+                if best <= max_distance:
+                    walk(low, end, prefix + char, next_row)
+                low = end
+
+        if terms:
+            walk(0, len(terms), "", [min(i, limit) for i in range(size + 1)])
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
@@ -0,0 +1,236 @@
+import codecs
+import re
+import time
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+QUERY_PATTERN = re.compile(r'[\w*?]+')
+TRAILING_WORD = re.compile(r'\w+\Z')
+SPACE_PATTERN = re.compile(r'\s')
+CHUNK_SIZE = 64 * 1024
+# Characters without whitespace held back for the next piece before only the last word is.
+HOLD_BACK_LIMIT = 64 * 1024
+# Bytes of text between two checkpoints of a document's offset table, at least.
+CHECKPOINT_BYTES = 1024
+
+
+def tokenize(text : str, lowercase : bool = True) -> List[str]:
+    """
+    Splits text into words, lowercased by default.
+
+    Parameters:
+        text (str): The text to tokenize.
+        lowercase (bool): Whether to lowercase the words.
+
+    Returns:
+        List[str]: The words of the text, in order.
+    """
+    return WORD_PATTERN.findall(text.lower() if lowercase else text)
+
+
+def tokenize_query(text : str, lowercase : bool = True) -> List[str]:
+    """
+    Splits a query into words (lowercased by default), keeping the '*' and '?' wildcards.
+
+    Parameters:
+        text (str): The query to tokenize.
+        lowercase (bool): Whether to lowercase the words.
+
+    Returns:
+        List[str]: The words and wildcard patterns of the query, in order.
+    """
+    return QUERY_PATTERN.findall(text.lower() if lowercase else text)
+
+
+def tokenize_file(file_name : str, chunk_size : int = CHUNK_SIZE, hasher=None, timings : dict = None,
+                  lowercase : bool = True) -> Iterator[str]:
+    """
+    Yields the (lowercased) words of a UTF-8 file, reading it in fixed-size chunks so
+    memory use does not grow with the file size.
+
+    Parameters:
+        file_name (str): The file to tokenize.
+        chunk_size (int): Number of bytes read at a time.
+        hasher: Optional hashlib object updated with every byte read.
+        timings (dict): If given, the seconds spent reading the file are added to its "read" key.
+        lowercase (bool): Whether to lowercase the words.
+
+    Yields:
+        str: The words of the file, in order.
+
+    Raises:
+        UnicodeDecodeError: If the file is not valid UTF-8.
+    """
+    return tokenize_chunks(read_text_chunks(file_name, chunk_size, hasher, timings), lowercase)
+
+
+def tokenize_chunks(chunks : Iterable[str], lowercase : bool = True,
+                    checkpoints : Optional[list] = None) -> Iterator[str]:
+    """
+    Yields the words of a text given as consecutive pieces. A word cut by the end of
+    a piece is held back and completed with the start of the next one.
+
+    Parameters:
+        chunks (Iterable[str]): The pieces of the text, in order.
+        lowercase (bool): Whether to lowercase the words.
+        checkpoints (Optional[list]): If given, a (word number, byte offset) pair is
+            appended to it at the first whitespace after every CHECKPOINT_BYTES bytes
+            of text, so the words around a position can later be found again by
+            reading a few bytes from that offset of the UTF-8 text.
+
+    Yields:
+        str: The words of the text, in order.
+    """
+    if checkpoints is not None:
+        yield from _tokenize_with_checkpoints(chunks, lowercase, checkpoints)
+        return
+    carry = ""
+    for text in chunks:
+        text, carry = _hold_back(carry + text)
+        yield from WORD_PATTERN.findall(text.lower() if lowercase else text)
+    if carry:
+        yield from WORD_PATTERN.findall(carry.lower() if lowercase else carry)
+
+
+def _hold_back(text : str) -> Tuple[str, str]:
+    """
+    Splits a piece of text before the part that may go on in the next piece: its
+    end after the last whitespace. Lowercasing text cut at whitespace gives what
+    lowercasing it whole would, which is not true of a cut anywhere else: 'İ'
+    becomes two characters and two words, and 'Σ' lowercases by what follows it.
+    Text with no whitespace for HOLD_BACK_LIMIT characters holds back its last
+    word only, so the part held back stays bounded.
+
+    Returns:
+        Tuple[str, str]: The text that can be tokenized now and the part held back.
+    """
+    if not text or text[-1].isspace():
+        return text, ""
+    tail = len(text.rsplit(None, 1)[-1])
+    if tail > HOLD_BACK_LIMIT:
+        word = TRAILING_WORD.search(text, len(text) - tail)
+        tail = len(text) - word.start() if word is not None else 0
+    return text[:len(text) - tail], text[len(text) - tail:]
+
+
+def _tokenize_with_checkpoints(chunks : Iterable[str], lowercase : bool, checkpoints : list) -> Iterator[str]:
+    """
+    tokenize_chunks with checkpoints. Each piece is cut into blocks that end at
+    whitespace, so no word straddles two blocks and each block start is a checkpoint.
+    """
+    carry = ""
+    offset = 0      # Byte offset of the start of text.
+    words_before = 0
+    for text in chunks:
+        text, carry = _hold_back(carry + text)
+        ascii = text.isascii()
+        size = len(text)
+        start = 0
+        while start < size:
+            end = start + CHECKPOINT_BYTES
+            if end < size:
+                space = SPACE_PATTERN.search(text, end)
+                end = space.start() if space is not None else size
+            else:
+                end = size
+            block = text[start:end]
+            if offset and (not checkpoints or checkpoints[-1][1] < offset):
+                checkpoints.append((words_before, offset))
+            words = WORD_PATTERN.findall(block.lower() if lowercase else block)
+            offset += end - start if ascii else len(block.encode("utf-8"))
+            words_before += len(words)
+            yield from words
+            start = end
+    if carry:
+        yield from WORD_PATTERN.findall(carry.lower() if lowercase else carry)
+
+
+def read_text_chunks(file_name : str, chunk_size : int = CHUNK_SIZE, hasher=None, timings : dict = None) -> Iterator[str]:
+    """
+    Yields the text of a UTF-8 file one chunk at a time. A character split by a
+    chunk boundary is completed by the next chunk.
+
+    Parameters:
+        file_name (str): The file to read.
+        chunk_size (int): Number of bytes read at a time.
+        hasher: Optional hashlib object updated with every byte read.
+        timings (dict): If given, the seconds spent reading the file are added to its "read" key.
+
+    Yields:
+        str: Consecutive pieces of the file's text.
+
+    Raises:
+        UnicodeDecodeError: If the file is not valid UTF-8.
+    """
+    with open(file_name, "rb") as file:
+        yield from decode_chunks(file, chunk_size, hasher, timings)
+
+
+def decode_chunks(stream : BinaryIO, chunk_size : int = CHUNK_SIZE, hasher=None, timings : dict = None) -> Iterator[str]:
+    """
+    Yields the text of a UTF-8 binary stream, such as an open file or a member of
+    an archive, one chunk at a time.
+
+    Parameters:
+        stream (BinaryIO): The stream to read until its end.
+        chunk_size (int): Number of bytes read at a time.
+        hasher: Optional hashlib object updated with every byte read.
+        timings (dict): If given, the seconds spent reading are added to its "read" key.
+
+    Yields:
+        str: Consecutive pieces of the text.
+
+    Raises:
+        UnicodeDecodeError: If the stream is not valid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        if timings is None:
+            data = stream.read(chunk_size)
+        else:
+            start = time.perf_counter()
+            data = stream.read(chunk_size)
+            timings["read"] = timings.get("read", 0.0) + time.perf_counter() - start
+        if not data:
+            break
+        if hasher is not None:
+            hasher.update(data)
+        text = decoder.decode(data)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def hash_file(file_name : str, hasher, chunk_size : int = CHUNK_SIZE) -> bytes:
+    """
+    Hashes a file in fixed-size chunks.
+
+    Parameters:
+        file_name (str): The file to hash.
+        hasher: A fresh hashlib object.
+        chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+        bytes: The digest of the file content.
+    """
+    with open(file_name, "rb") as file:
+        return hash_stream(file, hasher, chunk_size)
+
+
+def hash_stream(stream : BinaryIO, hasher, chunk_size : int = CHUNK_SIZE) -> bytes:
+    """
+    Hashes the rest of a binary stream in fixed-size chunks.
+
+    Parameters:
+        stream (BinaryIO): The stream to hash.
+        hasher: A fresh hashlib object.
+        chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+        bytes: The digest of the stream content.
+    """
+    for data in iter(lambda: stream.read(chunk_size), b""):
+        hasher.update(data)
+    return hasher.digest()